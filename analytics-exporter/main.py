@@ -0,0 +1,320 @@
+import os
+import sys
+import logging
+import threading
+import time
+from itertools import groupby
+from flask import Flask, jsonify
+from datetime import datetime, timedelta
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pyarrow import fs as pafs
+from typing import Dict
+
+# Shared service code: deploy.sh copies shared/spotmf_shared next to main.py for the image, a
+# checkout imports it from the repository
+SHARED_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'shared')
+if os.path.isdir(SHARED_PATH):
+    sys.path.append(SHARED_PATH)
+
+from spotmf_shared import configure_service
+from spotmf_shared.secret_manager import get_secret
+from spotmf_shared.db import get_db_connection, release_db_connection, get_read_connection
+from spotmf_shared.single_flight import begin_single_flight_run, get_single_flight_metrics
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+app = Flask(__name__)
+
+# Incremental Parquet export of the OLTP tables for offline analytics. Each run streams the rows
+# changed since the table's watermark through a server-side cursor into Arrow batches and appends
+# them as Parquet files partitioned by the date of the watermark column:
+#   <EXPORT_ROOT>/<table>/date=YYYY-MM-DD/part-<run id>-<sequence>.parquet
+# EXPORT_ROOT is a local path or a gs://bucket/prefix URI. Exports are an append-only change log:
+# an execution updated after it was exported appears again, so readers keep the latest version per id.
+# The export scans read from the db-read-dsn replica, so reporting load stays off the primary; the
+# primary only serves them when no replica is configured.
+EXPORT_ROOT = os.environ.get('EXPORT_ROOT', '/tmp/analytics-export')
+EXPORT_BATCH_ROWS = int(os.environ.get('EXPORT_BATCH_ROWS', 10000))
+EXPORT_MAX_ROWS_PER_FILE = int(os.environ.get('EXPORT_MAX_ROWS_PER_FILE', 1000000))
+EXPORT_COMPRESSION = os.environ.get('EXPORT_COMPRESSION', 'zstd')
+# Rows are only exported once their watermark is this old, so transactions still in flight at the
+# cutoff commit before the watermark passes them
+EXPORT_SETTLE_SECONDS = int(os.environ.get('EXPORT_SETTLE_SECONDS', 300))
+EXPORT_CHECKPOINT_PREFIX = 'analytics_export:'
+EPOCH = datetime(1970, 1, 1)
+
+# Exported tables: source query, watermark column and Arrow schema. Executions are joined with
+# their strategy so wallet, asset and plan type are available without going back to the database.
+# failed_transaction_logs has no updated_at; its rows are written once, so created_at is the watermark.
+EXPORT_TABLES = {
+    'strategy_executions': {
+        'source': """
+            strategy_executions se
+            JOIN user_strategies us ON us.id = se.strategy_id
+            JOIN action_nonces an ON an.id = us.action_nonce_id
+        """,
+        'watermark': 'se.updated_at',
+        'columns': [
+            ('id', 'se.id', pa.string()),
+            ('strategy_id', 'se.strategy_id', pa.string()),
+            ('wallet_address', 'us.wallet_address', pa.string()),
+            ('asset', 'an.asset::text', pa.string()),
+            ('strategy_type', 'an.strategy_type::text', pa.string()),
+            ('status', 'se.status::text', pa.string()),
+            ('transaction_hash', 'se.transaction_hash', pa.string()),
+            ('amount_in', 'se.amount_in', pa.int64()),
+            ('amount_out', 'se.amount_out::text', pa.string()),
+            ('actual_slippage', 'se.actual_slippage', pa.decimal128(5, 2)),
+            ('gas_used', 'se.gas_used', pa.int64()),
+            ('gas_price_used', 'se.gas_price_used', pa.int64()),
+            ('error_message', 'se.error_message', pa.string()),
+            ('retry_count', 'se.retry_count', pa.int32()),
+            ('executed_at', 'se.executed_at', pa.timestamp('ms')),
+            ('due_at', 'se.due_at', pa.timestamp('ms')),
+            ('broadcast_at', 'se.broadcast_at', pa.timestamp('ms')),
+            ('created_at', 'se.created_at', pa.timestamp('ms')),
+            ('updated_at', 'se.updated_at', pa.timestamp('ms')),
+        ]
+    },
+    'failed_transaction_logs': {
+        'source': 'failed_transaction_logs ftl',
+        'watermark': 'ftl.created_at',
+        'columns': [
+            ('id', 'ftl.id', pa.string()),
+            ('wallet_address', 'ftl.wallet_address', pa.string()),
+            ('strategy_id', 'ftl.strategy_id', pa.string()),
+            ('execution_id', 'ftl.execution_id', pa.string()),
+            ('asset', 'ftl.asset::text', pa.string()),
+            ('plan_type', 'ftl.plan_type::text', pa.string()),
+            ('transaction_hash', 'ftl.transaction_hash', pa.string()),
+            ('amount', 'ftl.amount', pa.string()),
+            ('error_message', 'ftl.error_message', pa.string()),
+            ('failed_at', 'ftl.failed_at', pa.timestamp('ms')),
+            ('created_at', 'ftl.created_at', pa.timestamp('ms')),
+        ]
+    },
+}
+
+# Service name recorded with single-flight runs
+SERVICE_NAME = 'analytics-exporter'
+configure_service(SERVICE_NAME)
+
+export_stats = {table: {'runs': 0, 'rows': 0, 'files': 0, 'last_rows': 0, 'last_seconds': 0.0, 'watermark': None}
+                for table in EXPORT_TABLES}
+export_stats_lock = threading.Lock()
+
+@app.route('/health', methods=['GET'])
+def health_check():
+    """Health check endpoint"""
+    return jsonify({'status': 'healthy', 'timestamp': datetime.now().isoformat()})
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Runtime metrics endpoint"""
+    with export_stats_lock:
+        tables = {table: dict(stats) for table, stats in export_stats.items()}
+    return jsonify({
+        'tables': tables,
+        'single_flight': get_single_flight_metrics(),
+        'timestamp': datetime.now().isoformat()
+    })
+
+@app.route('/export', methods=['POST'])
+def export_tables():
+    """Export the rows changed since the last run of every table"""
+    run = None
+    try:
+        run, running_id = begin_single_flight_run('export')
+        if run is None:
+            logger.info(f"Export run {running_id} already in progress, not starting another")
+            return jsonify({'message': 'Export already in progress', 'run_id': running_id}), 202
+        
+        logger.info(f"Starting analytics export (run {run.run_id}) to {EXPORT_ROOT}")
+        
+        filesystem, root_path = pafs.FileSystem.from_uri(EXPORT_ROOT)
+        cutoff_ms = to_epoch_ms(datetime.now() - timedelta(seconds=EXPORT_SETTLE_SECONDS))
+        results = {table: export_table(table, filesystem, root_path, run.run_id, cutoff_ms) for table in EXPORT_TABLES}
+        
+        logger.info(f"Analytics export completed: {results}")
+        return jsonify({
+            'message': 'Analytics export completed',
+            'results': results,
+            'run_id': run.run_id,
+            'timestamp': datetime.now().isoformat()
+        })
+        
+    except Exception as e:
+        logger.error(f"Analytics export failed: {str(e)}")
+        if run:
+            run.fail(str(e))
+        return jsonify({'error': str(e)}), 500
+    
+    finally:
+        if run:
+            run.finish()
+
+def to_epoch_ms(value: datetime) -> int:
+    """Milliseconds since the epoch of a naive timestamp, the precision of TIMESTAMP(3) columns"""
+    return (value - EPOCH) // timedelta(milliseconds=1)
+
+def get_export_watermark(table: str) -> int:
+    """Epoch milliseconds up to which the table has been exported"""
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT position FROM service_checkpoints WHERE name = %s", (EXPORT_CHECKPOINT_PREFIX + table,))
+            row = cursor.fetchone()
+            return row[0] if row else 0
+            
+    finally:
+        release_db_connection(conn)
+
+def save_export_watermark(table: str, watermark_ms: int):
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO service_checkpoints (name, position, updated_at)
+                VALUES (%s, %s, %s)
+                ON CONFLICT (name) DO UPDATE SET position = EXCLUDED.position, updated_at = EXCLUDED.updated_at
+            """, (EXPORT_CHECKPOINT_PREFIX + table, watermark_ms, datetime.now()))
+            conn.commit()
+            
+    finally:
+        release_db_connection(conn)
+
+class PartitionWriter:
+    """Writes Arrow batches to one Parquet file at a time, rolling over on a new date or at the row limit"""
+    
+    def __init__(self, filesystem: pafs.FileSystem, table_path: str, schema: pa.Schema, run_id: str):
+        self.filesystem = filesystem
+        self.table_path = table_path
+        self.schema = schema
+        self.run_id = run_id
+        self.writer = None
+        self.partition = None
+        self.rows_in_file = 0
+        self.sequence = 0
+        self.files = []
+    
+    def write(self, partition: str, batch: pa.RecordBatch):
+        if self.writer and (partition != self.partition or self.rows_in_file >= EXPORT_MAX_ROWS_PER_FILE):
+            self.close()
+        if not self.writer:
+            self.open(partition)
+        self.writer.write_batch(batch)
+        self.rows_in_file += batch.num_rows
+    
+    def open(self, partition: str):
+        directory = f'{self.table_path}/date={partition}'
+        self.filesystem.create_dir(directory, recursive=True)
+        self.partition = partition
+        self.final_path = f'{directory}/part-{self.run_id}-{self.sequence:05d}.parquet'
+        # Readers skip _-prefixed files, so a file is only visible once it is complete
+        self.temp_path = f'{directory}/_part-{self.run_id}-{self.sequence:05d}.parquet.inprogress'
+        self.writer = pq.ParquetWriter(self.temp_path, self.schema, filesystem=self.filesystem,
+                                       compression=EXPORT_COMPRESSION)
+        self.sequence += 1
+        self.rows_in_file = 0
+    
+    def close(self):
+        if not self.writer:
+            return
+        self.writer.close()
+        self.filesystem.move(self.temp_path, self.final_path)
+        self.files.append(self.final_path)
+        self.writer = None
+    
+    def abort(self):
+        """Drop the file being written after a failure"""
+        if not self.writer:
+            return
+        try:
+            self.writer.close()
+            self.filesystem.delete_file(self.temp_path)
+        except Exception as e:
+            logger.warning(f"Could not remove partial export file {self.temp_path}: {str(e)}")
+        self.writer = None
+
+def export_table(table: str, filesystem: pafs.FileSystem, root_path: str, run_id: str, cutoff_ms: int) -> Dict:
+    """Stream rows with a watermark in (last watermark, cutoff] into date-partitioned Parquet files"""
+    config = EXPORT_TABLES[table]
+    schema = pa.schema([(name, arrow_type) for name, _, arrow_type in config['columns']])
+    watermark_index = [expression for _, expression, _ in config['columns']].index(config['watermark'])
+    started = time.monotonic()
+    
+    watermark_ms = get_export_watermark(table)
+    if watermark_ms >= cutoff_ms:
+        return {'rows': 0, 'files': 0, 'watermark': watermark_ms}
+    
+    # A lagging or unreachable replica defers the table to the next run instead of loading the primary.
+    # The run's start position is required on the replica, and the settle window is far longer than
+    # the tolerated replica lag, so every row up to the cutoff is already replayed.
+    conn = get_read_connection()
+    if not conn.is_replica and get_secret('db-read-dsn'):
+        release_db_connection(conn)
+        logger.warning(f"Read replica is lagging or unavailable, deferring the {table} export")
+        return {'rows': 0, 'files': 0, 'watermark': watermark_ms, 'deferred': True}
+    
+    writer = PartitionWriter(filesystem, f"{root_path.rstrip('/')}/{table}", schema, run_id)
+    rows_exported = 0
+    try:
+        # A named cursor keeps the result set on the server; rows arrive EXPORT_BATCH_ROWS at a time
+        with conn.cursor(name=f'export_{table}') as cursor:
+            cursor.itersize = EXPORT_BATCH_ROWS
+            cursor.execute(f"""
+                SELECT {', '.join(expression for _, expression, _ in config['columns'])}
+                FROM {config['source']}
+                WHERE {config['watermark']} > TIMESTAMP 'epoch' + %s * INTERVAL '1 millisecond'
+                  AND {config['watermark']} <= TIMESTAMP 'epoch' + %s * INTERVAL '1 millisecond'
+                ORDER BY {config['watermark']}
+            """, (watermark_ms, cutoff_ms))
+            
+            while True:
+                rows = cursor.fetchmany(EXPORT_BATCH_ROWS)
+                if not rows:
+                    break
+                columns = list(zip(*rows))
+                batch = pa.RecordBatch.from_arrays(
+                    [pa.array(values, type=arrow_type) for values, (_, _, arrow_type) in zip(columns, config['columns'])],
+                    schema=schema
+                )
+                # Rows arrive in watermark order, so each date is one contiguous slice
+                offset = 0
+                for partition, group in groupby(columns[watermark_index], key=lambda value: value.date().isoformat()):
+                    length = sum(1 for _ in group)
+                    writer.write(partition, batch.slice(offset, length))
+                    offset += length
+                rows_exported += len(rows)
+            
+        writer.close()
+        
+    except Exception:
+        writer.abort()
+        raise
+    
+    finally:
+        release_db_connection(conn)
+    
+    # Only advance once every file is in place; a failed run is retried from the same watermark
+    save_export_watermark(table, cutoff_ms)
+    
+    elapsed = time.monotonic() - started
+    with export_stats_lock:
+        stats = export_stats[table]
+        stats['runs'] += 1
+        stats['rows'] += rows_exported
+        stats['files'] += len(writer.files)
+        stats['last_rows'] = rows_exported
+        stats['last_seconds'] = round(elapsed, 3)
+        stats['watermark'] = cutoff_ms
+    
+    logger.info(f"Exported {rows_exported} {table} rows into {len(writer.files)} files in {elapsed:.2f}s")
+    return {'rows': rows_exported, 'files': len(writer.files), 'watermark': cutoff_ms}
+
+if __name__ == '__main__':
+    port = int(os.environ.get('PORT', 8080))
+    app.run(host='0.0.0.0', port=port, debug=False)
\ No newline at end of file
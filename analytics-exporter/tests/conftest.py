@@ -0,0 +1,57 @@
+"""Fixtures for the analytics exporter suite: a scratch database and a local export root.
+
+Run from the service directory (python -m pytest tests) with TEST_DB_HOST pointing at a Postgres
+server the tests may create databases on.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+SERVICE_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVICE_PATH)
+sys.path.insert(0, os.path.join(SERVICE_PATH, '..', 'shared'))
+
+from spotmf_shared import db as shared_db, testing
+
+CLEARED_TABLES = ('strategy_executions', 'failed_transaction_logs', 'service_checkpoints', 'service_runs')
+
+@pytest.fixture(scope='session')
+def exporter():
+    settings = testing.get_test_db_settings()
+    if settings is None:
+        pytest.skip('TEST_DB_HOST is not set')
+    database = testing.create_scratch_database(settings)
+
+    # The exporter reads its configuration at import time
+    os.environ.update({
+        'SECRET_DB_HOST': settings['host'],
+        'SECRET_DB_NAME': database,
+        'SECRET_DB_USER': settings['user'],
+        'SECRET_DB_PASSWORD': settings['password'],
+        'SECRET_DB_READ_DSN': '',
+        'EXPORT_SETTLE_SECONDS': '0',
+    })
+    import main
+    yield main
+
+    shared_db.get_db_pool().closeall()
+    testing.drop_scratch_database(settings, database)
+
+@pytest.fixture
+def db(exporter, monkeypatch):
+    """A cursor on the scratch database, emptied before each test, with exports going to a fresh directory"""
+    monkeypatch.setattr(exporter, 'EXPORT_ROOT', tempfile.mkdtemp(prefix='analytics-export-'))
+    conn = exporter.get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(f"TRUNCATE {', '.join(CLEARED_TABLES)}")
+            cursor.execute("DELETE FROM user_strategies")
+            cursor.execute("DELETE FROM action_nonces")
+            cursor.execute("DELETE FROM users")
+            conn.commit()
+            yield cursor
+            conn.commit()
+    finally:
+        exporter.release_db_connection(conn)
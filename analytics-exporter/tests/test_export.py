@@ -0,0 +1,62 @@
+import glob
+import os
+
+import pyarrow.parquet as pq
+import pytest
+
+from spotmf_shared import db as shared_db, testing
+
+def insert_execution(cursor, execution_id: str, strategy_id: str, amount_out, updated_days_ago: int = 0):
+    cursor.execute("""
+        INSERT INTO strategy_executions (id, strategy_id, status, amount_in, amount_out, created_at, updated_at)
+        VALUES (%s, %s, 'SUCCESS', 1000000, %s, now(), now() - %s * interval '1 day' - interval '1 second')
+    """, (execution_id, strategy_id, amount_out, updated_days_ago))
+    cursor.connection.commit()
+
+def read_export(root: str, table: str):
+    files = sorted(glob.glob(os.path.join(root, table, 'date=*', 'part-*.parquet')))
+    return files, [row for path in files for row in pq.read_table(path).to_pylist()]
+
+def test_export_writes_date_partitions_and_advances_the_watermark(exporter, db):
+    testing.seed_strategy(db, 'strategy-1', asset='ETH')
+    insert_execution(db, 'execution-1', 'strategy-1', 2 ** 255)
+    insert_execution(db, 'execution-2', 'strategy-1', 12345, updated_days_ago=3)
+    client = exporter.app.test_client()
+
+    first = client.post('/export')
+    second = client.post('/export')
+
+    assert first.status_code == 200
+    assert first.get_json()['results']['strategy_executions']['rows'] == 2
+    assert second.get_json()['results']['strategy_executions']['rows'] == 0
+    files, rows = read_export(exporter.EXPORT_ROOT, 'strategy_executions')
+    assert len(files) == 2
+    assert {row['id']: row['amount_out'] for row in rows} == {'execution-1': str(2 ** 255), 'execution-2': '12345'}
+    assert {row['asset'] for row in rows} == {'ETH'}
+    assert not glob.glob(os.path.join(exporter.EXPORT_ROOT, '**', '_part-*'), recursive=True)
+
+@pytest.fixture
+def routing(exporter, monkeypatch):
+    yield lambda read_dsn: testing.reset_read_routing(monkeypatch, read_dsn)
+    testing.close_replica_pool()
+
+def test_export_scans_read_from_the_replica(exporter, db, routing):
+    routing(testing.get_replica_dsn())
+    testing.seed_strategy(db, 'strategy-1')
+    insert_execution(db, 'execution-1', 'strategy-1', 1)
+
+    response = exporter.app.test_client().post('/export')
+
+    assert response.get_json()['results']['strategy_executions']['rows'] == 1
+    assert shared_db.get_read_routing_metrics()['replica'] == 2
+
+def test_export_is_deferred_while_the_replica_is_unusable(exporter, db, routing):
+    routing('host=/nonexistent dbname=replica connect_timeout=1')
+    testing.seed_strategy(db, 'strategy-1')
+    insert_execution(db, 'execution-1', 'strategy-1', 1)
+
+    results = exporter.app.test_client().post('/export').get_json()['results']
+
+    assert results['strategy_executions'] == {'rows': 0, 'files': 0, 'watermark': 0, 'deferred': True}
+    assert exporter.get_export_watermark('strategy_executions') == 0
+    assert read_export(exporter.EXPORT_ROOT, 'strategy_executions') == ([], [])
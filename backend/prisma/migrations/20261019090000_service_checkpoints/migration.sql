@@ -0,0 +1,8 @@
+-- CreateTable
+CREATE TABLE "service_checkpoints" (
+    "name" VARCHAR(100) NOT NULL,
+    "position" BIGINT NOT NULL,
+    "updated_at" TIMESTAMP(3) NOT NULL,
+
+    CONSTRAINT "service_checkpoints_pkey" PRIMARY KEY ("name")
+);
@@ -0,0 +1,6 @@
+-- AlterTable
+ALTER TABLE "strategy_executions" ADD COLUMN     "next_check_at" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP;
+
+-- CreateIndex (partial: only rows the transaction monitor still has to check)
+CREATE INDEX "strategy_executions_pending_next_check_at_idx" ON "strategy_executions"("next_check_at")
+WHERE "status" IN ('EXECUTING', 'PENDING') AND "transaction_hash" IS NOT NULL;
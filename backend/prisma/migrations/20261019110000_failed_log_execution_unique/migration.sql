@@ -0,0 +1,8 @@
+-- Remove duplicate failure logs per execution before enforcing uniqueness
+DELETE FROM "failed_transaction_logs" a
+USING "failed_transaction_logs" b
+WHERE a."execution_id" = b."execution_id"
+  AND a."id" > b."id";
+
+-- CreateIndex
+CREATE UNIQUE INDEX "failed_transaction_logs_execution_id_key" ON "failed_transaction_logs"("execution_id");
@@ -0,0 +1,13 @@
+-- CreateTable
+CREATE TABLE "wallet_asset_rollups" (
+    "wallet_address" VARCHAR(42) NOT NULL,
+    "asset" "ASSET_TYPE" NOT NULL,
+    "confirmed_executions" INTEGER NOT NULL DEFAULT 0,
+    "total_amount_in" BIGINT NOT NULL DEFAULT 0,
+    "total_amount_out" DECIMAL(78,0) NOT NULL DEFAULT 0,
+    "total_gas_cost" DECIMAL(78,0) NOT NULL DEFAULT 0,
+    "last_confirmed_at" TIMESTAMP(3),
+    "updated_at" TIMESTAMP(3) NOT NULL,
+
+    CONSTRAINT "wallet_asset_rollups_pkey" PRIMARY KEY ("wallet_address","asset")
+);
@@ -0,0 +1,3 @@
+-- AlterTable
+ALTER TABLE "strategy_executions" ADD COLUMN     "broadcast_at" TIMESTAMP(3),
+ADD COLUMN     "due_at" TIMESTAMP(3);
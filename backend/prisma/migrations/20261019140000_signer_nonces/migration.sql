@@ -0,0 +1,8 @@
+-- CreateTable
+CREATE TABLE "signer_nonces" (
+    "address" VARCHAR(42) NOT NULL,
+    "next_nonce" BIGINT NOT NULL,
+    "updated_at" TIMESTAMP(3) NOT NULL,
+
+    CONSTRAINT "signer_nonces_pkey" PRIMARY KEY ("address")
+);
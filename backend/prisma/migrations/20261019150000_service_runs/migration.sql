@@ -0,0 +1,15 @@
+-- CreateTable
+CREATE TABLE "service_runs" (
+    "id" TEXT NOT NULL,
+    "service" VARCHAR(50) NOT NULL,
+    "run_type" VARCHAR(50) NOT NULL,
+    "status" VARCHAR(20) NOT NULL,
+    "error_message" TEXT,
+    "started_at" TIMESTAMP(3) NOT NULL,
+    "finished_at" TIMESTAMP(3),
+
+    CONSTRAINT "service_runs_pkey" PRIMARY KEY ("id")
+);
+
+-- CreateIndex
+CREATE INDEX "service_runs_service_run_type_status_idx" ON "service_runs"("service", "run_type", "status");
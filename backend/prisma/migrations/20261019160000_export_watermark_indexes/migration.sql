@@ -0,0 +1,5 @@
+-- CreateIndex (watermark scans of the analytics exporter)
+CREATE INDEX "strategy_executions_updated_at_idx" ON "strategy_executions"("updated_at");
+
+-- CreateIndex
+CREATE INDEX "failed_transaction_logs_created_at_idx" ON "failed_transaction_logs"("created_at");
@@ -0,0 +1,3 @@
+-- CreateIndex (partial: executions parked for a retry, by the time their backoff ends)
+CREATE INDEX "strategy_executions_retrying_next_check_at_idx" ON "strategy_executions"("next_check_at")
+WHERE "status" = 'RETRYING';
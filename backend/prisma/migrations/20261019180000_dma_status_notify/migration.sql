@@ -0,0 +1,39 @@
+-- CreateFunction (announce a change of an asset's latest DMA status to the spot buyer daemon)
+CREATE FUNCTION "notify_dma_status_changed"() RETURNS trigger AS $$
+DECLARE
+    previous_status "DMA_STATUS";
+BEGIN
+    -- Backfilled rows older than the latest one do not change the current status
+    IF EXISTS (
+        SELECT 1 FROM "dma_status"
+        WHERE "asset" = NEW."asset" AND "calculated_at" > NEW."calculated_at"
+    ) THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP = 'UPDATE' THEN
+        previous_status := OLD."status";
+    ELSE
+        SELECT "status" INTO previous_status FROM "dma_status"
+        WHERE "asset" = NEW."asset" AND "calculated_at" < NEW."calculated_at"
+        ORDER BY "calculated_at" DESC
+        LIMIT 1;
+    END IF;
+
+    IF previous_status IS DISTINCT FROM NEW."status" THEN
+        PERFORM pg_notify('dma_status_changed', json_build_object(
+            'asset', NEW."asset",
+            'status', NEW."status",
+            'previous_status', previous_status,
+            'calculated_at', NEW."calculated_at"
+        )::text);
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- CreateTrigger
+CREATE TRIGGER "dma_status_changed"
+AFTER INSERT OR UPDATE OF "status" ON "dma_status"
+FOR EACH ROW EXECUTE FUNCTION "notify_dma_status_changed"();
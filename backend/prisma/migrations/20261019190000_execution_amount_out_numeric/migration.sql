@@ -0,0 +1,2 @@
+-- AlterTable (received amounts of 18 decimal tokens can exceed BIGINT)
+ALTER TABLE "strategy_executions" ALTER COLUMN "amount_out" SET DATA TYPE DECIMAL(78,0);
@@ -0,0 +1,58 @@
+-- Optional time-partitioned layout for "failed_transaction_logs".
+--
+-- Not a Prisma migration: run it manually, then set FAILED_LOGS_PARTITIONED=true on the
+-- transaction monitor. Retention then drops whole daily partitions instead of deleting rows and
+-- expires old rows in the DEFAULT partition. Once a day the monitor pre-creates the partitions
+-- for the coming week, moving any rows DEFAULT already holds for a new day into its partition.
+--
+-- Postgres requires unique constraints on a partitioned table to include the partition key,
+-- so the unique index becomes ("execution_id", "failed_at"). One log per execution is kept by
+-- the inserts themselves: each skips executions that already have a log (NOT EXISTS) on top
+-- of ON CONFLICT DO NOTHING.
+
+BEGIN;
+
+ALTER TABLE "failed_transaction_logs" RENAME TO "failed_transaction_logs_unpartitioned";
+
+CREATE TABLE "failed_transaction_logs" (
+    LIKE "failed_transaction_logs_unpartitioned" INCLUDING DEFAULTS
+) PARTITION BY RANGE ("failed_at");
+
+-- Catch-all for rows outside the pre-created daily partitions
+CREATE TABLE "failed_transaction_logs_default" PARTITION OF "failed_transaction_logs" DEFAULT;
+
+-- Daily partitions covering the 14 day retention window and the coming week
+DO $$
+DECLARE
+    day DATE;
+BEGIN
+    FOR day IN SELECT generate_series(CURRENT_DATE - 14, CURRENT_DATE + 7, INTERVAL '1 day')::DATE LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF "failed_transaction_logs" FOR VALUES FROM (%L) TO (%L)',
+            'failed_transaction_logs_p' || to_char(day, 'YYYYMMDD'), day, day + 1
+        );
+    END LOOP;
+END $$;
+
+INSERT INTO "failed_transaction_logs"
+SELECT * FROM "failed_transaction_logs_unpartitioned"
+WHERE "failed_at" >= CURRENT_DATE - 14;
+
+DROP TABLE "failed_transaction_logs_unpartitioned";
+
+ALTER TABLE "failed_transaction_logs" ADD CONSTRAINT "failed_transaction_logs_pkey" PRIMARY KEY ("id", "failed_at");
+
+CREATE UNIQUE INDEX "failed_transaction_logs_execution_id_key" ON "failed_transaction_logs"("execution_id", "failed_at");
+
+CREATE INDEX "failed_transaction_logs_wallet_address_idx" ON "failed_transaction_logs"("wallet_address");
+
+CREATE INDEX "failed_transaction_logs_failed_at_idx" ON "failed_transaction_logs"("failed_at");
+
+CREATE INDEX "failed_transaction_logs_alert_sent_idx" ON "failed_transaction_logs"("alert_sent");
+
+-- Watermark scans of the analytics exporter
+CREATE INDEX "failed_transaction_logs_created_at_idx" ON "failed_transaction_logs"("created_at");
+
+ALTER TABLE "failed_transaction_logs" ADD CONSTRAINT "failed_transaction_logs_strategy_id_fkey" FOREIGN KEY ("strategy_id") REFERENCES "user_strategies"("id") ON DELETE CASCADE ON UPDATE CASCADE;
+
+COMMIT;
@@ -14,6 +14,7 @@ gcloud services enable cloudscheduler.googleapis.com
 echo "Getting Cloud Run service URLs..."
 SPOT_BUYER_URL=$(gcloud run services describe spot-buyer --region=$REGION --format='value(status.url)')
 MONITOR_URL=$(gcloud run services describe transaction-monitor --region=$REGION --format='value(status.url)')
+EXPORTER_URL=$(gcloud run services describe analytics-exporter --region=$REGION --format='value(status.url)')
 
 if [ -z "$SPOT_BUYER_URL" ]; then
     echo "ERROR: Could not get spot-buyer service URL. Make sure it's deployed first."
@@ -25,8 +26,14 @@ if [ -z "$MONITOR_URL" ]; then
     exit 1
 fi
 
+if [ -z "$EXPORTER_URL" ]; then
+    echo "ERROR: Could not get analytics-exporter service URL. Make sure it's deployed first."
+    exit 1
+fi
+
 echo "Spot Buyer URL: $SPOT_BUYER_URL"
 echo "Transaction Monitor URL: $MONITOR_URL"
+echo "Analytics Exporter URL: $EXPORTER_URL"
 
 # Create Spot Buyer scheduled job (every hour)
 echo "Creating Spot Buyer scheduled job (every hour)..."
@@ -35,6 +42,7 @@ gcloud scheduler jobs create http spot-buyer-hourly \
     --schedule="0 * * * *" \
     --uri="${SPOT_BUYER_URL}/execute" \
     --http-method=POST \
+    --attempt-deadline=900s \
     --headers="Content-Type=application/json" \
     --message-body='{}' \
     --time-zone="UTC" \
@@ -54,12 +62,45 @@ gcloud scheduler jobs create http transaction-monitor-30min \
     --description="Monitor transaction confirmations every 30 minutes" \
     --project=$PROJECT_ID
 
+# The exporter does not allow unauthenticated calls: its job signs requests with an OIDC token of a
+# dedicated invoker service account
+EXPORTER_INVOKER_NAME="analytics-exporter-invoker"
+EXPORTER_INVOKER_EMAIL="${EXPORTER_INVOKER_NAME}@${PROJECT_ID}.iam.gserviceaccount.com"
+if ! gcloud iam service-accounts describe $EXPORTER_INVOKER_EMAIL --project=$PROJECT_ID > /dev/null 2>&1; then
+    echo "Creating service account $EXPORTER_INVOKER_EMAIL..."
+    gcloud iam service-accounts create $EXPORTER_INVOKER_NAME \
+        --display-name="Analytics Exporter scheduler invoker" \
+        --project=$PROJECT_ID
+fi
+gcloud run services add-iam-policy-binding analytics-exporter \
+    --region=$REGION \
+    --member="serviceAccount:$EXPORTER_INVOKER_EMAIL" \
+    --role="roles/run.invoker" \
+    --project=$PROJECT_ID
+
+# Create Analytics Exporter scheduled job (every hour, between the spot buyer runs)
+echo "Creating Analytics Exporter scheduled job (every hour at :30)..."
+gcloud scheduler jobs create http analytics-exporter-hourly \
+    --location=$REGION \
+    --schedule="30 * * * *" \
+    --uri="${EXPORTER_URL}/export" \
+    --http-method=POST \
+    --oidc-service-account-email=$EXPORTER_INVOKER_EMAIL \
+    --oidc-token-audience="${EXPORTER_URL}" \
+    --attempt-deadline=900s \
+    --headers="Content-Type=application/json" \
+    --message-body='{}' \
+    --time-zone="UTC" \
+    --description="Export executions and failures to Parquet for analytics every hour" \
+    --project=$PROJECT_ID
+
 echo ""
 echo "✅ Scheduled jobs created successfully!"
 echo ""
 echo "📋 Summary:"
-echo "  • Spot Buyer: Runs every hour (0 * * * *)"
+echo "  • Spot Buyer: Runs every hour (0 * * * *), spreading executions over EXECUTION_SPREAD_WINDOW_SECONDS"
 echo "  • Transaction Monitor: Runs every 30 minutes (*/30 * * * *)"
+echo "  • Analytics Exporter: Runs every hour at :30 (30 * * * *), writing Parquet to EXPORT_ROOT"
 echo ""
 echo "🔧 Management commands:"
 echo "  • List jobs: gcloud scheduler jobs list --location=$REGION"
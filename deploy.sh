@@ -7,6 +7,14 @@ echo "Deploying to Google Cloud Run..."
 echo "Project: $PROJECT_ID"
 echo "Region: $REGION"
 
+# The services import shared/spotmf_shared; each service directory gets a copy for its image build
+SERVICES="spot-buyer transaction-monitor analytics-exporter"
+for SERVICE in $SERVICES; do
+    rm -rf "./$SERVICE/spotmf_shared"
+    cp -r ./shared/spotmf_shared "./$SERVICE/spotmf_shared"
+done
+trap 'for SERVICE in $SERVICES; do rm -rf "./$SERVICE/spotmf_shared"; done' EXIT
+
 # Deploy Spot Buyer Service
 echo "Building and deploying Spot Buyer..."
 gcloud run deploy spot-buyer \
@@ -20,6 +28,23 @@ gcloud run deploy spot-buyer \
     --max-instances 10 \
     --project $PROJECT_ID
 
+# Spot Buyer DMA daemon: the same image started with --daemon, kept running so DMA flips are
+# executed as they happen. CPU stays allocated between requests for the listener thread.
+echo "Building and deploying Spot Buyer DMA daemon..."
+gcloud run deploy spot-buyer-dma-daemon \
+    --source ./spot-buyer \
+    --platform managed \
+    --region $REGION \
+    --no-allow-unauthenticated \
+    --memory 1Gi \
+    --cpu 1 \
+    --no-cpu-throttling \
+    --min-instances 1 \
+    --max-instances 1 \
+    --command python \
+    --args main.py,--daemon \
+    --project $PROJECT_ID
+
 # Deploy Transaction Monitor Service  
 echo "Building and deploying Transaction Monitor..."
 gcloud run deploy transaction-monitor \
@@ -33,4 +58,35 @@ gcloud run deploy transaction-monitor \
     --max-instances 5 \
     --project $PROJECT_ID
 
+# Transaction Monitor newHeads daemon, deployed the same way; the 30 minute schedule stays as a backstop
+echo "Building and deploying Transaction Monitor daemon..."
+gcloud run deploy transaction-monitor-daemon \
+    --source ./transaction-monitor \
+    --platform managed \
+    --region $REGION \
+    --no-allow-unauthenticated \
+    --memory 512Mi \
+    --cpu 1 \
+    --no-cpu-throttling \
+    --min-instances 1 \
+    --max-instances 1 \
+    --command python \
+    --args main.py,--daemon \
+    --project $PROJECT_ID
+
+# Deploy Analytics Exporter Service. /export writes to the analytics bucket, so only Cloud Scheduler's
+# invoker service account may call it (see cloud-scheduler=setup.sh)
+echo "Building and deploying Analytics Exporter..."
+gcloud run deploy analytics-exporter \
+    --source ./analytics-exporter \
+    --platform managed \
+    --region $REGION \
+    --no-allow-unauthenticated \
+    --memory 1Gi \
+    --cpu 1 \
+    --timeout 900 \
+    --max-instances 1 \
+    --set-env-vars EXPORT_ROOT=gs://$PROJECT_ID-analytics/exports \
+    --project $PROJECT_ID
+
 echo "Deployment completed!"
\ No newline at end of file
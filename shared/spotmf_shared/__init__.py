@@ -0,0 +1,13 @@
+"""Code shared by the Spotmf Python services.
+
+The services deploy from their own directories, so deploy.sh copies this package into each
+service before building its image; a repository checkout imports it from shared/.
+"""
+
+# Name of the running service, used for single-flight run records and trace spans
+service_name = None
+
+def configure_service(name: str):
+    """Set the service name once at import time of the service's main module"""
+    global service_name
+    service_name = name
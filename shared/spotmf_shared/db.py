@@ -0,0 +1,220 @@
+import os
+import logging
+import threading
+import time
+import psycopg2
+from psycopg2 import pool
+from typing import Dict, Optional
+
+from spotmf_shared.secret_manager import get_secret
+
+logger = logging.getLogger(__name__)
+
+# Database connection pool
+DB_POOL_MAX_CONNECTIONS = int(os.environ.get('DB_POOL_MAX_CONNECTIONS', 8))
+
+class PreparedStatementConnection(psycopg2.extensions.connection):
+    """Connection that remembers which registry statements are prepared on it"""
+    is_replica = False
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared_statements = set()
+
+db_pool = None
+db_pool_lock = threading.Lock()
+
+def get_db_pool() -> pool.ThreadedConnectionPool:
+    """Create the connection pool on first use"""
+    global db_pool
+    with db_pool_lock:
+        if db_pool is None:
+            db_pool = pool.ThreadedConnectionPool(
+                1,
+                DB_POOL_MAX_CONNECTIONS,
+                connection_factory=PreparedStatementConnection,
+                **get_db_settings()
+            )
+    return db_pool
+
+def get_db_settings() -> Dict:
+    """Connection settings shared by the pool and dedicated LISTEN connections"""
+    return {
+        'host': get_secret('db-host'),
+        'database': get_secret('db-name'),
+        'user': get_secret('db-user'),
+        'password': get_secret('db-password'),
+        'port': 5432
+    }
+
+def get_db_connection():
+    return get_db_pool().getconn()
+
+def release_db_connection(conn):
+    """Return a connection to the pool, discarding any open transaction"""
+    connection_pool = replica_pool if conn.is_replica else get_db_pool()
+    if conn.closed:
+        connection_pool.putconn(conn, close=True)
+        return
+    if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+        conn.rollback()
+    connection_pool.putconn(conn)
+
+# Read replica routing: pure reads go to the db-read-dsn replica while it is within
+# REPLICA_MAX_LAG_SECONDS of the primary and has replayed the primary WAL position noted at the
+# start of the run (read-your-writes); otherwise they fall back to the primary
+REPLICA_MAX_LAG_SECONDS = float(os.environ.get('REPLICA_MAX_LAG_SECONDS', 5))
+REPLICA_STATUS_TTL_SECONDS = float(os.environ.get('REPLICA_STATUS_TTL_SECONDS', 2))
+
+class ReplicaConnection(PreparedStatementConnection):
+    """Pooled connection to the read replica"""
+    is_replica = True
+
+replica_pool = None
+replica_configured = None
+replica_status = {'checked_at': 0.0, 'lag_seconds': None, 'replay_lsn': 0}
+required_read_lsn = 0
+read_routing_stats = {'replica': 0, 'primary_unconfigured': 0, 'primary_unavailable': 0, 'primary_lag': 0,
+                      'primary_behind_writes': 0}
+read_routing_lock = threading.Lock()
+
+def parse_lsn(lsn: str) -> int:
+    """pg_lsn text ('16/B374D848') as a comparable integer"""
+    high, low = lsn.split('/')
+    return (int(high, 16) << 32) | int(low, 16)
+
+def note_write_position(lsn: str):
+    """Require routed reads from now on to reflect the primary up to this WAL position"""
+    global required_read_lsn
+    with read_routing_lock:
+        required_read_lsn = max(required_read_lsn, parse_lsn(lsn))
+
+def get_replica_pool() -> Optional[pool.ThreadedConnectionPool]:
+    """Create the replica pool on first use, or None when no read DSN is configured"""
+    global replica_pool, replica_configured
+    with db_pool_lock:
+        if replica_configured is None:
+            read_dsn = get_secret('db-read-dsn')
+            if read_dsn:
+                replica_pool = pool.ThreadedConnectionPool(
+                    1,
+                    DB_POOL_MAX_CONNECTIONS,
+                    dsn=read_dsn,
+                    connection_factory=ReplicaConnection
+                )
+            replica_configured = bool(read_dsn)
+    return replica_pool
+
+def get_replica_status(conn, required_lsn: int) -> Dict:
+    """Replica lag and replayed WAL position, cached for REPLICA_STATUS_TTL_SECONDS"""
+    with read_routing_lock:
+        status = dict(replica_status)
+    if time.monotonic() - status['checked_at'] < REPLICA_STATUS_TTL_SECONDS and status['replay_lsn'] >= required_lsn:
+        return status
+    
+    with conn.cursor() as cursor:
+        # Caught up (everything received is replayed) counts as no lag, even when the primary is idle
+        cursor.execute("""
+            SELECT CASE
+                       WHEN NOT pg_is_in_recovery() THEN 0
+                       WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                       ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+                   END::float8,
+                   (CASE WHEN pg_is_in_recovery() THEN pg_last_wal_replay_lsn() ELSE pg_current_wal_lsn() END)::text
+        """)
+        lag_seconds, replay_lsn = cursor.fetchone()
+    conn.commit()
+    
+    status = {'checked_at': time.monotonic(), 'lag_seconds': lag_seconds, 'replay_lsn': parse_lsn(replay_lsn) if replay_lsn else 0}
+    with read_routing_lock:
+        replica_status.update(status)
+    return status
+
+def get_read_connection():
+    """Connection for a pure read: the replica when it is fresh enough, otherwise the primary"""
+    reason = 'primary_unconfigured'
+    try:
+        replica = get_replica_pool()
+        if replica:
+            conn = replica.getconn()
+            try:
+                with read_routing_lock:
+                    required_lsn = required_read_lsn
+                status = get_replica_status(conn, required_lsn)
+            except Exception:
+                replica.putconn(conn, close=True)
+                raise
+            
+            if status['lag_seconds'] is None or status['lag_seconds'] > REPLICA_MAX_LAG_SECONDS:
+                reason = 'primary_lag'
+            elif status['replay_lsn'] < required_lsn:
+                reason = 'primary_behind_writes'
+            else:
+                reason = 'replica'
+            
+            if reason == 'replica':
+                with read_routing_lock:
+                    read_routing_stats['replica'] += 1
+                return conn
+            release_db_connection(conn)
+            
+    except Exception as e:
+        logger.warning(f"Read replica unavailable, reading from the primary: {str(e)}")
+        reason = 'primary_unavailable'
+    
+    with read_routing_lock:
+        read_routing_stats[reason] += 1
+    return get_db_connection()
+
+def get_read_routing_metrics() -> Dict:
+    """Routed read counts by target and fallback reason, plus the last replica status"""
+    with read_routing_lock:
+        return dict(read_routing_stats, replica_lag_seconds=replica_status['lag_seconds'])
+
+# Hot statements of the service, prepared once per pooled connection and then EXECUTEd
+statement_registry = {}
+statement_stats = {}
+statement_stats_lock = threading.Lock()
+
+def register_statements(statements: Dict[str, str]):
+    """Add the service's statements to the registry used by execute_prepared"""
+    with statement_stats_lock:
+        statement_registry.update(statements)
+        for name in statements:
+            statement_stats.setdefault(name, {'calls': 0, 'prepares': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+
+def execute_prepared(cursor, name: str, params: tuple = ()):
+    """Execute a registry statement, preparing it on this connection first if needed"""
+    conn = cursor.connection
+    prepared = False
+    if name not in conn.prepared_statements:
+        cursor.execute(f"PREPARE {name} AS {statement_registry[name]}")
+        conn.prepared_statements.add(name)
+        prepared = True
+    
+    started = time.perf_counter()
+    if params:
+        cursor.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+    else:
+        cursor.execute(f"EXECUTE {name}")
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    
+    with statement_stats_lock:
+        stats = statement_stats[name]
+        stats['calls'] += 1
+        stats['prepares'] += int(prepared)
+        stats['total_ms'] += elapsed_ms
+        stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+
+def get_statement_metrics() -> Dict[str, Dict]:
+    """Per-statement call counts and latency"""
+    with statement_stats_lock:
+        return {
+            name: {
+                'calls': stats['calls'],
+                'prepares': stats['prepares'],
+                'avg_ms': round(stats['total_ms'] / stats['calls'], 3) if stats['calls'] else 0.0,
+                'max_ms': round(stats['max_ms'], 3)
+            }
+            for name, stats in statement_stats.items()
+        }
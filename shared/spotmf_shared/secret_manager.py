@@ -0,0 +1,26 @@
+import os
+import logging
+from google.cloud import secretmanager
+
+logger = logging.getLogger(__name__)
+
+# Initialize Secret Manager client lazily so local runs can rely on overrides only
+secret_client = None
+project_id = os.environ.get('GOOGLE_CLOUD_PROJECT')
+
+def get_secret(secret_id):
+    """Get secret from Google Secret Manager, or from SECRET_<ID> when set for local runs"""
+    global secret_client
+    override = os.environ.get('SECRET_' + secret_id.upper().replace('-', '_'))
+    if override is not None:
+        return override
+    
+    try:
+        if secret_client is None:
+            secret_client = secretmanager.SecretManagerServiceClient()
+        name = f"projects/{project_id}/secrets/{secret_id}/versions/latest"
+        response = secret_client.access_secret_version(request={"name": name})
+        return response.payload.data.decode("UTF-8")
+    except Exception as e:
+        logger.error(f"Error accessing secret {secret_id}: {e}")
+        return None
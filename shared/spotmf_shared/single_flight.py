@@ -0,0 +1,118 @@
+import hashlib
+import logging
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+import spotmf_shared
+from spotmf_shared.db import get_db_connection, release_db_connection, note_write_position
+
+logger = logging.getLogger(__name__)
+
+# Single-flight guard: at most one run per service and run type, held as a session-level advisory
+# lock for the length of the run and recorded in service_runs
+single_flight_stats = {}
+single_flight_stats_lock = threading.Lock()
+
+def get_advisory_lock_key(run_type: str) -> int:
+    """Signed 64-bit advisory lock key for a service run type"""
+    digest = hashlib.sha256(f'{spotmf_shared.service_name}:{run_type}'.encode()).digest()
+    return int.from_bytes(digest[:8], 'big', signed=True)
+
+class SingleFlightRun:
+    """A claimed run, holding its advisory lock on a dedicated pooled connection until finished"""
+    
+    def __init__(self, run_type: str, run_id: str, conn):
+        self.run_type = run_type
+        self.run_id = run_id
+        self.conn = conn
+        self.started = time.monotonic()
+        self.status = 'COMPLETED'
+        self.error_message = None
+    
+    def fail(self, error_message: str):
+        self.status = 'FAILED'
+        self.error_message = error_message
+    
+    def finish(self):
+        """Record the outcome and release the lock"""
+        hold_ms = (time.monotonic() - self.started) * 1000
+        try:
+            with self.conn.cursor() as cursor:
+                cursor.execute("""
+                    UPDATE service_runs SET status = %s, error_message = %s, finished_at = %s WHERE id = %s
+                """, (self.status, self.error_message, datetime.now(), self.run_id))
+                cursor.execute("SELECT pg_advisory_unlock(%s)", (get_advisory_lock_key(self.run_type),))
+                self.conn.commit()
+        except Exception as e:
+            # Session locks outlive transactions: never hand a possibly locked connection back to the pool
+            logger.error(f"Could not release the {self.run_type} run lock cleanly: {str(e)}")
+            self.conn.close()
+        finally:
+            release_db_connection(self.conn)
+        
+        with single_flight_stats_lock:
+            stats = single_flight_stats[self.run_type]
+            stats['running_id'] = None
+            stats['last_hold_ms'] = round(hold_ms, 3)
+            stats['max_hold_ms'] = round(max(stats['max_hold_ms'], hold_ms), 3)
+
+def begin_single_flight_run(run_type: str) -> Tuple[Optional[SingleFlightRun], Optional[str]]:
+    """Claim the run type, or return (None, id of the run in progress) when another caller holds it"""
+    service_name = spotmf_shared.service_name
+    with single_flight_stats_lock:
+        stats = single_flight_stats.setdefault(run_type, {
+            'acquired': 0, 'contended': 0, 'running_id': None, 'last_hold_ms': 0.0, 'max_hold_ms': 0.0
+        })
+    
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT pg_try_advisory_lock(%s), pg_current_wal_lsn()::text", (get_advisory_lock_key(run_type),))
+            acquired, write_lsn = cursor.fetchone()
+            
+            if not acquired:
+                cursor.execute("""
+                    SELECT id FROM service_runs
+                    WHERE service = %s AND run_type = %s AND status = 'RUNNING'
+                    ORDER BY started_at DESC LIMIT 1
+                """, (service_name, run_type))
+                row = cursor.fetchone()
+                release_db_connection(conn)
+                with single_flight_stats_lock:
+                    stats['contended'] += 1
+                return None, row[0] if row else None
+            
+            # Routed reads of this run must see everything committed before it, e.g. the previous
+            # run's status updates
+            note_write_position(write_lsn)
+            
+            # Holding the lock, any RUNNING row left behind belongs to a run that died
+            now = datetime.now()
+            run_id = str(uuid.uuid4())
+            cursor.execute("""
+                UPDATE service_runs SET status = 'ABANDONED', finished_at = %s
+                WHERE service = %s AND run_type = %s AND status = 'RUNNING'
+            """, (now, service_name, run_type))
+            cursor.execute("""
+                INSERT INTO service_runs (id, service, run_type, status, started_at)
+                VALUES (%s, %s, %s, 'RUNNING', %s)
+            """, (run_id, service_name, run_type, now))
+            conn.commit()
+            
+    except Exception:
+        conn.close()
+        release_db_connection(conn)
+        raise
+    
+    with single_flight_stats_lock:
+        stats['acquired'] += 1
+        stats['running_id'] = run_id
+    return SingleFlightRun(run_type, run_id, conn), None
+
+def get_single_flight_metrics() -> Dict[str, Dict]:
+    """Lock acquisitions, contention and hold times per run type"""
+    with single_flight_stats_lock:
+        return {run_type: dict(stats) for run_type, stats in single_flight_stats.items()}
@@ -0,0 +1,127 @@
+"""Scratch database helpers for the services' pytest suites.
+
+Each suite creates a throwaway database from the Prisma migrations on the Postgres server named
+by TEST_DB_HOST (plus TEST_DB_USER / TEST_DB_PASSWORD) and drops it afterwards; the suites skip
+when TEST_DB_HOST is not set.
+"""
+import os
+import uuid
+from typing import Dict, Optional
+
+import psycopg2
+
+from spotmf_shared import db
+
+MIGRATIONS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'backend', 'prisma', 'migrations')
+
+def get_test_db_settings() -> Optional[Dict]:
+    """Connection settings of the scratch server, or None when TEST_DB_HOST is not set"""
+    host = os.environ.get('TEST_DB_HOST')
+    if not host:
+        return None
+    return {
+        'host': host,
+        'user': os.environ.get('TEST_DB_USER', 'postgres'),
+        'password': os.environ.get('TEST_DB_PASSWORD', ''),
+        'port': 5432
+    }
+
+def create_scratch_database(settings: Dict) -> str:
+    """Create a database with every migration applied and return its name"""
+    name = f'spotmf_test_{uuid.uuid4().hex[:12]}'
+    admin = psycopg2.connect(database='postgres', **settings)
+    try:
+        admin.autocommit = True
+        with admin.cursor() as cursor:
+            cursor.execute(f'CREATE DATABASE {name}')
+    finally:
+        admin.close()
+
+    conn = psycopg2.connect(database=name, **settings)
+    try:
+        with conn.cursor() as cursor:
+            for migration in sorted(os.listdir(MIGRATIONS_PATH)):
+                path = os.path.join(MIGRATIONS_PATH, migration, 'migration.sql')
+                if os.path.isfile(path):
+                    with open(path) as migration_file:
+                        cursor.execute(migration_file.read())
+
+            # Prisma generates ids client-side; the services insert rows and let the database pick them
+            cursor.execute("""
+                SELECT table_name FROM information_schema.columns
+                WHERE table_schema = 'public' AND column_name = 'id' AND data_type = 'text'
+            """)
+            for (table,) in cursor.fetchall():
+                cursor.execute(f'ALTER TABLE "{table}" ALTER COLUMN id SET DEFAULT md5(random()::text)')
+        conn.commit()
+    finally:
+        conn.close()
+    return name
+
+def drop_scratch_database(settings: Dict, name: str):
+    """Drop a scratch database, closing whatever connections are still open on it"""
+    admin = psycopg2.connect(database='postgres', **settings)
+    try:
+        admin.autocommit = True
+        with admin.cursor() as cursor:
+            cursor.execute("SELECT pg_terminate_backend(pid) FROM pg_stat_activity WHERE datname = %s", (name,))
+            cursor.execute(f'DROP DATABASE IF EXISTS {name}')
+    finally:
+        admin.close()
+
+def apply_sql_file(settings: Dict, name: str, path: str):
+    """Run a SQL script that manages its own transactions, such as the optional layouts in backend/prisma/sql"""
+    conn = psycopg2.connect(database=name, **settings)
+    try:
+        conn.autocommit = True
+        with conn.cursor() as cursor, open(path) as sql_file:
+            cursor.execute(sql_file.read())
+    finally:
+        conn.close()
+
+def use_database(monkeypatch, name: str):
+    """Point the connection pool at another scratch database; close_db_pool releases it again"""
+    monkeypatch.setenv('SECRET_DB_NAME', name)
+    monkeypatch.setattr(db, 'db_pool', None)
+
+def close_db_pool():
+    if db.db_pool is not None:
+        db.db_pool.closeall()
+
+def seed_strategy(cursor, strategy_id: str, asset: str = 'BTC', strategy_type: str = 'DCA',
+                  interval_amount: int = 10 ** 6, interval_days: int = 1, last_executed_at=None) -> str:
+    """Insert an active strategy with its user and action nonce, returning the owner's wallet address"""
+    wallet_address = '0x' + uuid.uuid5(uuid.NAMESPACE_OID, strategy_id).hex.ljust(40, '0')
+    cursor.execute("""
+        INSERT INTO users (id, wallet_address, updated_at) VALUES (%s, %s, now())
+    """, (f'user-{strategy_id}', wallet_address))
+    cursor.execute("""
+        INSERT INTO action_nonces (id, wallet_address, nonce, action, strategy_type, asset, interval_amount,
+                                   interval_days, accepted_slippage, total_amount, expires_at)
+        VALUES (%s, %s, %s, 'CREATE_STRATEGY', %s, %s, %s, %s, 1.0, %s, now() + interval '1 day')
+    """, (f'nonce-{strategy_id}', wallet_address, f'nonce-{strategy_id}', strategy_type, asset,
+          interval_amount, interval_days, interval_amount * 100))
+    cursor.execute("""
+        INSERT INTO user_strategies (id, wallet_address, action_nonce_id, status, "isActive", updated_at, last_executed_at)
+        VALUES (%s, %s, %s, 'ACTIVE', true, now(), %s)
+    """, (strategy_id, wallet_address, f'nonce-{strategy_id}', last_executed_at))
+    return wallet_address
+
+def reset_read_routing(monkeypatch, read_dsn: Optional[str]):
+    """Start routed reads over with the given db-read-dsn: no replica pool yet and zeroed counters"""
+    monkeypatch.setenv('SECRET_DB_READ_DSN', read_dsn or '')
+    monkeypatch.setattr(db, 'replica_pool', None)
+    monkeypatch.setattr(db, 'replica_configured', None)
+    monkeypatch.setattr(db, 'replica_status', {'checked_at': 0.0, 'lag_seconds': None, 'replay_lsn': 0})
+    monkeypatch.setattr(db, 'required_read_lsn', 0)
+    monkeypatch.setattr(db, 'read_routing_stats', dict.fromkeys(db.read_routing_stats, 0))
+
+def get_replica_dsn() -> str:
+    """DSN of the configured primary, for tests that use it as its own caught-up replica"""
+    settings = db.get_db_settings()
+    dsn = f"host={settings['host']} dbname={settings['database']} user={settings['user']} port={settings['port']}"
+    return dsn + (f" password={settings['password']}" if settings['password'] else '')
+
+def close_replica_pool():
+    if db.replica_pool is not None:
+        db.replica_pool.closeall()
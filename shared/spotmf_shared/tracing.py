@@ -0,0 +1,100 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+from datetime import datetime
+from typing import List, Dict, Optional
+
+import requests
+
+import spotmf_shared
+
+logger = logging.getLogger(__name__)
+
+# Execution tracing: one span per stage, keyed by execution id. Every service derives the trace id
+# from the execution id, so the spot buyer and monitor spans of an execution join into one trace.
+# TRACE_EXPORTER is 'none', 'file' (JSON lines) or 'otlp' (OTLP/HTTP JSON, e.g. a local collector)
+TRACE_EXPORTER = os.environ.get('TRACE_EXPORTER', 'none')
+TRACE_FILE_PATH = os.environ.get('TRACE_FILE_PATH', '/tmp/execution-traces.jsonl')
+TRACE_OTLP_ENDPOINT = os.environ.get('TRACE_OTLP_ENDPOINT', 'http://localhost:4318/v1/traces')
+TRACE_FLUSH_SIZE = 500
+
+span_buffer = []
+span_buffer_lock = threading.Lock()
+
+def get_trace_id(execution_id: str) -> str:
+    """Trace id derived from the execution id, so both services emit into the same trace"""
+    return hashlib.sha256(execution_id.encode()).hexdigest()[:32]
+
+def record_span(execution_id: str, name: str, start: Optional[datetime], end: Optional[datetime],
+                attributes: Optional[Dict] = None):
+    """Buffer one execution stage span for the configured trace exporter"""
+    if TRACE_EXPORTER == 'none' or start is None or end is None:
+        return
+    
+    span = {
+        'trace_id': get_trace_id(execution_id),
+        'span_id': os.urandom(8).hex(),
+        'name': name,
+        'service': spotmf_shared.service_name,
+        'execution_id': execution_id,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'duration_ms': round((end - start).total_seconds() * 1000, 3),
+        'start_unix_nano': int(start.timestamp() * 1e9),
+        'end_unix_nano': int(end.timestamp() * 1e9),
+        'attributes': attributes or {}
+    }
+    with span_buffer_lock:
+        span_buffer.append(span)
+        buffer_full = len(span_buffer) >= TRACE_FLUSH_SIZE
+    if buffer_full:
+        flush_spans()
+
+def flush_spans():
+    """Export buffered spans as JSON lines or as an OTLP/HTTP JSON request"""
+    with span_buffer_lock:
+        spans = list(span_buffer)
+        span_buffer.clear()
+    if not spans:
+        return
+    
+    try:
+        if TRACE_EXPORTER == 'file':
+            with open(TRACE_FILE_PATH, 'a') as trace_file:
+                for span in spans:
+                    trace_file.write(json.dumps({k: v for k, v in span.items() if not k.endswith('_unix_nano')}) + '\n')
+        elif TRACE_EXPORTER == 'otlp':
+            response = requests.post(TRACE_OTLP_ENDPOINT, json=build_otlp_payload(spans), timeout=10)
+            response.raise_for_status()
+    except Exception as e:
+        logger.error(f"Failed to export {len(spans)} trace spans: {str(e)}")
+
+def build_otlp_payload(spans: List[Dict]) -> Dict:
+    """OTLP/HTTP JSON encoding of buffered spans"""
+    def attribute(key, value):
+        return {'key': key, 'value': {'stringValue': str(value)}}
+    
+    return {
+        'resourceSpans': [{
+            'resource': {'attributes': [attribute('service.name', spotmf_shared.service_name)]},
+            'scopeSpans': [{
+                'scope': {'name': 'spotmf.execution'},
+                'spans': [
+                    {
+                        'traceId': span['trace_id'],
+                        'spanId': span['span_id'],
+                        'name': span['name'],
+                        'kind': 1,
+                        'startTimeUnixNano': str(span['start_unix_nano']),
+                        'endTimeUnixNano': str(span['end_unix_nano']),
+                        'attributes': [attribute('execution.id', span['execution_id'])] + [
+                            attribute(key, value) for key, value in span['attributes'].items()
+                        ]
+                    }
+                    for span in spans
+                ]
+            }]
+        }]
+    }
@@ -1,12 +1,36 @@
 import os
 import json
+import hashlib
 import logging
+import random
+import select
+import sys
+import threading
+import time
+from collections import deque
 from flask import Flask, request, jsonify
 import psycopg2
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+import numpy as np
 import requests
-from typing import List, Dict, Optional
-from google.cloud import secretmanager
+from typing import Deque, Iterable, List, Dict, Optional, Tuple
+from eth_account import Account
+from eth_abi import encode as abi_encode, decode as abi_decode
+
+# Shared service code: deploy.sh copies shared/spotmf_shared next to main.py for the image, a
+# checkout imports it from the repository
+SHARED_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'shared')
+if os.path.isdir(SHARED_PATH):
+    sys.path.append(SHARED_PATH)
+
+from spotmf_shared import configure_service
+from spotmf_shared.secret_manager import get_secret
+from spotmf_shared.db import (get_db_connection, release_db_connection, get_db_settings, get_read_connection,
+                              note_write_position, get_read_routing_metrics, register_statements,
+                              execute_prepared, get_statement_metrics)
+from spotmf_shared.single_flight import begin_single_flight_run, get_single_flight_metrics
+from spotmf_shared.tracing import record_span, flush_spans
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -14,133 +38,541 @@ logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
-# Initialize Secret Manager client
-secret_client = secretmanager.SecretManagerServiceClient()
-project_id = os.environ.get('GOOGLE_CLOUD_PROJECT')
+# Enum codes used by the columnar strategy snapshot
+ASSETS = ('BTC', 'ETH', 'HYPE')
+ASSET_CODES = {asset: code for code, asset in enumerate(ASSETS)}
+STRATEGY_TYPES = ('DCA', 'DCA_WITH_DMA')
+STRATEGY_TYPE_CODES = {strategy_type: code for code, strategy_type in enumerate(STRATEGY_TYPES)}
+SECONDS_PER_DAY = 86400
 
-def get_secret(secret_id):
-    """Get secret from Google Secret Manager"""
-    try:
-        name = f"projects/{project_id}/secrets/{secret_id}/versions/latest"
-        response = secret_client.access_secret_version(request={"name": name})
-        return response.payload.data.decode("UTF-8")
-    except Exception as e:
-        logger.error(f"Error accessing secret {secret_id}: {e}")
-        return None
-
-# Database connection
-def get_db_connection():
-    return psycopg2.connect(
-        host=get_secret('db-host'),
-        database=get_secret('db-name'),
-        user=get_secret('db-user'),
-        password=get_secret('db-password'),
-        port=5432
-    )
+# Spread due strategies across a window after the hourly tick instead of firing them all at once.
+# A run stops submitting at its deadline, which leaves the retries and the response inside the
+# 900s Cloud Run request timeout and scheduler attempt deadline; strategies it did not reach are
+# still due and go out on the next tick. The window is fixed so each strategy keeps its offset from
+# run to run; it is capped to half the deadline, which leaves the rate limit the other half.
+EXECUTION_RUN_DEADLINE_SECONDS = float(os.environ.get('EXECUTION_RUN_DEADLINE_SECONDS', 780))
+EXECUTION_SPREAD_WINDOW_SECONDS = min(float(os.environ.get('EXECUTION_SPREAD_WINDOW_SECONDS', 600)),
+                                      EXECUTION_RUN_DEADLINE_SECONDS / 2)
+SUBMISSION_RATE_PER_SECOND = float(os.environ.get('SUBMISSION_RATE_PER_SECOND', 2))
+SUBMISSION_BURST = int(os.environ.get('SUBMISSION_BURST', 5))
+
+# Submitted executions are announced to the transaction monitor daemon on this NOTIFY channel
+EXECUTION_SUBMITTED_CHANNEL = 'strategy_execution_submitted'
+
+# Daemon mode (python main.py --daemon): run the due DCA_WITH_DMA strategies of an asset as soon
+# as its DMA status flips from ABOVE to BELOW instead of at the next hourly tick. Changes are
+# announced by a dma_status trigger on this channel; the latest statuses are also polled.
+# Deployed by deploy.sh as the always-on spot-buyer-dma-daemon service.
+DMA_STATUS_CHANNEL = 'dma_status_changed'
+DMA_POLL_SECONDS = float(os.environ.get('DMA_POLL_SECONDS', 60))
+DMA_LISTEN_RETRY_SECONDS = float(os.environ.get('DMA_LISTEN_RETRY_SECONDS', 10))
+
+# Submission mode: 'api' posts each execution to the external broadcaster, 'native' signs the
+# swapUSDTto* calls with the strategy owner key and sends them straight to the node, taking
+# nonces from a locally reserved range so a whole batch goes out in one JSON-RPC request
+SUBMISSION_MODE = os.environ.get('SUBMISSION_MODE', 'api')
+NATIVE_BATCH_SIZE = int(os.environ.get('NATIVE_BATCH_SIZE', 50))
+NATIVE_GAS_LIMIT = int(os.environ.get('NATIVE_GAS_LIMIT', 500000))
+NATIVE_GAS_PRICE_MULTIPLIER = Decimal(os.environ.get('NATIVE_GAS_PRICE_MULTIPLIER', '1.25'))
+RPC_TIMEOUT_SECONDS = float(os.environ.get('RPC_TIMEOUT_SECONDS', 30))
+FILLER_GAS_LIMIT = 21000
+
+# swapUSDTto*(address,uint256,uint256,uint160) selectors of the *StrategySwap contracts
+SWAP_SELECTORS = {
+    'BTC': '7031c8f4',  # swapUSDTtoUBTC
+    'ETH': '4c58dd40',  # swapUSDTtoUETH
+    'HYPE': 'f6b7ceb5',  # swapUSDTtoWHYPE
+}
+STRATEGY_CONTRACT_SECRETS = {
+    'BTC': 'strategy-contract-btc',
+    'ETH': 'strategy-contract-eth',
+    'HYPE': 'strategy-contract-hype',
+}
+USDT_DECIMALS = 6
+ASSET_DECIMALS = {'BTC': 8, 'ETH': 18, 'HYPE': 18}
+
+# Allowance and balance pre-check: USDT allowance(user, contract) and balanceOf(user) for every
+# ready strategy, read through Multicall3 aggregate3 before anything is submitted
+FUNDING_PRECHECK_ENABLED = os.environ.get('FUNDING_PRECHECK_ENABLED', 'true').lower() == 'true'
+MULTICALL_BATCH_SIZE = int(os.environ.get('MULTICALL_BATCH_SIZE', 500))
+MULTICALL3_ADDRESS = '0xcA11bde05977b3631167028862bE2a173976CA11'
+USDT_TOKEN_ADDRESS = os.environ.get('USDT_TOKEN_ADDRESS', '0xB8CE59FC3717ada4C02eaDF9682A9e934F625ebb')  # HyperEVM USDT
+AGGREGATE3_SELECTOR = '82ad56cb'
+ALLOWANCE_SELECTOR = 'dd62ed3e'
+BALANCE_OF_SELECTOR = '70a08231'
+
+# Retry engine: submission failures of a retryable error class are parked as RETRYING with an
+# exponential backoff (next_check_at) and resubmitted on the same execution row after the run's
+# on-time executions, at most RETRY_BUDGET_PER_RUN per run. The broadcaster receives the same
+# execution_id on every attempt, so it can deduplicate a submission whose response was lost.
+# A claim stays RETRYING and only leases the row by pushing next_check_at forward; the status
+# changes when the attempt's result is written, so a run that dies mid-retry leaves the row to be
+# claimed again once the lease runs out.
+RETRY_CLAIM_LEASE_SECONDS = float(os.environ.get('RETRY_CLAIM_LEASE_SECONDS', 900))
+RETRY_MAX_ATTEMPTS = int(os.environ.get('RETRY_MAX_ATTEMPTS', 3))
+RETRY_BUDGET_PER_RUN = int(os.environ.get('RETRY_BUDGET_PER_RUN', 50))
+RETRY_BASE_DELAY_SECONDS = float(os.environ.get('RETRY_BASE_DELAY_SECONDS', 120))
+RETRY_MAX_DELAY_SECONDS = float(os.environ.get('RETRY_MAX_DELAY_SECONDS', 3600))
+RETRYABLE_ERROR_CLASSES = set(os.environ.get('RETRYABLE_ERROR_CLASSES', 'TIMEOUT,CONNECTION,RATE_LIMITED,UNAVAILABLE,NONCE,GAS').split(','))
+
+# Node errors meaning a nonce is already taken by a transaction the node knows about
+NONCE_OCCUPIED_ERRORS = ('already known', 'nonce too low', 'replacement transaction underpriced')
+
+# Service name recorded with single-flight runs and trace spans
+SERVICE_NAME = 'spot-buyer'
+configure_service(SERVICE_NAME)
+
+# Strategy book scans, once per run. They stream through a named cursor, which cannot run a
+# prepared statement, so they are plain SQL.
+SNAPSHOT_FETCH_ROWS = int(os.environ.get('SNAPSHOT_FETCH_ROWS', 5000))
+STRATEGY_SCAN_SELECT = """
+        SELECT 
+            us.id as strategy_id,
+            us.wallet_address,
+            EXTRACT(EPOCH FROM us.last_executed_at)::float8 as last_executed_epoch,
+            us.total_executions,
+            an.strategy_type,
+            an.asset,
+            an.interval_amount,
+            an.interval_days,
+            an.accepted_slippage::float8 as accepted_slippage,
+            an.total_amount
+        FROM user_strategies us
+        JOIN action_nonces an ON us.action_nonce_id = an.id
+        WHERE us."isActive" = true 
+          AND us.status = 'ACTIVE'
+          AND NOT EXISTS (
+              SELECT 1 FROM strategy_executions se
+              WHERE se.strategy_id = us.id AND se.status = 'RETRYING'
+          )"""
+
+STRATEGY_SCANS = {
+    'strategy_scan': STRATEGY_SCAN_SELECT + """
+          AND NOT (an.strategy_type = 'DCA_WITH_DMA' AND an.asset::text = ANY(%s::text[]))
+        ORDER BY us.last_executed_at ASC NULLS FIRST
+    """,
+    'dma_strategy_scan': STRATEGY_SCAN_SELECT + """
+          AND an.strategy_type = 'DCA_WITH_DMA'
+          AND an.asset::text = ANY(%s::text[])
+        ORDER BY us.last_executed_at ASC NULLS FIRST
+    """,
+}
+
+# Hot statements, prepared once per pooled connection and then EXECUTEd
+PREPARED_STATEMENTS = {
+    'dma_lookup': """
+        SELECT DISTINCT ON (asset) asset, current_price, dma_200, status, calculated_at
+        FROM dma_status 
+        ORDER BY asset, calculated_at DESC
+    """,
+    'execution_insert': """
+        INSERT INTO strategy_executions 
+        (strategy_id, amount_in, status, due_at, created_at, updated_at)
+        VALUES ($1, $2, $3, $4, $5, $6)
+        RETURNING id
+    """,
+    'execution_update': """
+        UPDATE strategy_executions 
+        SET transaction_hash = $1, status = $2, error_message = $3, broadcast_at = $4, updated_at = $5,
+            next_check_at = LEAST(next_check_at, $5)
+        WHERE id = $6
+    """,
+    'execution_retry_schedule': """
+        UPDATE strategy_executions 
+        SET status = 'RETRYING', error_message = $1, next_check_at = $2, updated_at = $3
+        WHERE id = $4
+    """,
+    'retry_claim': """
+        WITH due AS (
+            SELECT id FROM strategy_executions
+            WHERE status = 'RETRYING' AND next_check_at <= $1
+            ORDER BY next_check_at
+            LIMIT $2
+            FOR UPDATE SKIP LOCKED
+        )
+        UPDATE strategy_executions se
+        SET next_check_at = $3, retry_count = se.retry_count + 1, updated_at = $1
+        FROM due, user_strategies us, action_nonces an
+        WHERE se.id = due.id AND us.id = se.strategy_id AND an.id = us.action_nonce_id
+        RETURNING se.id, se.due_at, se.retry_count, se.amount_in,
+                  us.id, us.wallet_address, us."isActive" AND us.status = 'ACTIVE',
+                  an.strategy_type, an.asset, an.interval_days, an.accepted_slippage::float8, an.total_amount
+    """,
+    'execution_submitted_notify': """
+        SELECT pg_notify($1, $2)
+    """,
+    'strategy_last_execution_update': """
+        UPDATE user_strategies 
+        SET last_executed_at = $1, 
+            total_executions = total_executions + 1,
+            updated_at = $2
+        WHERE id = $3
+    """,
+    'signer_nonce_reserve': """
+        INSERT INTO signer_nonces (address, next_nonce, updated_at)
+        VALUES ($1, $2::bigint + $3::int, $4)
+        ON CONFLICT (address) DO UPDATE
+        SET next_nonce = GREATEST(signer_nonces.next_nonce, $2::bigint) + $3::int, updated_at = $4
+        RETURNING next_nonce - $3
+    """,
+    'signer_nonce_lookup': """
+        SELECT next_nonce FROM signer_nonces WHERE address = $1
+    """,
+    'failure_log_insert': """
+        INSERT INTO failed_transaction_logs 
+        (wallet_address, strategy_id, execution_id, asset, amount, plan_type, error_message, failed_at, created_at)
+        SELECT $1, $2, $3, $4, $5, $6, $7, $8, $9
+        WHERE NOT EXISTS (SELECT 1 FROM failed_transaction_logs WHERE execution_id = $3)
+        ON CONFLICT DO NOTHING
+    """,
+}
+
+register_statements(PREPARED_STATEMENTS)
 
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
     return jsonify({'status': 'healthy', 'timestamp': datetime.now().isoformat()})
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Runtime metrics endpoint"""
+    return jsonify({
+        'statements': get_statement_metrics(),
+        'single_flight': get_single_flight_metrics(),
+        'read_routing': get_read_routing_metrics(),
+        'timestamp': datetime.now().isoformat()
+    })
+
 @app.route('/execute', methods=['POST'])
 def execute_strategies():
     """Main endpoint to execute investment strategies"""
+    run = None
     try:
-        logger.info("Starting Spot Buyer execution")
+        run, running_id = begin_single_flight_run('execute')
+        if run is None:
+            logger.info(f"Execution run {running_id} already in progress, not starting another")
+            return jsonify({'message': 'Execution already in progress', 'run_id': running_id}), 202
+        
+        logger.info(f"Starting Spot Buyer execution (run {run.run_id})")
+        run_started = time.monotonic()
         
         # Get all active strategies ready for execution
-        strategies_to_execute = get_strategies_ready_for_execution()
+        strategies_to_execute, skipped = get_strategies_ready_for_execution()
         
-        if not strategies_to_execute:
-            logger.info("No strategies ready for execution")
-            return jsonify({'message': 'No strategies ready for execution', 'count': 0})
+        execution_results = []
+        deferred = 0
+        if strategies_to_execute:
+            logger.info(f"Found {len(strategies_to_execute)} strategies ready for execution")
+            
+            execution_results, deferred = submit_strategies(strategies_to_execute, run_started)
         
-        logger.info(f"Found {len(strategies_to_execute)} strategies ready for execution")
+        # Retries only get the capacity left once the on-time executions are out
+        retry_results = []
+        if time.monotonic() < run_started + EXECUTION_RUN_DEADLINE_SECONDS:
+            retry_results = execute_retries()
         
-        # Process each strategy
-        execution_results = []
-        for strategy in strategies_to_execute:
-            result = process_strategy(strategy)
-            execution_results.append(result)
+        if not strategies_to_execute and not retry_results:
+            logger.info("No strategies ready for execution")
+            return jsonify({'message': 'No strategies ready for execution', 'count': 0, 'skipped': skipped,
+                            'run_id': run.run_id})
         
         # Summary
+        execution_results += retry_results
         successful = len([r for r in execution_results if r['success']])
-        failed = len([r for r in execution_results if not r['success']])
+        retry_scheduled = len([r for r in execution_results if r['action'] == 'retry_scheduled'])
+        failed = len(execution_results) - successful - retry_scheduled
         
-        logger.info(f"Execution completed. Successful: {successful}, Failed: {failed}")
+        logger.info(f"Execution completed. Successful: {successful}, Failed: {failed}, "
+                    f"Retry scheduled: {retry_scheduled}, Retried: {len(retry_results)}")
         
         return jsonify({
-            'message': f'Processed {len(strategies_to_execute)} strategies',
+            'message': f'Processed {len(strategies_to_execute) - deferred} strategies and {len(retry_results)} retries',
             'successful': successful,
             'failed': failed,
+            'retry_scheduled': retry_scheduled,
+            'retried': len(retry_results),
+            'deferred': deferred,
+            'skipped': skipped,
+            'run_id': run.run_id,
             'results': execution_results
         })
         
     except Exception as e:
         logger.error(f"Service execution failed: {str(e)}")
         send_alert(f"Spot Buyer Service failed: {str(e)}")
+        if run:
+            run.fail(str(e))
         return jsonify({'error': str(e)}), 500
+    
+    finally:
+        flush_spans()
+        if run:
+            run.finish()
 
-def get_strategies_ready_for_execution() -> List[Dict]:
-    """Get all active strategies that are ready for execution"""
-    conn = get_db_connection()
-    try:
-        with conn.cursor() as cursor:
-            query = """
-                SELECT 
-                    us.id as strategy_id,
-                    us.wallet_address,
-                    us.last_executed_at,
-                    us.total_executions,
-                    an.strategy_type,
-                    an.asset,
-                    an.interval_amount,
-                    an.interval_days,
-                    an.accepted_slippage,
-                    an.total_amount
-                FROM user_strategies us
-                JOIN action_nonces an ON us.action_nonce_id = an.id
-                WHERE us.is_active = true 
-                  AND us.status = 'ACTIVE'
-                ORDER BY us.last_executed_at ASC NULLS FIRST
-            """
-            
-            cursor.execute(query)
-            columns = [desc[0] for desc in cursor.description]
-            strategies = []
-            
-            for row in cursor.fetchall():
-                strategy = dict(zip(columns, row))
-                
-                # Check if strategy is ready for execution
-                if is_strategy_ready_for_execution(strategy):
-                    strategies.append(strategy)
+def submit_strategies(strategies: List[Dict], run_started: float, spread: bool = True) -> Tuple[List[Dict], int]:
+    """Process each strategy at its offset within the spread window (or right away when not spread), in
+    the configured submission mode. Returns the results and the number of strategies deferred to the
+    next tick by the run deadline."""
+    claimed_at = datetime.now()
+    deadline = run_started + EXECUTION_RUN_DEADLINE_SECONDS
+    window = EXECUTION_SPREAD_WINDOW_SECONDS if spread else 0
+    queue = deque(sorted(strategies, key=lambda s: get_execution_offset(s['strategy_id'], window)))
+    if SUBMISSION_MODE == 'native':
+        execution_results, queue = execute_native(queue, run_started, deadline, window, claimed_at)
+    else:
+        execution_results = []
+        submission_bucket = TokenBucket(SUBMISSION_RATE_PER_SECOND, SUBMISSION_BURST)
+        while queue:
+            wait_seconds = run_started + get_execution_offset(queue[0]['strategy_id'], window) - time.monotonic()
+            if wait_seconds > 0:
+                time.sleep(wait_seconds)
+            submission_bucket.acquire()
+            if time.monotonic() >= deadline:
+                break
             
-            return strategies
+            strategy = queue.popleft()
+            strategy['claimed_at'] = claimed_at
+            execution_results.append(process_strategy(strategy))
+    
+    if queue:
+        logger.warning(f"Run deadline of {EXECUTION_RUN_DEADLINE_SECONDS:.0f}s reached, deferring "
+                       f"{len(queue)} strategies to the next tick")
+    return execution_results, len(queue)
+
+def get_execution_offset(strategy_id: str, window: float) -> float:
+    """Deterministic offset of a strategy within the spread window, stable across runs"""
+    digest = hashlib.sha256(strategy_id.encode()).digest()
+    return int.from_bytes(digest[:8], 'big') / 2 ** 64 * window
+
+class TokenBucket:
+    """Blocking token bucket limiting the outbound submission rate"""
+    
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def acquire(self):
+        """Take one token, sleeping until one is available"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_seconds = (1 - self.tokens) / self.rate
+            time.sleep(wait_seconds)
+
+def get_strategies_ready_for_execution(dma_assets: Optional[List[str]] = None) -> Tuple[List[Dict], Dict[str, int]]:
+    """Get active strategies ready for execution, plus skip counts by reason. Given dma_assets, only
+    the DCA_WITH_DMA strategies of those assets are considered."""
+    dma_statuses = get_latest_dma_statuses()
+    if dma_assets is None:
+        # DMA strategies of assets above their DMA would only be skipped, so they are not loaded
+        above_assets = [asset for asset, status in dma_statuses.items() if status['status'] == 'ABOVE']
+        snapshot = load_strategy_snapshot('strategy_scan', above_assets)
+    else:
+        snapshot = load_strategy_snapshot('dma_strategy_scan', dma_assets)
+    
+    strategies, skipped = snapshot.select_ready(datetime.now(), dma_statuses)
+    if FUNDING_PRECHECK_ENABLED and strategies:
+        strategies, unfunded = precheck_funding(strategies)
+        skipped.update(unfunded)
+    
+    logger.info(f"Evaluated {len(snapshot)} active strategies: {len(strategies)} ready, skipped {skipped}")
+    return strategies, skipped
+
+def precheck_funding(strategies: List[Dict]) -> Tuple[List[Dict], Dict[str, int]]:
+    """Drop strategies whose wallet lacks the USDT allowance or balance for their swap, plus skip counts by reason"""
+    rpc_url = get_secret('blockchain-rpc-url')
+    if not rpc_url or rpc_url == 'your-blockchain-rpc-url':
+        return strategies, {}
+    contracts = {asset: get_secret(secret_id) for asset, secret_id in STRATEGY_CONTRACT_SECRETS.items()}
+    
+    try:
+        allowances, balances = read_funding(rpc_url, strategies, contracts)
+    except Exception as e:
+        # Fail open: the contracts still revert an unfunded swap, the pre-check only saves the submission
+        logger.warning(f"Funding pre-check failed, submitting without it: {str(e)}")
+        return strategies, {}
+    
+    # Several strategies of one wallet draw on the same balance and, per contract, the same allowance
+    fundable = []
+    skipped = {}
+    for strategy in strategies:
+        wallet = strategy['wallet_address'].lower()
+        allowance_key = (wallet, (contracts.get(strategy['asset']) or '').lower())
+        amount = strategy['interval_amount']
+        
+        reason = None
+        if allowances.get(allowance_key) is not None and allowances[allowance_key] < amount:
+            reason = 'INSUFFICIENT_ALLOWANCE'
+        elif balances.get(wallet) is not None and balances[wallet] < amount:
+            reason = 'INSUFFICIENT_BALANCE'
+        
+        if reason:
+            skipped[reason] = skipped.get(reason, 0) + 1
+            logger.info(f"Deferring strategy {strategy['strategy_id']}: {reason} for {amount} USDT units")
+            continue
+        
+        if allowances.get(allowance_key) is not None:
+            allowances[allowance_key] -= amount
+        if balances.get(wallet) is not None:
+            balances[wallet] -= amount
+        fundable.append(strategy)
+    
+    return fundable, skipped
+
+def read_funding(rpc_url: str, strategies: List[Dict], contracts: Dict[str, Optional[str]]) -> Tuple[Dict, Dict]:
+    """USDT allowances by (wallet, contract) and balances by wallet, None where the read failed"""
+    allowance_keys = sorted({
+        (strategy['wallet_address'].lower(), contracts[strategy['asset']].lower())
+        for strategy in strategies if contracts.get(strategy['asset'])
+    })
+    wallets = sorted({strategy['wallet_address'].lower() for strategy in strategies})
+    
+    calls = [ALLOWANCE_SELECTOR + '%064x' % int(wallet, 16) + '%064x' % int(contract, 16) for wallet, contract in allowance_keys]
+    calls += [BALANCE_OF_SELECTOR + '%064x' % int(wallet, 16) for wallet in wallets]
+    
+    # One aggregate3 eth_call per chunk, all chunks in one JSON-RPC batch
+    chunks = [calls[start:start + MULTICALL_BATCH_SIZE] for start in range(0, len(calls), MULTICALL_BATCH_SIZE)]
+    responses = send_rpc_batch(requests.Session(), rpc_url, [
+        ('eth_call', [{
+            'to': MULTICALL3_ADDRESS,
+            'data': '0x' + AGGREGATE3_SELECTOR + abi_encode(
+                ['(address,bool,bytes)[]'], [[(USDT_TOKEN_ADDRESS, True, bytes.fromhex(call)) for call in chunk]]).hex()
+        }, 'latest'])
+        for chunk in chunks
+    ])
+    
+    values = []
+    for chunk, response in zip(chunks, responses):
+        if response.get('error'):
+            raise RpcError(response['error'].get('message', str(response['error'])))
+        results = abi_decode(['(bool,bytes)[]'], bytes.fromhex(response['result'][2:]))[0]
+        values.extend(int.from_bytes(data[:32], 'big') if success and len(data) >= 32 else None for success, data in results)
+    
+    allowances = dict(zip(allowance_keys, values[:len(allowance_keys)]))
+    balances = dict(zip(wallets, values[len(allowance_keys):]))
+    return allowances, balances
+
+def load_strategy_snapshot(scan: str, assets: List[str]) -> 'StrategySnapshot':
+    """Load active strategies as a columnar snapshot: the book without (strategy_scan) or only
+    (dma_strategy_scan) the DCA_WITH_DMA strategies of the given assets"""
+    conn = get_read_connection()
+    try:
+        # A named cursor keeps the result set on the server; only SNAPSHOT_FETCH_ROWS row tuples are
+        # alive at a time before they are packed into the snapshot's arrays
+        with conn.cursor(name=scan) as cursor:
+            cursor.itersize = SNAPSHOT_FETCH_ROWS
+            cursor.execute(STRATEGY_SCANS[scan], (assets,))
+            return StrategySnapshot(iter(lambda: cursor.fetchmany(SNAPSHOT_FETCH_ROWS), []))
             
     finally:
-        conn.close()
+        release_db_connection(conn)
 
-def is_strategy_ready_for_execution(strategy: Dict) -> bool:
-    """Check if a strategy is ready for execution based on interval"""
-    interval_days = strategy['interval_days']
-    last_executed_at = strategy['last_executed_at']
+class StrategySnapshot:
+    """Columnar, array-backed view of the active strategy book.
+    
+    Readiness and DMA gating are evaluated as vectorized masks over the whole
+    book; per-strategy dicts are only built for the rows that will execute.
+    """
+    
+    def __init__(self, row_chunks: Iterable[List[tuple]]):
+        chunks = [self.build_columns(rows) for rows in row_chunks] or [self.build_columns([])]
+        for name in chunks[0]:
+            setattr(self, name, np.concatenate([chunk[name] for chunk in chunks]))
+    
+    @staticmethod
+    def build_columns(rows: List[tuple]) -> Dict[str, np.ndarray]:
+        """Column arrays of one chunk of scan rows"""
+        count = len(rows)
+        unknown_asset = len(ASSET_CODES)
+        return {
+            'strategy_ids': np.array([row[0] for row in rows], dtype=object),
+            'wallet_addresses': np.array([row[1] for row in rows], dtype=object),
+            'last_executed_epoch': np.fromiter(
+                (np.nan if row[2] is None else row[2] for row in rows), dtype=np.float64, count=count),
+            'total_executions': np.fromiter((row[3] for row in rows), dtype=np.int32, count=count),
+            'strategy_types': np.fromiter(
+                (STRATEGY_TYPE_CODES.get(row[4], -1) for row in rows), dtype=np.int8, count=count),
+            'assets': np.fromiter(
+                (ASSET_CODES.get(row[5], unknown_asset) for row in rows), dtype=np.int8, count=count),
+            'interval_amounts': np.fromiter((row[6] for row in rows), dtype=np.int64, count=count),
+            'interval_days': np.fromiter((row[7] for row in rows), dtype=np.int32, count=count),
+            'accepted_slippage': np.fromiter((row[8] for row in rows), dtype=np.float64, count=count),
+            'total_amounts': np.fromiter((row[9] for row in rows), dtype=np.int64, count=count),
+        }
     
-    # If never executed, it's ready
-    if last_executed_at is None:
-        logger.info(f"Strategy {strategy['strategy_id']} ready - never executed")
-        return True
+    def __len__(self) -> int:
+        return len(self.strategy_ids)
     
-    # Check if enough days have passed since last execution
-    days_since_last = (datetime.now() - last_executed_at).days
+    def ready_mask(self, now: datetime) -> np.ndarray:
+        """Strategies whose interval has elapsed (or that never executed)"""
+        # last_executed_at is a naive UTC timestamp, EXTRACT(EPOCH) reads it as UTC
+        now_epoch = now.replace(tzinfo=timezone.utc).timestamp()
+        never_executed = np.isnan(self.last_executed_epoch)
+        with np.errstate(invalid='ignore'):
+            days_since_last = np.floor((now_epoch - self.last_executed_epoch) / SECONDS_PER_DAY)
+            interval_passed = days_since_last >= self.interval_days
+        return never_executed | interval_passed
     
-    if days_since_last >= interval_days:
-        logger.info(f"Strategy {strategy['strategy_id']} ready - {days_since_last} days since last execution (interval: {interval_days})")
-        return True
+    def select_ready(self, now: datetime, dma_statuses: Dict[str, Dict]) -> Tuple[List[Dict], Dict[str, int]]:
+        """Apply readiness and DMA gating, materializing only the strategies to execute"""
+        # One slot per asset code plus a trailing slot for unknown assets
+        dma_known = np.zeros(len(ASSET_CODES) + 1, dtype=bool)
+        dma_below = np.zeros(len(ASSET_CODES) + 1, dtype=bool)
+        for asset, dma_status in dma_statuses.items():
+            if asset in ASSET_CODES:
+                dma_known[ASSET_CODES[asset]] = True
+                dma_below[ASSET_CODES[asset]] = dma_status['status'] == 'BELOW'
+        
+        ready = self.ready_mask(now)
+        is_dca = self.strategy_types == STRATEGY_TYPE_CODES['DCA']
+        is_dma = self.strategy_types == STRATEGY_TYPE_CODES['DCA_WITH_DMA']
+        has_dma_data = dma_known[self.assets]
+        below_dma = dma_below[self.assets]
+        
+        execute_dca = ready & is_dca
+        execute_dma = ready & is_dma & below_dma
+        
+        skipped = {
+            'NO_DMA_DATA': int(np.count_nonzero(ready & is_dma & ~has_dma_data)),
+            'DMA_ABOVE': int(np.count_nonzero(ready & is_dma & has_dma_data & ~below_dma)),
+            'UNKNOWN_STRATEGY_TYPE': int(np.count_nonzero(ready & ~is_dca & ~is_dma)),
+        }
+        
+        strategies = []
+        for index in np.flatnonzero(execute_dca | execute_dma):
+            strategies.append(self.materialize(index, 'DCA_INTERVAL' if execute_dca[index] else 'DMA_BELOW'))
+        
+        return strategies, {reason: count for reason, count in skipped.items() if count}
     
-    logger.debug(f"Strategy {strategy['strategy_id']} not ready - only {days_since_last} days since last execution (need {interval_days})")
-    return False
+    def materialize(self, index: int, trigger_reason: str) -> Dict:
+        """Build the per-strategy dict for a single row"""
+        last_executed_epoch = self.last_executed_epoch[index]
+        last_executed_at = None if np.isnan(last_executed_epoch) else \
+            datetime.fromtimestamp(last_executed_epoch, tz=timezone.utc).replace(tzinfo=None)
+        return {
+            'strategy_id': self.strategy_ids[index],
+            'wallet_address': self.wallet_addresses[index],
+            'last_executed_at': last_executed_at,
+            # Never-executed strategies are due as soon as they are picked up
+            'due_at': last_executed_at + timedelta(days=int(self.interval_days[index])) if last_executed_at else None,
+            'total_executions': int(self.total_executions[index]),
+            'strategy_type': STRATEGY_TYPES[self.strategy_types[index]],
+            'asset': ASSETS[self.assets[index]],
+            'interval_amount': int(self.interval_amounts[index]),
+            'interval_days': int(self.interval_days[index]),
+            'accepted_slippage': float(self.accepted_slippage[index]),
+            'total_amount': int(self.total_amounts[index]),
+            'trigger_reason': trigger_reason
+        }
 
 def process_strategy(strategy: Dict) -> Dict:
     """Process a single strategy execution"""
@@ -151,57 +583,27 @@ def process_strategy(strategy: Dict) -> Dict:
     try:
         logger.info(f"Processing strategy {strategy_id} (type: {strategy_type}, asset: {asset})")
         
-        # Check execution conditions based on strategy type
-        should_execute, trigger_reason = should_execute_strategy(strategy)
-        
-        if not should_execute:
-            logger.info(f"Strategy {strategy_id} conditions not met: {trigger_reason}")
-            return {
-                'strategy_id': strategy_id,
-                'success': True,
-                'action': 'skipped',
-                'reason': trigger_reason
-            }
+        # Readiness and DMA conditions were already applied to the snapshot
+        trigger_reason = strategy['trigger_reason']
         
-        # Create execution record
-        execution_id = create_execution_record(strategy, trigger_reason)
+        # Create execution record (retries resubmit their existing one)
+        claimed_at = strategy.get('claimed_at') or datetime.now()
+        due_at = strategy.get('due_at') or claimed_at
+        execution_id = strategy.get('execution_id') or create_execution_record(strategy, trigger_reason, due_at)
+        record_created_at = datetime.now()
         
         # Call transaction API
+        api_submitted_at = datetime.now()
         tx_result = call_transaction_api(strategy, execution_id)
         
-        if tx_result['success']:
-            # Update execution record with transaction hash
-            update_execution_record(execution_id, tx_result['tx_hash'], 'EXECUTING')
-            
-            # Update strategy last executed time
-            update_strategy_last_execution(strategy_id)
-            
-            logger.info(f"Strategy {strategy_id} executed successfully. TX: {tx_result['tx_hash']}")
-            
-            return {
-                'strategy_id': strategy_id,
-                'success': True,
-                'action': 'executed',
-                'tx_hash': tx_result['tx_hash'],
-                'execution_id': execution_id,
-                'trigger_reason': trigger_reason
-            }
-        else:
-            # Mark execution as failed
-            update_execution_record(execution_id, None, 'FAILED', tx_result['error'])
-            
-            # Log failed transaction
-            log_failed_transaction(strategy, execution_id, tx_result['error'])
-            
-            logger.error(f"Strategy {strategy_id} execution failed: {tx_result['error']}")
-            
-            return {
-                'strategy_id': strategy_id,
-                'success': False,
-                'action': 'failed',
-                'error': tx_result['error'],
-                'execution_id': execution_id
-            }
+        stage_times = {
+            'due': due_at,
+            'claimed': claimed_at,
+            'record_created': record_created_at,
+            'api_submitted': api_submitted_at,
+            'broadcast_acknowledged': datetime.now()
+        }
+        return complete_execution(strategy, execution_id, tx_result, stage_times)
             
     except Exception as e:
         logger.error(f"Error processing strategy {strategy_id}: {str(e)}")
@@ -212,76 +614,174 @@ def process_strategy(strategy: Dict) -> Dict:
             'error': str(e)
         }
 
-def should_execute_strategy(strategy: Dict) -> tuple[bool, str]:
-    """Determine if strategy should execute based on type and conditions"""
-    strategy_type = strategy['strategy_type']
-    asset = strategy['asset']
+def complete_execution(strategy: Dict, execution_id: str, tx_result: Dict, stage_times: Dict[str, datetime]) -> Dict:
+    """Record the submission outcome of an execution and emit its spot buyer stage spans"""
+    strategy_id = strategy['strategy_id']
+    
+    span_attributes = {'asset': strategy['asset'], 'strategy.type': strategy['strategy_type'], 'strategy.id': strategy_id}
+    stages = list(stage_times)
+    for stage, next_stage in zip(stages, stages[1:]):
+        attributes = dict(span_attributes, success=tx_result['success']) if next_stage == stages[-1] else span_attributes
+        record_span(execution_id, stage, stage_times[stage], stage_times[next_stage], attributes)
     
-    if strategy_type == 'DCA':
-        # Simple DCA - execute if interval passed (already checked)
-        return True, 'DCA_INTERVAL'
+    if tx_result['success']:
+        # Update execution record with transaction hash
+        update_execution_record(execution_id, tx_result['tx_hash'], 'EXECUTING',
+                                broadcast_at=stage_times['broadcast_acknowledged'])
         
-    elif strategy_type == 'DCA_WITH_DMA':
-        # DMA-based DCA - check if price is below DMA
-        dma_status = get_latest_dma_status(asset)
+        # Update strategy last executed time
+        update_strategy_last_execution(strategy_id)
         
-        if dma_status is None:
-            logger.warning(f"No DMA status found for {asset}")
-            return False, 'NO_DMA_DATA'
+        logger.info(f"Strategy {strategy_id} executed successfully. TX: {tx_result['tx_hash']}")
         
-        if dma_status['status'] == 'BELOW':
-            return True, 'DMA_BELOW'
-        else:
-            return False, 'DMA_ABOVE'
-    
-    return False, 'UNKNOWN_STRATEGY_TYPE'
+        return {
+            'strategy_id': strategy_id,
+            'success': True,
+            'action': 'executed',
+            'tx_hash': tx_result['tx_hash'],
+            'execution_id': execution_id,
+            'trigger_reason': strategy['trigger_reason']
+        }
+    elif tx_result.get('error_class') in RETRYABLE_ERROR_CLASSES and strategy.get('retry_count', 0) < RETRY_MAX_ATTEMPTS:
+        retry_at = schedule_retry(execution_id, strategy.get('retry_count', 0), tx_result['error'])
+        
+        logger.warning(f"Strategy {strategy_id} execution failed ({tx_result['error_class']}), "
+                       f"retry {strategy.get('retry_count', 0) + 1}/{RETRY_MAX_ATTEMPTS} at {retry_at}: {tx_result['error']}")
+        
+        return {
+            'strategy_id': strategy_id,
+            'success': False,
+            'action': 'retry_scheduled',
+            'error': tx_result['error'],
+            'error_class': tx_result['error_class'],
+            'retry_at': retry_at.isoformat(),
+            'execution_id': execution_id
+        }
+    else:
+        # Mark execution as failed
+        update_execution_record(execution_id, None, 'FAILED', tx_result['error'])
+        
+        # Log failed transaction
+        log_failed_transaction(strategy, execution_id, tx_result['error'])
+        
+        logger.error(f"Strategy {strategy_id} execution failed: {tx_result['error']}")
+        
+        return {
+            'strategy_id': strategy_id,
+            'success': False,
+            'action': 'failed',
+            'error': tx_result['error'],
+            'error_class': tx_result.get('error_class'),
+            'execution_id': execution_id
+        }
+
+def get_retry_delay(retry_count: int) -> float:
+    """Exponential backoff for the next attempt, with jitter so parked retries do not come due together"""
+    delay = min(RETRY_BASE_DELAY_SECONDS * 2 ** retry_count, RETRY_MAX_DELAY_SECONDS)
+    return delay * random.uniform(0.5, 1.0)
 
-def get_latest_dma_status(asset: str) -> Optional[Dict]:
-    """Get the latest DMA status for an asset"""
+def schedule_retry(execution_id: str, retry_count: int, error_message: str) -> datetime:
+    """Park an execution as RETRYING until its backoff has passed"""
+    now = datetime.now()
+    retry_at = now + timedelta(seconds=get_retry_delay(retry_count))
     conn = get_db_connection()
     try:
         with conn.cursor() as cursor:
-            query = """
-                SELECT current_price, dma_200, status, calculated_at
-                FROM dma_status 
-                WHERE asset = %s 
-                ORDER BY calculated_at DESC 
-                LIMIT 1
-            """
+            execute_prepared(cursor, 'execution_retry_schedule', (error_message, retry_at, now, execution_id))
+            conn.commit()
+            return retry_at
             
-            cursor.execute(query, (asset,))
-            row = cursor.fetchone()
+    finally:
+        release_db_connection(conn)
+
+def claim_due_retries(limit: int) -> List[Dict]:
+    """Lease up to limit RETRYING executions whose backoff has passed, as strategy dicts"""
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            now = datetime.now()
+            execute_prepared(cursor, 'retry_claim', (now, limit, now + timedelta(seconds=RETRY_CLAIM_LEASE_SECONDS)))
+            rows = cursor.fetchall()
+            conn.commit()
             
-            if row:
-                return {
-                    'current_price': row[0],
-                    'dma_200': row[1],
-                    'status': row[2],
-                    'calculated_at': row[3]
-                }
+            return [{
+                'execution_id': row[0],
+                'due_at': row[1],
+                'retry_count': row[2],
+                'interval_amount': int(row[3]),
+                'strategy_id': row[4],
+                'wallet_address': row[5],
+                'active': row[6],
+                'strategy_type': row[7],
+                'asset': row[8],
+                'interval_days': row[9],
+                'accepted_slippage': row[10],
+                'total_amount': int(row[11]),
+                'trigger_reason': 'RETRY',
+                'claimed_at': now
+            } for row in rows]
             
-            return None
+    finally:
+        release_db_connection(conn)
+
+def execute_retries() -> List[Dict]:
+    """Resubmit due retries through the run's submission path, within the per-run retry budget"""
+    retries = claim_due_retries(RETRY_BUDGET_PER_RUN) if RETRY_BUDGET_PER_RUN > 0 else []
+    if not retries:
+        return []
+    logger.info(f"Retrying {len(retries)} executions")
+    
+    results = []
+    for strategy in [s for s in retries if not s['active']]:
+        update_execution_record(strategy['execution_id'], None, 'FAILED', 'Strategy is no longer active, retry dropped')
+        results.append({'strategy_id': strategy['strategy_id'], 'success': False, 'action': 'failed',
+                        'error': 'Strategy is no longer active', 'execution_id': strategy['execution_id']})
+    retries = [s for s in retries if s['active']]
+    
+    if retries and SUBMISSION_MODE == 'native':
+        submitter = NativeSubmitter()
+        prices = {asset: status['current_price'] for asset, status in get_latest_dma_statuses().items()}
+        for start in range(0, len(retries), NATIVE_BATCH_SIZE):
+            results.extend(process_native_batch(submitter, retries[start:start + NATIVE_BATCH_SIZE], prices))
+    elif retries:
+        submission_bucket = TokenBucket(SUBMISSION_RATE_PER_SECOND, SUBMISSION_BURST)
+        for strategy in retries:
+            submission_bucket.acquire()
+            results.append(process_strategy(strategy))
+    
+    return results
+
+def get_latest_dma_statuses() -> Dict[str, Dict]:
+    """Get the latest DMA status for every asset"""
+    conn = get_read_connection()
+    try:
+        with conn.cursor() as cursor:
+            execute_prepared(cursor, 'dma_lookup')
+            
+            return {
+                row[0]: {
+                    'current_price': row[1],
+                    'dma_200': row[2],
+                    'status': row[3],
+                    'calculated_at': row[4]
+                }
+                for row in cursor.fetchall()
+            }
             
     finally:
-        conn.close()
+        release_db_connection(conn)
 
-def create_execution_record(strategy: Dict, trigger_reason: str) -> str:
+def create_execution_record(strategy: Dict, trigger_reason: str, due_at: datetime) -> str:
     """Create a new strategy execution record"""
     conn = get_db_connection()
     try:
         with conn.cursor() as cursor:
-            query = """
-                INSERT INTO strategy_executions 
-                (strategy_id, amount_in, status, created_at, updated_at)
-                VALUES (%s, %s, %s, %s, %s)
-                RETURNING id
-            """
-            
             now = datetime.now()
-            cursor.execute(query, (
+            execute_prepared(cursor, 'execution_insert', (
                 strategy['strategy_id'],
                 strategy['interval_amount'],
                 'PENDING',
+                due_at,
                 now,
                 now
             ))
@@ -293,7 +793,7 @@ def create_execution_record(strategy: Dict, trigger_reason: str) -> str:
             return execution_id
             
     finally:
-        conn.close()
+        release_db_connection(conn)
 
 def call_transaction_api(strategy: Dict, execution_id: str) -> Dict:
     """Call your transaction broadcasting API"""
@@ -303,7 +803,6 @@ def call_transaction_api(strategy: Dict, execution_id: str) -> Dict:
         
         if not api_url or api_url == 'your-transaction-api-url':
             # For testing purposes, simulate API response
-            import random
             if random.random() > 0.2:  # 80% success rate
                 fake_tx_hash = f"0x{''.join([hex(random.randint(0, 15))[2:] for _ in range(64)])}"
                 return {
@@ -314,7 +813,8 @@ def call_transaction_api(strategy: Dict, execution_id: str) -> Dict:
             else:
                 return {
                     'success': False,
-                    'error': 'Simulated API failure for testing'
+                    'error': 'Simulated API failure for testing',
+                    'error_class': 'UNAVAILABLE'
                 }
         
         payload = {
@@ -345,65 +845,344 @@ def call_transaction_api(strategy: Dict, execution_id: str) -> Dict:
         else:
             return {
                 'success': False,
-                'error': f'API call failed with status {response.status_code}: {response.text}'
+                'error': f'API call failed with status {response.status_code}: {response.text}',
+                'error_class': classify_api_status(response.status_code)
             }
             
     except Exception as e:
         return {
             'success': False,
-            'error': f'Transaction API call failed: {str(e)}'
+            'error': f'Transaction API call failed: {str(e)}',
+            'error_class': classify_api_exception(e)
+        }
+
+def classify_api_status(status_code: int) -> str:
+    """Error class of a non-200 transaction API response"""
+    if status_code == 429:
+        return 'RATE_LIMITED'
+    if status_code in (500, 502, 503, 504):
+        return 'UNAVAILABLE'
+    return 'REJECTED'
+
+def classify_api_exception(error: Exception) -> str:
+    """Error class of a failed transaction API call"""
+    if isinstance(error, requests.Timeout):
+        return 'TIMEOUT'
+    if isinstance(error, requests.ConnectionError):
+        return 'CONNECTION'
+    return 'UNKNOWN'
+
+def classify_node_error(message: str) -> str:
+    """Error class of an eth_sendRawTransaction rejection; the transaction was not accepted"""
+    message = (message or '').lower()
+    if 'nonce' in message:
+        return 'NONCE'
+    if 'underpriced' in message or 'fee' in message or 'insufficient funds' in message:
+        return 'GAS'
+    return 'REJECTED'
+
+class RpcError(Exception):
+    """JSON-RPC error returned by the node"""
+
+def send_rpc_batch(session: requests.Session, rpc_url: str, calls: List[Tuple[str, list]]) -> List[Dict]:
+    """Send calls as one JSON-RPC batch, returning each response in call order"""
+    payload = [{'jsonrpc': '2.0', 'method': method, 'params': params, 'id': index}
+               for index, (method, params) in enumerate(calls)]
+    response = session.post(rpc_url, json=payload, timeout=RPC_TIMEOUT_SECONDS)
+    response.raise_for_status()
+    body = response.json()
+    if not isinstance(body, list):
+        raise RpcError((body.get('error') or {}).get('message', 'batch request rejected'))
+    by_id = {item.get('id'): item for item in body}
+    return [by_id.get(index, {'error': {'message': 'missing from batch response'}, 'missing': True})
+            for index in range(len(calls))]
+
+class NativeSubmitter:
+    """Signs strategy swaps with the owner key and sends them to the node in nonce-ordered batches"""
+    
+    def __init__(self):
+        self.rpc_url = get_secret('blockchain-rpc-url')
+        self.account = Account.from_key(get_secret('strategy-owner-private-key'))
+        self.address = self.account.address
+        self.contracts = {asset: get_secret(secret_id) for asset, secret_id in STRATEGY_CONTRACT_SECRETS.items()}
+        self.session = requests.Session()
+        self.chain_id = int(self.rpc('eth_chainId', []), 16)
+    
+    def rpc(self, method: str, params: list):
+        response = self.session.post(self.rpc_url, json={'jsonrpc': '2.0', 'method': method, 'params': params, 'id': 1},
+                                     timeout=RPC_TIMEOUT_SECONDS)
+        response.raise_for_status()
+        body = response.json()
+        if body.get('error'):
+            raise RpcError(body['error'].get('message', str(body['error'])))
+        return body['result']
+    
+    def rpc_batch(self, calls: List[Tuple[str, list]]) -> List[Dict]:
+        return send_rpc_batch(self.session, self.rpc_url, calls)
+    
+    def get_gas_price(self) -> int:
+        return int(self.rpc('eth_gasPrice', []), 16)
+    
+    def find_known_transactions(self, tx_hashes: List[str]) -> set:
+        """Hashes the node knows, pending or mined"""
+        if not tx_hashes:
+            return set()
+        responses = self.rpc_batch([('eth_getTransactionByHash', [tx_hash]) for tx_hash in tx_hashes])
+        return {tx_hash for tx_hash, response in zip(tx_hashes, responses) if response.get('result')}
+    
+    def get_pending_nonce(self) -> int:
+        return int(self.rpc('eth_getTransactionCount', [self.address, 'pending']), 16)
+    
+    def reserve_nonces(self, count: int) -> int:
+        """Reserve count consecutive nonces, returning the first; the range is committed before signing"""
+        chain_nonce = self.get_pending_nonce()
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cursor:
+                execute_prepared(cursor, 'signer_nonce_reserve', (self.address, chain_nonce, count, datetime.now()))
+                first_nonce = cursor.fetchone()[0]
+                conn.commit()
+                return first_nonce
+                
+        finally:
+            release_db_connection(conn)
+    
+    def get_reserved_nonce(self) -> Optional[int]:
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cursor:
+                execute_prepared(cursor, 'signer_nonce_lookup', (self.address,))
+                row = cursor.fetchone()
+                return row[0] if row else None
+                
+        finally:
+            release_db_connection(conn)
+    
+    def sign(self, nonce: int, to: str, data: str, gas: int, gas_price: int) -> Tuple[str, str]:
+        """Sign a legacy transaction, returning (raw transaction, transaction hash)"""
+        signed = self.account.sign_transaction({
+            'nonce': nonce,
+            'to': to,
+            'value': 0,
+            'data': data,
+            'gas': gas,
+            'gasPrice': gas_price,
+            'chainId': self.chain_id
+        })
+        return '0x' + bytes(signed.rawTransaction).hex(), '0x' + bytes(signed.hash).hex()
+    
+    def build_swap(self, strategy: Dict, prices: Dict[str, Optional[str]]) -> Tuple[str, str]:
+        """Target contract and calldata of the swap for one strategy execution"""
+        asset = strategy['asset']
+        contract = self.contracts.get(asset)
+        if not contract:
+            raise ValueError(f'No strategy contract configured for {asset}')
+        if not prices.get(asset):
+            raise ValueError(f'No price for {asset} to derive the minimum output')
+        
+        amount = int(strategy['interval_amount'])
+        expected_out = Decimal(amount) / (10 ** USDT_DECIMALS) / Decimal(prices[asset]) * (10 ** ASSET_DECIMALS[asset])
+        amount_out_minimum = int(expected_out * (100 - Decimal(str(strategy['accepted_slippage']))) / 100)
+        
+        # swapUSDTtoX(user, amount, amountOutMinimum, sqrtPriceLimitX96 = 0 for no limit)
+        data = '0x' + SWAP_SELECTORS[asset] + ''.join('%064x' % word for word in (
+            int(strategy['wallet_address'], 16), amount, max(amount_out_minimum, 0), 0
+        ))
+        return contract, data
+    
+    def recover_nonce_gaps(self, gas_price: int) -> int:
+        """Fill reserved nonces the node never accepted with zero-value self transfers"""
+        reserved_nonce = self.get_reserved_nonce()
+        chain_nonce = self.get_pending_nonce()
+        if reserved_nonce is None or chain_nonce >= reserved_nonce:
+            return 0
+        
+        fillers = [self.sign(nonce, self.address, '0x', FILLER_GAS_LIMIT, gas_price)[0]
+                   for nonce in range(chain_nonce, reserved_nonce)]
+        filled = 0
+        for start in range(0, len(fillers), NATIVE_BATCH_SIZE):
+            for response in self.rpc_batch([('eth_sendRawTransaction', [raw]) for raw in fillers[start:start + NATIVE_BATCH_SIZE]]):
+                error = (response.get('error') or {}).get('message', '')
+                if not error:
+                    filled += 1
+                elif not any(occupied in error.lower() for occupied in NONCE_OCCUPIED_ERRORS):
+                    logger.error(f"Could not fill a nonce gap for {self.address}: {error}")
+        
+        logger.warning(f"Filled {filled} nonce gaps for {self.address} between {chain_nonce} and {reserved_nonce}")
+        return filled
+
+def execute_native(queue: Deque[Dict], run_started: float, deadline: float, window: float,
+                   claimed_at: datetime) -> Tuple[List[Dict], Deque[Dict]]:
+    """Submit due strategies, ordered by offset, in signed batches as their offsets in the spread window
+    come up. Returns the results and the strategies left unsubmitted at the deadline."""
+    submitter = NativeSubmitter()
+    prices = {asset: status['current_price'] for asset, status in get_latest_dma_statuses().items()}
+    
+    # Nonces reserved by a run that died before broadcasting would otherwise stall every later transaction
+    submitter.recover_nonce_gaps(submitter.get_gas_price())
+    
+    execution_results = []
+    while queue:
+        wait_seconds = run_started + get_execution_offset(queue[0]['strategy_id'], window) - time.monotonic()
+        if wait_seconds > 0:
+            time.sleep(wait_seconds)
+        if time.monotonic() >= deadline:
+            break
+        
+        elapsed = time.monotonic() - run_started
+        batch_size = 1
+        while (batch_size < min(len(queue), NATIVE_BATCH_SIZE)
+               and get_execution_offset(queue[batch_size]['strategy_id'], window) <= elapsed):
+            batch_size += 1
+        batch = [queue.popleft() for _ in range(batch_size)]
+        
+        for strategy in batch:
+            strategy['claimed_at'] = claimed_at
+        execution_results.extend(process_native_batch(submitter, batch, prices))
+    
+    return execution_results, queue
+
+def process_native_batch(submitter: NativeSubmitter, strategies: List[Dict], prices: Dict[str, Optional[str]]) -> List[Dict]:
+    """Sign one swap per strategy on consecutive nonces and broadcast them in a single JSON-RPC batch"""
+    results = []
+    prepared = []
+    for strategy in strategies:
+        try:
+            due_at = strategy.get('due_at') or strategy['claimed_at']
+            execution_id = strategy.get('execution_id') or create_execution_record(strategy, strategy['trigger_reason'], due_at)
+            prepared.append((strategy, execution_id, datetime.now()))
+        except Exception as e:
+            logger.error(f"Error processing strategy {strategy['strategy_id']}: {str(e)}")
+            results.append({'strategy_id': strategy['strategy_id'], 'success': False, 'action': 'error', 'error': str(e)})
+    if not prepared:
+        return results
+    
+    tx_results = {}
+    signed = []
+    sent_unconfirmed = False
+    try:
+        gas_price = int(submitter.get_gas_price() * NATIVE_GAS_PRICE_MULTIPLIER)
+        swaps = []
+        for strategy, execution_id, _ in prepared:
+            try:
+                swaps.append((execution_id,) + submitter.build_swap(strategy, prices))
+            except ValueError as e:
+                tx_results[execution_id] = {'success': False, 'error': f'Could not build swap: {str(e)}', 'error_class': 'INVALID'}
+        
+        if swaps:
+            first_nonce = submitter.reserve_nonces(len(swaps))
+            for offset, (execution_id, contract, data) in enumerate(swaps):
+                raw_tx, tx_hash = submitter.sign(first_nonce + offset, contract, data, NATIVE_GAS_LIMIT, gas_price)
+                signed.append((execution_id, raw_tx, tx_hash))
+            
+            submitted_at = datetime.now()
+            try:
+                responses = submitter.rpc_batch([('eth_sendRawTransaction', [raw_tx]) for _, raw_tx, _ in signed])
+            except RpcError:
+                # The node answered and refused the whole batch, so none of it was accepted
+                raise
+            except Exception as e:
+                # The batch may have reached the node before the response was lost: every swap is
+                # recorded under its locally computed hash and the monitor settles it either way
+                logger.warning(f"Native batch of {len(signed)} swaps sent without a response, "
+                               f"leaving them to the monitor: {str(e)}")
+                responses = [{'missing': True}] * len(signed)
+            acknowledged_at = datetime.now()
+            
+            # A swap the node already has (resent, or reported on a taken nonce) was accepted
+            occupied = [tx_hash for (_, _, tx_hash), response in zip(signed, responses)
+                        if any(error in ((response.get('error') or {}).get('message') or '').lower()
+                               for error in NONCE_OCCUPIED_ERRORS)]
+            try:
+                known = submitter.find_known_transactions(occupied)
+            except Exception as e:
+                logger.warning(f"Could not look up {len(occupied)} swaps on occupied nonces: {str(e)}")
+                known = set(occupied)
+            
+            for (execution_id, _, tx_hash), response in zip(signed, responses):
+                if response.get('missing'):
+                    sent_unconfirmed = True
+                    tx_results[execution_id] = {'success': True, 'tx_hash': tx_hash}
+                elif response.get('error') and tx_hash not in known:
+                    message = response['error'].get('message')
+                    tx_results[execution_id] = {'success': False, 'error': f'Node rejected transaction: {message}',
+                                                'error_class': classify_node_error(message)}
+                else:
+                    tx_results[execution_id] = {'success': True, 'tx_hash': response.get('result') or tx_hash}
+                tx_results[execution_id].update(submitted_at=submitted_at, acknowledged_at=acknowledged_at)
+        
+    except Exception as e:
+        logger.error(f"Native submission of {len(prepared)} executions failed: {str(e)}")
+        # Nothing left for the node here, but UNKNOWN is still never retried automatically
+        for _, execution_id, _ in prepared:
+            tx_results.setdefault(execution_id, {'success': False, 'error': f'Native submission failed: {str(e)}',
+                                                 'error_class': 'UNKNOWN'})
+    
+    # A rejected or unsent nonce blocks every later one until it is filled. Swaps whose batch response
+    # was lost may still be on their way into the mempool, so their nonces are left alone for now;
+    # the next run fills whatever the node never received.
+    if signed and not sent_unconfirmed and any(not tx_results[execution_id]['success'] for execution_id, _, _ in signed):
+        try:
+            submitter.recover_nonce_gaps(submitter.get_gas_price())
+        except Exception as e:
+            logger.error(f"Nonce gap recovery failed: {str(e)}")
+    
+    for strategy, execution_id, record_created_at in prepared:
+        tx_result = tx_results[execution_id]
+        submitted_at = tx_result.get('submitted_at') or datetime.now()
+        stage_times = {
+            'due': strategy.get('due_at') or strategy['claimed_at'],
+            'claimed': strategy['claimed_at'],
+            'record_created': record_created_at,
+            'api_submitted': submitted_at,
+            'broadcast_acknowledged': tx_result.get('acknowledged_at') or submitted_at
         }
+        try:
+            results.append(complete_execution(strategy, execution_id, tx_result, stage_times))
+        except Exception as e:
+            logger.error(f"Error processing strategy {strategy['strategy_id']}: {str(e)}")
+            results.append({'strategy_id': strategy['strategy_id'], 'success': False, 'action': 'error', 'error': str(e)})
+    
+    return results
 
-def update_execution_record(execution_id: str, tx_hash: Optional[str], status: str, error_message: Optional[str] = None):
+def update_execution_record(execution_id: str, tx_hash: Optional[str], status: str, error_message: Optional[str] = None,
+                            broadcast_at: Optional[datetime] = None):
     """Update strategy execution record with transaction details"""
     conn = get_db_connection()
     try:
         with conn.cursor() as cursor:
-            query = """
-                UPDATE strategy_executions 
-                SET transaction_hash = %s, status = %s, error_message = %s, updated_at = %s
-                WHERE id = %s
-            """
+            execute_prepared(cursor, 'execution_update', (tx_hash, status, error_message, broadcast_at, datetime.now(), execution_id))
             
-            cursor.execute(query, (tx_hash, status, error_message, datetime.now(), execution_id))
+            # Delivered on commit, so the monitor never sees a hash before its row is visible
+            if status == 'EXECUTING' and tx_hash:
+                execute_prepared(cursor, 'execution_submitted_notify', (
+                    EXECUTION_SUBMITTED_CHANNEL,
+                    json.dumps({'execution_id': execution_id, 'transaction_hash': tx_hash})
+                ))
             conn.commit()
             
     finally:
-        conn.close()
+        release_db_connection(conn)
 
 def update_strategy_last_execution(strategy_id: str):
     """Update strategy last execution timestamp and increment counters"""
     conn = get_db_connection()
     try:
         with conn.cursor() as cursor:
-            query = """
-                UPDATE user_strategies 
-                SET last_executed_at = %s, 
-                    total_executions = total_executions + 1,
-                    updated_at = %s
-                WHERE id = %s
-            """
-            
             now = datetime.now()
-            cursor.execute(query, (now, now, strategy_id))
+            execute_prepared(cursor, 'strategy_last_execution_update', (now, now, strategy_id))
             conn.commit()
             
     finally:
-        conn.close()
+        release_db_connection(conn)
 
 def log_failed_transaction(strategy: Dict, execution_id: str, error_message: str):
     """Log failed transaction for monitoring"""
     conn = get_db_connection()
     try:
         with conn.cursor() as cursor:
-            query = """
-                INSERT INTO failed_transaction_logs 
-                (wallet_address, strategy_id, execution_id, asset, amount, plan_type, error_message, failed_at, created_at)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """
-            
             now = datetime.now()
-            cursor.execute(query, (
+            execute_prepared(cursor, 'failure_log_insert', (
                 strategy['wallet_address'],
                 strategy['strategy_id'],
                 execution_id,
@@ -420,7 +1199,7 @@ def log_failed_transaction(strategy: Dict, execution_id: str, error_message: str
             send_alert(f"Transaction failed for user {strategy['wallet_address']}: {error_message}")
             
     finally:
-        conn.close()
+        release_db_connection(conn)
 
 def send_alert(message: str):
     """Send email alert"""
@@ -443,6 +1222,86 @@ def send_alert(message: str):
     except Exception as e:
         logger.error(f"Failed to send alert: {str(e)}")
 
+def run_dma_daemon():
+    """Long-running mode: watch the latest DMA statuses and run flipped assets' strategies right away"""
+    known_statuses = {}
+    flipped_assets = set()
+    logger.info("DMA daemon started")
+    
+    while True:
+        try:
+            conn = psycopg2.connect(**get_db_settings())
+            try:
+                conn.autocommit = True
+                with conn.cursor() as cursor:
+                    cursor.execute(f"LISTEN {DMA_STATUS_CHANNEL}")
+                    logger.info(f"Listening on {DMA_STATUS_CHANNEL}")
+                    
+                    while True:
+                        # Statuses are read after listening, as of the primary's current position, so a
+                        # change is either in this read or announced after it. Known statuses survive
+                        # reconnects, so a flip while away is still caught by the next read.
+                        cursor.execute("SELECT pg_current_wal_lsn()::text")
+                        note_write_position(cursor.fetchone()[0])
+                        for asset, dma_status in get_latest_dma_statuses().items():
+                            if dma_status['status'] != 'BELOW':
+                                flipped_assets.discard(asset)
+                            elif known_statuses.get(asset) == 'ABOVE':
+                                logger.info(f"DMA of {asset} flipped to BELOW")
+                                flipped_assets.add(asset)
+                            known_statuses[asset] = dma_status['status']
+                        
+                        if flipped_assets and execute_dma_flip(sorted(flipped_assets)):
+                            flipped_assets.clear()
+                        
+                        # Deferred flips are retried sooner than the regular poll
+                        timeout = DMA_LISTEN_RETRY_SECONDS if flipped_assets else DMA_POLL_SECONDS
+                        if select.select([conn], [], [], timeout)[0]:
+                            conn.poll()
+                            while conn.notifies:
+                                logger.info(f"DMA status change announced: {conn.notifies.pop(0).payload}")
+                        
+            finally:
+                conn.close()
+                
+        except Exception as e:
+            logger.error(f"DMA listener failed, reconnecting in {DMA_LISTEN_RETRY_SECONDS}s: {str(e)}")
+            time.sleep(DMA_LISTEN_RETRY_SECONDS)
+
+def execute_dma_flip(assets: List[str]) -> bool:
+    """Run the due DCA_WITH_DMA strategies of assets that flipped to BELOW; False while an execution run is in progress"""
+    run, running_id = begin_single_flight_run('execute')
+    if run is None:
+        logger.info(f"Execution run {running_id} in progress, deferring the DMA flip of {assets}")
+        return False
+    
+    try:
+        logger.info(f"Starting DMA flip execution for {assets} (run {run.run_id})")
+        run_started = time.monotonic()
+        strategies, skipped = get_strategies_ready_for_execution(dma_assets=assets)
+        # A flip is the signal to buy, so its strategies go out at the submission rate without the spread
+        execution_results, deferred = submit_strategies(strategies, run_started, spread=False)
+        
+        successful = len([r for r in execution_results if r['success']])
+        retry_scheduled = len([r for r in execution_results if r['action'] == 'retry_scheduled'])
+        logger.info(f"DMA flip execution completed for {assets}. Successful: {successful}, "
+                    f"Failed: {len(execution_results) - successful - retry_scheduled}, "
+                    f"Retry scheduled: {retry_scheduled}, Deferred: {deferred}, Skipped: {skipped}")
+        
+    except Exception as e:
+        logger.error(f"DMA flip execution failed: {str(e)}")
+        send_alert(f"Spot Buyer DMA flip execution failed: {str(e)}")
+        run.fail(str(e))
+    
+    finally:
+        flush_spans()
+        run.finish()
+    
+    return True
+
 if __name__ == '__main__':
+    if '--daemon' in sys.argv:
+        threading.Thread(target=run_dma_daemon, name='dma-daemon', daemon=True).start()
+    
     port = int(os.environ.get('PORT', 8080))
     app.run(host='0.0.0.0', port=port, debug=False)
\ No newline at end of file
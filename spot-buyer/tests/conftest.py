@@ -0,0 +1,93 @@
+"""Fixtures for the spot buyer suite: the transaction monitor's chain simulator and a scratch database.
+
+Run from the service directory (python -m pytest tests) with TEST_DB_HOST pointing at a Postgres
+server the tests may create databases on. Native submission signs with a well-known development key.
+"""
+import os
+import sys
+
+import pytest
+
+SERVICE_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVICE_PATH)
+sys.path.insert(0, os.path.join(SERVICE_PATH, '..', 'shared'))
+# Appended, so that main still resolves to the spot buyer
+sys.path.append(os.path.join(SERVICE_PATH, '..', 'transaction-monitor'))
+
+import chain_simulator
+from spotmf_shared import db as shared_db, testing
+
+SIMULATOR_PORT = int(os.environ.get('TEST_SIMULATOR_PORT', 8598))
+OWNER_PRIVATE_KEY = '0xac0974bec39a17e36ba4a6b4d238ff944bacb478cbed5efcae784d7bf4f2ff80'
+CLEARED_TABLES = ('strategy_executions', 'failed_transaction_logs', 'signer_nonces', 'service_runs', 'dma_status')
+PRICES = {'BTC': '60000', 'ETH': '3000', 'HYPE': '30'}
+
+@pytest.fixture(scope='session')
+def simulator_url():
+    server = chain_simulator.start_simulator([
+        '--port', str(SIMULATOR_PORT), '--block-time', '0.1', '--revert-rate', '0', '--drop-rate', '0'
+    ])
+    yield f'http://127.0.0.1:{SIMULATOR_PORT}'
+    server.shutdown()
+
+@pytest.fixture(scope='session')
+def buyer(simulator_url):
+    settings = testing.get_test_db_settings()
+    if settings is None:
+        pytest.skip('TEST_DB_HOST is not set')
+    database = testing.create_scratch_database(settings)
+
+    # The spot buyer reads its configuration at import time
+    os.environ.update({
+        'SECRET_DB_HOST': settings['host'],
+        'SECRET_DB_NAME': database,
+        'SECRET_DB_USER': settings['user'],
+        'SECRET_DB_PASSWORD': settings['password'],
+        'SECRET_DB_READ_DSN': '',
+        'SECRET_BLOCKCHAIN_RPC_URL': simulator_url,
+        'SECRET_STRATEGY_OWNER_PRIVATE_KEY': OWNER_PRIVATE_KEY,
+        'SECRET_STRATEGY_CONTRACT_BTC': chain_simulator.SIMULATED_CONTRACT,
+        'SECRET_STRATEGY_CONTRACT_ETH': chain_simulator.SIMULATED_CONTRACT,
+        'SECRET_STRATEGY_CONTRACT_HYPE': chain_simulator.SIMULATED_CONTRACT,
+        'SECRET_TRANSACTION_API_URL': '',
+        'SECRET_TRANSACTION_API_KEY': '',
+        'SUBMISSION_MODE': 'native',
+        'FUNDING_PRECHECK_ENABLED': 'false',
+        'EXECUTION_SPREAD_WINDOW_SECONDS': '0',
+    })
+    import main
+    yield main
+
+    shared_db.get_db_pool().closeall()
+    testing.drop_scratch_database(settings, database)
+
+@pytest.fixture
+def db(buyer):
+    """A cursor on the scratch database, emptied of strategies and executions and priced before each test"""
+    conn = buyer.get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(f"TRUNCATE {', '.join(CLEARED_TABLES)}")
+            cursor.execute("DELETE FROM user_strategies")
+            cursor.execute("DELETE FROM action_nonces")
+            cursor.execute("DELETE FROM users")
+            for asset, price in PRICES.items():
+                cursor.execute("""
+                    INSERT INTO dma_status (id, asset, current_price, dma_200, status, calculated_at)
+                    VALUES (%s, %s, %s, %s, 'BELOW', now())
+                """, (f'dma-{asset}', asset, price, str(int(price) * 2)))
+            conn.commit()
+            yield cursor
+            conn.commit()
+    finally:
+        buyer.release_db_connection(conn)
+
+def insert_retry(cursor, execution_id: str, strategy_id: str, retry_count: int = 0):
+    """Insert a RETRYING execution whose backoff has passed"""
+    cursor.execute("""
+        INSERT INTO strategy_executions (id, strategy_id, status, amount_in, retry_count, error_message,
+                                         due_at, created_at, updated_at, next_check_at)
+        VALUES (%s, %s, 'RETRYING', 1000000, %s, 'Transaction API timeout', now(), now(), now(),
+                now() - interval '1 minute')
+    """, (execution_id, strategy_id, retry_count))
+    cursor.connection.commit()
@@ -0,0 +1,90 @@
+import json
+import select
+
+import psycopg2
+import pytest
+
+from spotmf_shared import single_flight, testing
+
+@pytest.fixture
+def dma_listener(buyer):
+    conn = psycopg2.connect(**buyer.get_db_settings())
+    conn.autocommit = True
+    with conn.cursor() as cursor:
+        cursor.execute(f"LISTEN {buyer.DMA_STATUS_CHANNEL}")
+    yield conn
+    conn.close()
+
+def insert_dma_status(cursor, row_id: str, asset: str, status: str, minutes_ago: float = 0):
+    cursor.execute("""
+        INSERT INTO dma_status (id, asset, current_price, dma_200, status, calculated_at)
+        VALUES (%s, %s, '100', '100', %s, now() - %s * interval '1 minute')
+    """, (row_id, asset, status, minutes_ago))
+    cursor.connection.commit()
+
+def received_changes(conn) -> list:
+    select.select([conn], [], [], 1)
+    conn.poll()
+    return [json.loads(notify.payload) for notify in conn.notifies]
+
+def test_trigger_announces_only_changes_of_the_latest_status(buyer, db, dma_listener):
+    # The fixture's rows are BELOW as of now
+    insert_dma_status(db, 'eth-unchanged', 'ETH', 'BELOW', minutes_ago=-1)
+    insert_dma_status(db, 'eth-backfill', 'ETH', 'ABOVE', minutes_ago=60)
+    insert_dma_status(db, 'btc-above', 'BTC', 'ABOVE', minutes_ago=-1)
+    insert_dma_status(db, 'btc-below', 'BTC', 'BELOW', minutes_ago=-2)
+
+    changes = received_changes(dma_listener)
+
+    assert [(change['asset'], change['previous_status'], change['status']) for change in changes] == [
+        ('BTC', 'BELOW', 'ABOVE'), ('BTC', 'ABOVE', 'BELOW')
+    ]
+
+def test_flip_executes_only_the_dma_strategies_of_flipped_assets(buyer, db):
+    testing.seed_strategy(db, 'dma-btc', asset='BTC', strategy_type='DCA_WITH_DMA')
+    testing.seed_strategy(db, 'dma-eth', asset='ETH', strategy_type='DCA_WITH_DMA')
+    testing.seed_strategy(db, 'dca-btc', asset='BTC')
+    db.connection.commit()
+
+    assert buyer.execute_dma_flip(['BTC']) is True
+
+    db.execute("SELECT strategy_id, status FROM strategy_executions")
+    assert db.fetchall() == [('dma-btc', 'EXECUTING')]
+
+def test_flip_is_deferred_while_an_execution_run_holds_the_lock(buyer, db):
+    testing.seed_strategy(db, 'dma-btc', asset='BTC', strategy_type='DCA_WITH_DMA')
+    db.connection.commit()
+    run, _ = single_flight.begin_single_flight_run('execute')
+    try:
+        assert buyer.execute_dma_flip(['BTC']) is False
+    finally:
+        run.finish()
+
+    db.execute("SELECT COUNT(*) FROM strategy_executions")
+    assert db.fetchone()[0] == 0
+
+class StopDaemon(BaseException):
+    pass
+
+def test_daemon_runs_a_flip_to_below_and_retries_a_deferred_one(buyer, monkeypatch):
+    statuses = iter([{'ETH': {'status': 'ABOVE'}, 'BTC': {'status': 'BELOW'}}])
+    monkeypatch.setattr(buyer, 'get_latest_dma_statuses',
+                        lambda: next(statuses, {'ETH': {'status': 'BELOW'}, 'BTC': {'status': 'BELOW'}}))
+    monkeypatch.setattr(buyer, 'DMA_POLL_SECONDS', 0.01)
+    monkeypatch.setattr(buyer, 'DMA_LISTEN_RETRY_SECONDS', 0.01)
+    flips = []
+
+    def execute_dma_flip(assets):
+        flips.append(assets)
+        if len(flips) == 2:
+            raise StopDaemon()
+        # The first attempt finds an execution run in progress
+        return False
+
+    monkeypatch.setattr(buyer, 'execute_dma_flip', execute_dma_flip)
+
+    with pytest.raises(StopDaemon):
+        buyer.run_dma_daemon()
+
+    # BTC was BELOW from the start, which is not a flip
+    assert flips == [['ETH'], ['ETH']]
@@ -0,0 +1,91 @@
+import pytest
+from eth_abi import decode as abi_decode, encode as abi_encode
+
+CONTRACT = '0x' + 'c0' * 20
+WALLET_A = '0x' + 'aa' * 20
+WALLET_B = '0x' + 'bb' * 20
+
+class FakeMulticall:
+    """Answers aggregate3 eth_calls from allowance and balance tables, failing the calls it is told to"""
+
+    def __init__(self, buyer, allowances, balances, failing_wallets=()):
+        self.buyer = buyer
+        self.allowances = allowances
+        self.balances = balances
+        self.failing_wallets = set(failing_wallets)
+        self.batches = []
+
+    def __call__(self, session, rpc_url, calls):
+        self.batches.append(len(calls))
+        return [self.answer(params[0]) for _, params in calls]
+
+    def answer(self, call):
+        assert call['to'] == self.buyer.MULTICALL3_ADDRESS
+        data = bytes.fromhex(call['data'][2:])
+        assert data[:4].hex() == self.buyer.AGGREGATE3_SELECTOR
+        results = []
+        for target, allow_failure, calldata in abi_decode(['(address,bool,bytes)[]'], data[4:])[0]:
+            assert target.lower() == self.buyer.USDT_TOKEN_ADDRESS.lower() and allow_failure
+            wallet = '0x' + calldata[4:36][-20:].hex()
+            if wallet in self.failing_wallets:
+                results.append((False, b''))
+            elif calldata[:4].hex() == self.buyer.ALLOWANCE_SELECTOR:
+                contract = '0x' + calldata[36:68][-20:].hex()
+                results.append((True, self.allowances[(wallet, contract)].to_bytes(32, 'big')))
+            else:
+                results.append((True, self.balances[wallet].to_bytes(32, 'big')))
+        return {'result': '0x' + abi_encode(['(bool,bytes)[]'], [results]).hex()}
+
+@pytest.fixture
+def contracts(buyer, monkeypatch):
+    monkeypatch.setenv('SECRET_STRATEGY_CONTRACT_BTC', CONTRACT)
+    monkeypatch.setenv('SECRET_STRATEGY_CONTRACT_ETH', CONTRACT)
+    return {'BTC': CONTRACT, 'ETH': CONTRACT, 'HYPE': None}
+
+def strategy(strategy_id: str, wallet: str, amount: int, asset: str = 'BTC') -> dict:
+    return {'strategy_id': strategy_id, 'wallet_address': wallet, 'asset': asset, 'interval_amount': amount}
+
+def test_read_funding_decodes_allowances_and_balances_across_chunks(buyer, contracts, monkeypatch):
+    monkeypatch.setattr(buyer, 'MULTICALL_BATCH_SIZE', 2)
+    multicall = FakeMulticall(buyer, {(WALLET_A, CONTRACT): 500, (WALLET_B, CONTRACT): 2 ** 255},
+                              {WALLET_A: 700, WALLET_B: 0})
+    monkeypatch.setattr(buyer, 'send_rpc_batch', multicall)
+
+    allowances, balances = buyer.read_funding('http://rpc', [
+        # Checksummed addresses are read as lowercase
+        strategy('strategy-1', '0x' + 'AA' * 20, 10),
+        strategy('strategy-2', WALLET_B, 10),
+        strategy('strategy-3', WALLET_B, 10, asset='HYPE'),
+    ], contracts)
+
+    # Four reads in two aggregate3 calls, sent as one JSON-RPC batch
+    assert multicall.batches == [2]
+    assert allowances == {(WALLET_A, CONTRACT): 500, (WALLET_B, CONTRACT): 2 ** 255}
+    assert balances == {WALLET_A: 700, WALLET_B: 0}
+
+def test_failed_reads_decode_as_unknown(buyer, contracts, monkeypatch):
+    monkeypatch.setattr(buyer, 'send_rpc_batch', FakeMulticall(buyer, {}, {}, failing_wallets=[WALLET_A]))
+
+    allowances, balances = buyer.read_funding('http://rpc', [strategy('strategy-1', WALLET_A, 10)], contracts)
+
+    assert allowances == {(WALLET_A, CONTRACT): None}
+    assert balances == {WALLET_A: None}
+
+def test_precheck_draws_a_wallets_strategies_from_one_balance(buyer, contracts, monkeypatch):
+    monkeypatch.setattr(buyer, 'send_rpc_batch', FakeMulticall(
+        buyer, {(WALLET_A, CONTRACT): 1000, (WALLET_B, CONTRACT): 5}, {WALLET_A: 250, WALLET_B: 1000}))
+
+    fundable, skipped = buyer.precheck_funding([
+        strategy('strategy-1', WALLET_A, 200),
+        strategy('strategy-2', WALLET_A, 100, asset='ETH'),
+        strategy('strategy-3', WALLET_B, 10),
+    ])
+
+    assert [s['strategy_id'] for s in fundable] == ['strategy-1']
+    assert skipped == {'INSUFFICIENT_BALANCE': 1, 'INSUFFICIENT_ALLOWANCE': 1}
+
+def test_precheck_fails_open_when_the_read_fails(buyer, contracts, monkeypatch):
+    monkeypatch.setattr(buyer, 'send_rpc_batch', lambda session, rpc_url, calls: [{'error': {'message': 'boom'}}])
+    strategies = [strategy('strategy-1', WALLET_A, 200)]
+
+    assert buyer.precheck_funding(strategies) == (strategies, {})
@@ -0,0 +1,133 @@
+from datetime import datetime
+
+import pytest
+import requests
+
+from conftest import PRICES
+from spotmf_shared import testing
+
+@pytest.fixture
+def submitter(buyer):
+    return buyer.NativeSubmitter()
+
+def ready_strategies(buyer, cursor, count: int):
+    """Seed count DCA strategies and load them the way a run does"""
+    for index in range(count):
+        testing.seed_strategy(cursor, f'strategy-{index}')
+    cursor.connection.commit()
+    strategies, skipped = buyer.get_strategies_ready_for_execution()
+    assert len(strategies) == count and not skipped
+    for strategy in strategies:
+        strategy['claimed_at'] = datetime.now()
+    return strategies
+
+def get_executions(cursor):
+    cursor.execute("SELECT id, status, transaction_hash, next_check_at FROM strategy_executions")
+    return {row[0]: row[1:] for row in cursor.fetchall()}
+
+def test_process_native_batch_broadcasts_swaps_on_consecutive_nonces(buyer, db, submitter):
+    strategies = ready_strategies(buyer, db, 3)
+    first_nonce = submitter.get_pending_nonce()
+
+    results = buyer.process_native_batch(submitter, strategies, PRICES)
+
+    assert [result['action'] for result in results] == ['executed'] * 3
+    tx_hashes = [result['tx_hash'] for result in results]
+    assert submitter.find_known_transactions(tx_hashes) == set(tx_hashes)
+    assert submitter.get_pending_nonce() == first_nonce + 3
+    assert submitter.get_reserved_nonce() == first_nonce + 3
+    executions = get_executions(db)
+    assert {status for status, _, _ in executions.values()} == {'EXECUTING'}
+    assert sorted(tx_hash for _, tx_hash, _ in executions.values()) == sorted(tx_hashes)
+    db.execute("SELECT COUNT(*) FROM user_strategies WHERE total_executions = 1 AND last_executed_at IS NOT NULL")
+    assert db.fetchone()[0] == 3
+
+def test_lost_batch_response_is_recorded_under_local_hashes(buyer, db, submitter, monkeypatch):
+    strategies = ready_strategies(buyer, db, 2)
+    rpc_batch = submitter.rpc_batch
+
+    def send_then_time_out(calls):
+        responses = rpc_batch(calls)
+        if calls[0][0] == 'eth_sendRawTransaction':
+            raise requests.ReadTimeout('read timed out')
+        return responses
+
+    monkeypatch.setattr(submitter, 'rpc_batch', send_then_time_out)
+    monkeypatch.setattr(submitter, 'recover_nonce_gaps', lambda gas_price: pytest.fail('nonces were recovered'))
+
+    results = buyer.process_native_batch(submitter, strategies, PRICES)
+
+    assert [result['action'] for result in results] == ['executed'] * 2
+    tx_hashes = [result['tx_hash'] for result in results]
+    assert submitter.find_known_transactions(tx_hashes) == set(tx_hashes)
+    assert {status for status, _, _ in get_executions(db).values()} == {'EXECUTING'}
+
+def test_resent_swap_the_node_already_knows_counts_as_submitted(buyer, db, submitter, monkeypatch):
+    strategies = ready_strategies(buyer, db, 1)
+    nonce = submitter.get_pending_nonce()
+    monkeypatch.setattr(submitter, 'reserve_nonces', lambda count: nonce)
+    first = buyer.process_native_batch(submitter, strategies, PRICES)[0]
+
+    # The same swap on the same nonce, as after a crash between broadcast and recording it
+    resent = dict(strategies[0], execution_id=first['execution_id'])
+    second = buyer.process_native_batch(submitter, [resent], PRICES)[0]
+
+    assert second['action'] == 'executed'
+    assert second['tx_hash'] == first['tx_hash']
+    assert submitter.get_pending_nonce() == nonce + 1
+
+def test_rejected_nonce_is_retried_and_the_gap_filled(buyer, db, submitter, monkeypatch):
+    strategies = ready_strategies(buyer, db, 1)
+    rpc_batch = submitter.rpc_batch
+
+    def reject_swaps(calls):
+        if calls[0][0] == 'eth_sendRawTransaction' and calls[0][1][0] in signed_swaps:
+            return [{'error': {'message': 'nonce too low'}} for _ in calls]
+        return rpc_batch(calls)
+
+    sign = submitter.sign
+    signed_swaps = set()
+
+    def sign_swap(nonce, to, data, gas, gas_price):
+        raw_tx, tx_hash = sign(nonce, to, data, gas, gas_price)
+        if data != '0x':
+            signed_swaps.add(raw_tx)
+        return raw_tx, tx_hash
+
+    monkeypatch.setattr(submitter, 'rpc_batch', reject_swaps)
+    monkeypatch.setattr(submitter, 'sign', sign_swap)
+
+    result = buyer.process_native_batch(submitter, strategies, PRICES)[0]
+
+    assert result['action'] == 'retry_scheduled'
+    assert result['error_class'] == 'NONCE'
+    assert [status for status, _, _ in get_executions(db).values()] == ['RETRYING']
+    # The reserved nonce was filled with a self transfer so later swaps are not stuck behind it
+    assert submitter.get_pending_nonce() == submitter.get_reserved_nonce()
+
+def test_deadline_defers_strategies_without_recording_them(buyer, db, monkeypatch):
+    strategies = ready_strategies(buyer, db, 4)
+    monkeypatch.setattr(buyer, 'EXECUTION_RUN_DEADLINE_SECONDS', 0)
+
+    results, deferred = buyer.submit_strategies(strategies, run_started=0, spread=False)
+
+    assert results == []
+    assert deferred == 4
+    assert get_executions(db) == {}
+
+def test_execute_submits_every_ready_strategy(buyer, db, monkeypatch):
+    # Small fetches, so the snapshot is built from several chunks
+    monkeypatch.setattr(buyer, 'SNAPSHOT_FETCH_ROWS', 2)
+    for index in range(5):
+        testing.seed_strategy(db, f'strategy-{index}')
+    testing.seed_strategy(db, 'strategy-dma', asset='ETH', strategy_type='DCA_WITH_DMA')
+    testing.seed_strategy(db, 'strategy-done', last_executed_at=datetime.now())
+    db.connection.commit()
+
+    response = buyer.app.test_client().post('/execute')
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['successful'] == 6
+    assert body['deferred'] == 0
+    assert {result['trigger_reason'] for result in body['results']} == {'DCA_INTERVAL', 'DMA_BELOW'}
@@ -0,0 +1,54 @@
+from datetime import datetime
+
+from conftest import insert_retry
+from spotmf_shared import testing
+
+def get_execution(cursor, execution_id: str):
+    cursor.execute("SELECT status, retry_count, next_check_at, transaction_hash FROM strategy_executions WHERE id = %s",
+                   (execution_id,))
+    return cursor.fetchone()
+
+def test_claim_leases_retries_without_leaving_retrying(buyer, db):
+    testing.seed_strategy(db, 'strategy-1')
+    insert_retry(db, 'execution-1', 'strategy-1')
+
+    claimed = buyer.claim_due_retries(10)
+
+    assert [retry['execution_id'] for retry in claimed] == ['execution-1']
+    assert claimed[0]['active'] is True
+    status, retry_count, next_check_at, _ = get_execution(db, 'execution-1')
+    assert (status, retry_count) == ('RETRYING', 1)
+    assert next_check_at > datetime.now()
+    # Leased, so a concurrent run does not claim it again
+    assert buyer.claim_due_retries(10) == []
+
+def test_retries_are_resubmitted_and_due_for_a_monitor_check(buyer, db):
+    testing.seed_strategy(db, 'strategy-1')
+    insert_retry(db, 'execution-1', 'strategy-1')
+
+    results = buyer.execute_retries()
+
+    assert [result['action'] for result in results] == ['executed']
+    status, _, next_check_at, tx_hash = get_execution(db, 'execution-1')
+    assert status == 'EXECUTING'
+    assert tx_hash == results[0]['tx_hash']
+    assert next_check_at <= datetime.now()
+
+def test_retries_of_inactive_strategies_are_dropped(buyer, db):
+    testing.seed_strategy(db, 'strategy-1')
+    db.execute("""UPDATE user_strategies SET "isActive" = false WHERE id = 'strategy-1'""")
+    insert_retry(db, 'execution-1', 'strategy-1')
+
+    results = buyer.execute_retries()
+
+    assert [result['action'] for result in results] == ['failed']
+    assert get_execution(db, 'execution-1')[0] == 'FAILED'
+
+def test_strategies_with_a_pending_retry_are_not_executed_again(buyer, db):
+    testing.seed_strategy(db, 'strategy-1')
+    testing.seed_strategy(db, 'strategy-2')
+    insert_retry(db, 'execution-1', 'strategy-1')
+
+    strategies, _ = buyer.get_strategies_ready_for_execution()
+
+    assert [strategy['strategy_id'] for strategy in strategies] == ['strategy-2']
@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta, timezone
+
+NOW = datetime(2024, 6, 1, 12, 0)
+DMA_STATUSES = {'BTC': {'status': 'BELOW'}, 'ETH': {'status': 'ABOVE'}}
+
+def scan_row(strategy_id: str, strategy_type: str = 'DCA', asset: str = 'BTC', days_ago=None, interval_days: int = 1):
+    """A strategy_scan row; last_executed_at is read as UTC epoch seconds"""
+    last_executed_epoch = None if days_ago is None else \
+        (NOW - timedelta(days=days_ago)).replace(tzinfo=timezone.utc).timestamp()
+    return (strategy_id, '0xwallet', last_executed_epoch, 3, strategy_type, asset, 10 ** 6, interval_days, 1.5, 10 ** 8)
+
+def select(buyer, rows, chunk_size: int = 2):
+    chunks = [rows[i:i + chunk_size] for i in range(0, len(rows), chunk_size)]
+    strategies, skipped = buyer.StrategySnapshot(chunks).select_ready(NOW, DMA_STATUSES)
+    return {strategy['strategy_id']: strategy['trigger_reason'] for strategy in strategies}, skipped
+
+def test_ready_mask_uses_whole_elapsed_days(buyer):
+    selected, _ = select(buyer, [
+        scan_row('never'),
+        scan_row('due', days_ago=1),
+        scan_row('almost', days_ago=0.99),
+        scan_row('weekly-early', days_ago=6.5, interval_days=7),
+        scan_row('weekly-due', days_ago=7, interval_days=7),
+    ])
+
+    assert selected == {'never': 'DCA_INTERVAL', 'due': 'DCA_INTERVAL', 'weekly-due': 'DCA_INTERVAL'}
+
+def test_dma_gating_and_skip_reasons(buyer):
+    selected, skipped = select(buyer, [
+        scan_row('dca-eth', asset='ETH'),
+        scan_row('dma-below', strategy_type='DCA_WITH_DMA', asset='BTC'),
+        scan_row('dma-above', strategy_type='DCA_WITH_DMA', asset='ETH'),
+        scan_row('dma-no-data', strategy_type='DCA_WITH_DMA', asset='HYPE'),
+        scan_row('dma-not-ready', strategy_type='DCA_WITH_DMA', asset='ETH', days_ago=0.5),
+        scan_row('unknown-type', strategy_type='LIMIT'),
+    ], chunk_size=4)
+
+    assert selected == {'dca-eth': 'DCA_INTERVAL', 'dma-below': 'DMA_BELOW'}
+    assert skipped == {'DMA_ABOVE': 1, 'NO_DMA_DATA': 1, 'UNKNOWN_STRATEGY_TYPE': 1}
+
+def test_materialized_strategies_round_trip_the_row(buyer):
+    snapshot = buyer.StrategySnapshot([[scan_row('due', asset='ETH', days_ago=2, interval_days=1)]])
+
+    strategy = snapshot.select_ready(NOW, DMA_STATUSES)[0][0]
+
+    assert strategy['last_executed_at'] == NOW - timedelta(days=2)
+    assert strategy['due_at'] == NOW - timedelta(days=1)
+    assert (strategy['asset'], strategy['strategy_type']) == ('ETH', 'DCA')
+    assert (strategy['interval_amount'], strategy['total_amount'], strategy['total_executions']) == (10 ** 6, 10 ** 8, 3)
+    assert strategy['accepted_slippage'] == 1.5
+
+def test_empty_snapshot_selects_nothing(buyer):
+    assert buyer.StrategySnapshot([]).select_ready(NOW, DMA_STATUSES) == ([], {})
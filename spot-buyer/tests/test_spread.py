@@ -0,0 +1,63 @@
+import time
+
+def test_offsets_depend_only_on_the_strategy_id(buyer):
+    offsets = [buyer.get_execution_offset(f'strategy-{index}', 600) for index in range(100)]
+
+    assert all(0 <= offset < 600 for offset in offsets)
+    assert offsets == [buyer.get_execution_offset(f'strategy-{index}', 600) for index in range(100)]
+    assert len(set(offsets)) == 100
+
+def test_offsets_do_not_move_with_the_number_of_due_strategies(buyer, monkeypatch):
+    monkeypatch.setattr(buyer, 'SUBMISSION_MODE', 'api')
+    monkeypatch.setattr(buyer, 'EXECUTION_SPREAD_WINDOW_SECONDS', 300)
+    # A rate that could not get through the larger run inside the deadline
+    monkeypatch.setattr(buyer, 'SUBMISSION_RATE_PER_SECOND', 1)
+    monkeypatch.setattr(buyer, 'SUBMISSION_BURST', 1000)
+    monkeypatch.setattr(buyer, 'process_strategy', lambda strategy: {'strategy_id': strategy['strategy_id']})
+    get_execution_offset = buyer.get_execution_offset
+    offsets = {}
+
+    def record_offset(strategy_id, window):
+        offsets[strategy_id] = get_execution_offset(strategy_id, window)
+        return offsets[strategy_id]
+
+    monkeypatch.setattr(buyer, 'get_execution_offset', record_offset)
+
+    def submitted_offsets(count: int):
+        offsets.clear()
+        # Started a window ago, so every offset has already come up
+        results, _ = buyer.submit_strategies([{'strategy_id': f'strategy-{index}'} for index in range(count)],
+                                             run_started=time.monotonic() - 300)
+        assert [result['strategy_id'] for result in results] == sorted(offsets, key=offsets.get)
+        return dict(offsets)
+
+    small, large = submitted_offsets(10), submitted_offsets(700)
+
+    assert small == {strategy_id: large[strategy_id] for strategy_id in small}
+
+def test_deadline_defers_rate_limited_submissions(buyer, monkeypatch):
+    monkeypatch.setattr(buyer, 'SUBMISSION_MODE', 'api')
+    monkeypatch.setattr(buyer, 'EXECUTION_RUN_DEADLINE_SECONDS', 0.2)
+    monkeypatch.setattr(buyer, 'SUBMISSION_RATE_PER_SECOND', 10)
+    monkeypatch.setattr(buyer, 'SUBMISSION_BURST', 1)
+    monkeypatch.setattr(buyer, 'process_strategy', lambda strategy: {'strategy_id': strategy['strategy_id']})
+
+    results, deferred = buyer.submit_strategies([{'strategy_id': f'strategy-{index}'} for index in range(10)],
+                                                run_started=time.monotonic(), spread=False)
+
+    assert 1 <= len(results) < 10
+    assert len(results) + deferred == 10
+
+def test_token_bucket_allows_a_burst_then_the_rate(buyer):
+    bucket = buyer.TokenBucket(rate=20, capacity=3)
+
+    started = time.monotonic()
+    for _ in range(3):
+        bucket.acquire()
+    burst_seconds = time.monotonic() - started
+    for _ in range(2):
+        bucket.acquire()
+    total_seconds = time.monotonic() - started
+
+    assert burst_seconds < 0.05
+    assert 0.09 <= total_seconds < 0.5
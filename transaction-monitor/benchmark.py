@@ -0,0 +1,204 @@
+"""Benchmark the transaction monitor against the local chain simulator.
+
+Seeds N pending strategy_executions, drains them with the monitor's check pass and reports
+transactions checked per second, RPC calls and DB statements per transaction and the time
+to drain the backlog. Database credentials come from the usual secrets (SECRET_DB_HOST,
+SECRET_DB_NAME, ... for local runs). Use a scratch database: confirmations update the
+strategy and wallet rollups.
+
+    python benchmark.py --transactions 5000 --latency-ms 30 --batch-limit 50
+    python benchmark.py --rpc-url http://127.0.0.1:8545 --mode logs
+
+In logs mode reverted transactions emit no event and only settle through the receipt
+fallback (LOG_SCAN_RECEIPT_FALLBACK_MINUTES), so pass --revert-rate 0 to measure a full drain.
+"""
+import argparse
+import hashlib
+import logging
+import os
+import sys
+import time
+import uuid
+from datetime import datetime
+
+import requests
+
+import chain_simulator
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Transaction monitor benchmark')
+    parser.add_argument('--transactions', type=int, default=1000, help='pending executions to seed')
+    parser.add_argument('--rpc-url', help='use a running simulator instead of starting one in-process')
+    parser.add_argument('--port', type=int, default=8599, help='port of the in-process simulator')
+    parser.add_argument('--mode', choices=['receipts', 'logs'], default='receipts', help='MONITOR_CONFIRMATION_MODE')
+    parser.add_argument('--block-time', type=float, default=0.5)
+    parser.add_argument('--latency-ms', type=float, default=20.0)
+    parser.add_argument('--jitter-ms', type=float, default=5.0)
+    parser.add_argument('--batch-limit', type=int, default=100)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--revert-rate', type=float, default=0.05)
+    parser.add_argument('--timeout', type=float, default=300, help='give up draining after this many seconds')
+    parser.add_argument('--keep', action='store_true', help='keep the seeded executions afterwards')
+    parser.add_argument('--verbose', action='store_true', help='keep the monitor INFO logging')
+    return parser.parse_args()
+
+def rpc(url: str, method: str, params: list):
+    response = requests.post(url, json={'jsonrpc': '2.0', 'method': method, 'params': params, 'id': 1}, timeout=30)
+    response.raise_for_status()
+    return response.json()['result']
+
+def seed_executions(monitor, count: int, run_id: str):
+    """Insert pending executions spread over the existing strategies, returning (ids, hashes)"""
+    conn = monitor.get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT id, (SELECT interval_amount FROM action_nonces WHERE id = action_nonce_id) "
+                           "FROM user_strategies ORDER BY id LIMIT 1000")
+            strategies = cursor.fetchall()
+            if not strategies:
+                raise SystemExit('No user_strategies to attach benchmark executions to')
+
+            ids = [f'bench-{run_id}-{i}' for i in range(count)]
+            hashes = ['0x' + hashlib.sha256(execution_id.encode()).hexdigest() for execution_id in ids]
+            chosen = [strategies[i % len(strategies)] for i in range(count)]
+            now = datetime.now()
+            cursor.execute("""
+                INSERT INTO strategy_executions
+                (id, strategy_id, transaction_hash, status, amount_in, executed_at, due_at, broadcast_at,
+                 next_check_at, created_at, updated_at)
+                SELECT v.id, v.strategy_id, v.transaction_hash, 'EXECUTING', v.amount_in, %s, %s, %s, %s, %s, %s
+                FROM unnest(%s::text[], %s::text[], %s::text[], %s::bigint[]) AS v(id, strategy_id, transaction_hash, amount_in)
+            """, (now, now, now, now, now, now, ids, [s[0] for s in chosen], hashes, [s[1] or 0 for s in chosen]))
+            conn.commit()
+            return ids, hashes
+
+    finally:
+        monitor.release_db_connection(conn)
+
+def count_unsettled(monitor, ids) -> int:
+    conn = monitor.get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM strategy_executions WHERE id = ANY(%s) "
+                           "AND status IN ('EXECUTING', 'PENDING')", (ids,))
+            return cursor.fetchone()[0]
+
+    finally:
+        monitor.release_db_connection(conn)
+
+def count_by_status(monitor, ids):
+    conn = monitor.get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT status, COUNT(*) FROM strategy_executions WHERE id = ANY(%s) GROUP BY status", (ids,))
+            return dict(cursor.fetchall())
+
+    finally:
+        monitor.release_db_connection(conn)
+
+def remove_executions(monitor, ids):
+    conn = monitor.get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("DELETE FROM failed_transaction_logs WHERE execution_id = ANY(%s)", (ids,))
+            cursor.execute("DELETE FROM strategy_executions WHERE id = ANY(%s)", (ids,))
+            conn.commit()
+
+    finally:
+        monitor.release_db_connection(conn)
+
+def reset_log_scan_checkpoint(monitor):
+    conn = monitor.get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("DELETE FROM service_checkpoints WHERE name = %s", (monitor.LOG_SCAN_CHECKPOINT,))
+            conn.commit()
+
+    finally:
+        monitor.release_db_connection(conn)
+
+def total_statement_calls(monitor) -> int:
+    return sum(stats['calls'] for stats in monitor.get_statement_metrics().values())
+
+def main():
+    args = parse_args()
+
+    server = None
+    rpc_url = args.rpc_url
+    if not rpc_url:
+        server = chain_simulator.start_simulator([
+            '--port', str(args.port), '--block-time', str(args.block_time),
+            '--latency-ms', str(args.latency_ms), '--jitter-ms', str(args.jitter_ms),
+            '--batch-limit', str(args.batch_limit), '--failure-rate', str(args.failure_rate),
+            '--revert-rate', str(args.revert_rate), '--drop-rate', '0'
+        ])
+        rpc_url = f'http://127.0.0.1:{args.port}'
+
+    # The monitor reads its configuration at import time
+    os.environ['SECRET_BLOCKCHAIN_RPC_URLS'] = rpc_url
+    os.environ['MONITOR_CONFIRMATION_MODE'] = args.mode
+    os.environ.setdefault('SECRET_STRATEGY_CONTRACT_BTC', chain_simulator.SIMULATED_CONTRACT)
+    import main as monitor
+    if not args.verbose:
+        logging.getLogger('main').setLevel(logging.WARNING)
+
+    # The simulated chain restarts at --start-block, so a scan position from an earlier run is stale
+    if args.mode == 'logs':
+        reset_log_scan_checkpoint(monitor)
+
+    run_id = uuid.uuid4().hex[:8]
+    ids, hashes = seed_executions(monitor, args.transactions, run_id)
+    seeded = set(ids)
+    # Broadcast: the simulated chain starts mining them now
+    for start in range(0, len(hashes), 1000):
+        rpc(rpc_url, 'sim_registerTransactions', hashes[start:start + 1000])
+    print(f"Seeded {len(ids)} executions (run {run_id}) against {rpc_url} in {args.mode} mode")
+
+    stats_before = rpc(rpc_url, 'sim_stats', [])
+    statements_before = total_statement_calls(monitor)
+    started = time.monotonic()
+    check_seconds = 0.0
+    checked = 0
+    passes = 0
+    unsettled = len(ids)
+
+    try:
+        while unsettled and time.monotonic() - started < args.timeout:
+            pending = [tx for tx in monitor.get_pending_transactions(due_before=datetime.max)
+                       if tx['execution_id'] in seeded]
+            pass_started = time.perf_counter()
+            monitor.process_pending_transactions(pending)
+            check_seconds += time.perf_counter() - pass_started
+            checked += len(pending)
+            passes += 1
+
+            unsettled = count_unsettled(monitor, ids)
+            if unsettled:
+                time.sleep(args.block_time)
+
+        drain_seconds = time.monotonic() - started
+        stats_after = rpc(rpc_url, 'sim_stats', [])
+        statements = total_statement_calls(monitor) - statements_before
+        http_requests = stats_after['http_requests'] - stats_before['http_requests']
+        rpc_calls = stats_after['rpc_calls'] - stats_before['rpc_calls']
+        statuses = count_by_status(monitor, ids)
+
+        print(f"Drained:                 {len(ids) - unsettled}/{len(ids)} in {drain_seconds:.2f}s "
+              f"({passes} check passes)" + ('' if not unsettled else ' - TIMED OUT'))
+        print(f"Final statuses:          {statuses}")
+        print(f"Checked per second:      {checked / check_seconds if check_seconds else 0:.1f} "
+              f"({checked} checks in {check_seconds:.2f}s of check passes)")
+        print(f"RPC HTTP requests / tx:  {http_requests / len(ids):.3f}")
+        print(f"RPC calls / tx:          {rpc_calls / len(ids):.3f}")
+        print(f"DB statements / tx:      {statements / len(ids):.3f}")
+        print(f"Rejected batches:        {stats_after['rejected_batches'] - stats_before['rejected_batches']}, "
+              f"injected failures: {stats_after['injected_failures'] - stats_before['injected_failures']}")
+
+    finally:
+        if not args.keep:
+            remove_executions(monitor, ids)
+        if server:
+            server.shutdown()
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,283 @@
+"""Local JSON-RPC stand-in for the transaction monitor.
+
+Serves deterministic receipts and *StrategyExecuted logs with configurable block time,
+latency, batch limits and failure rates, so the monitor can be exercised and benchmarked
+without a real node:
+
+    python chain_simulator.py --port 8545 --block-time 1 --latency-ms 40 --batch-limit 50
+
+A transaction is "broadcast" the first time it is seen (receipt query,
+sim_registerTransactions or eth_sendRawTransaction) and mines a hash-derived number of blocks
+later. A hash-derived fraction reverts and another fraction is dropped and never mines.
+
+For the spot buyer's native submission mode it also answers eth_chainId, eth_gasPrice,
+eth_getTransactionCount, eth_sendRawTransaction and eth_getTransactionByHash for a single
+signer: the pending nonce is the number of raw transactions accepted, and resending a known raw
+transaction is answered with "already known". Hashing raw transactions needs eth-utils.
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, List, Optional
+
+# keccak256 of the *StrategyExecuted(address,uint256,uint256,uint256) event signatures
+STRATEGY_EXECUTED_TOPICS = {
+    'BTC': '0x630869cc90f628f505bfb160d98d5eddd816e6c5ecc8ec138d47276eb6caf793',
+    'ETH': '0xd7a7fd3ef16fa4a845b987e8954b06c2aed1ae81065f227fb60e2009b032c547',
+    'HYPE': '0x07d738a6ba708f1a1ff2d3506a5239ce5d2ee78d9d86151bc625538a439654a5',
+}
+SIMULATED_CONTRACT = '0x' + '5' * 40
+GAS_USED = 180000
+GAS_PRICE = 10 ** 9
+
+class SimulatedChain:
+    """Block clock plus deterministic transaction outcomes keyed by hash"""
+
+    def __init__(self, block_time: float, start_block: int, max_confirm_blocks: int,
+                 revert_rate: float, drop_rate: float):
+        self.block_time = block_time
+        self.start_block = start_block
+        self.max_confirm_blocks = max_confirm_blocks
+        self.revert_rate = revert_rate
+        self.drop_rate = drop_rate
+        self.started = time.monotonic()
+        self.first_seen = {}
+        self.sent = set()
+        self.lock = threading.Lock()
+
+    def block_number(self) -> int:
+        return self.start_block + int((time.monotonic() - self.started) / self.block_time)
+
+    def register(self, tx_hash: str) -> int:
+        """Record the block a transaction was first seen at"""
+        with self.lock:
+            return self.first_seen.setdefault(tx_hash.lower(), self.block_number())
+
+    def send_raw(self, raw_tx: str) -> Optional[str]:
+        """Accept a raw transaction and return its hash, or None when it was already sent"""
+        from eth_utils import keccak
+        tx_hash = '0x' + keccak(hexstr=raw_tx).hex()
+        with self.lock:
+            if tx_hash in self.sent:
+                return None
+            self.sent.add(tx_hash)
+        self.register(tx_hash)
+        return tx_hash
+
+    def pending_nonce(self) -> int:
+        with self.lock:
+            return len(self.sent)
+
+    def transaction(self, tx_hash: str) -> Optional[Dict]:
+        """A sent transaction as eth_getTransactionByHash returns it"""
+        with self.lock:
+            if tx_hash.lower() not in self.sent:
+                return None
+        receipt = self.receipt(tx_hash)
+        return {'hash': tx_hash, 'blockNumber': receipt['blockNumber'] if receipt else None}
+
+    def outcome(self, tx_hash: str) -> Dict:
+        """Deterministic fate of a transaction: mined block (None if dropped) and success"""
+        digest = hashlib.sha256(tx_hash.lower().encode()).digest()
+        roll = int.from_bytes(digest[:4], 'big') / 2 ** 32
+        confirm_blocks = 1 + digest[4] % self.max_confirm_blocks
+        seen_block = self.register(tx_hash)
+
+        if roll < self.drop_rate:
+            return {'mined_block': None, 'success': False}
+        return {
+            'mined_block': seen_block + confirm_blocks,
+            'success': roll >= self.drop_rate + self.revert_rate,
+            'amount_out': 1000 + int.from_bytes(digest[5:9], 'big') % 100000,
+            'asset': list(STRATEGY_EXECUTED_TOPICS)[digest[9] % len(STRATEGY_EXECUTED_TOPICS)]
+        }
+
+    def execution_log(self, tx_hash: str, outcome: Dict) -> Dict:
+        data = '0x' + '%064x' % 10 ** 6 + '%064x' % outcome['amount_out'] + '%064x' % int(time.time())
+        return {
+            'address': SIMULATED_CONTRACT,
+            'blockNumber': hex(outcome['mined_block']),
+            'transactionHash': tx_hash,
+            'topics': [STRATEGY_EXECUTED_TOPICS[outcome['asset']], '0x' + '0' * 64],
+            'data': data
+        }
+
+    def receipt(self, tx_hash: str) -> Optional[Dict]:
+        outcome = self.outcome(tx_hash)
+        if outcome['mined_block'] is None or outcome['mined_block'] > self.block_number():
+            return None
+        return {
+            'transactionHash': tx_hash,
+            'blockNumber': hex(outcome['mined_block']),
+            'status': '0x1' if outcome['success'] else '0x0',
+            'gasUsed': hex(GAS_USED),
+            'effectiveGasPrice': hex(GAS_PRICE),
+            'logs': [self.execution_log(tx_hash, outcome)] if outcome['success'] else []
+        }
+
+    def logs(self, from_block: int, to_block: int) -> List[Dict]:
+        """Execution events of every known transaction mined in the range"""
+        with self.lock:
+            tx_hashes = list(self.first_seen)
+        head = self.block_number()
+        logs = []
+        for tx_hash in tx_hashes:
+            outcome = self.outcome(tx_hash)
+            mined_block = outcome['mined_block']
+            if outcome['success'] and mined_block is not None and from_block <= mined_block <= min(to_block, head):
+                logs.append(self.execution_log(tx_hash, outcome))
+        return logs
+
+class SimulatorStats:
+    """Request counters, readable through the sim_stats method"""
+
+    def __init__(self):
+        self.http_requests = 0
+        self.rpc_calls = 0
+        self.methods = {}
+        self.rejected_batches = 0
+        self.injected_failures = 0
+        self.lock = threading.Lock()
+
+    def snapshot(self) -> Dict:
+        with self.lock:
+            return {
+                'http_requests': self.http_requests,
+                'rpc_calls': self.rpc_calls,
+                'methods': dict(self.methods),
+                'rejected_batches': self.rejected_batches,
+                'injected_failures': self.injected_failures
+            }
+
+def make_handler(chain: SimulatedChain, stats: SimulatorStats, args):
+    rng = random.Random(args.seed)
+    rng_lock = threading.Lock()
+
+    def rpc_result(request_id, result):
+        return {'jsonrpc': '2.0', 'id': request_id, 'result': result}
+
+    def rpc_error(request_id, code, message):
+        return {'jsonrpc': '2.0', 'id': request_id, 'error': {'code': code, 'message': message}}
+
+    def handle_call(call: Dict) -> Dict:
+        method = call.get('method')
+        params = call.get('params') or []
+        request_id = call.get('id')
+
+        with stats.lock:
+            stats.rpc_calls += 1
+            stats.methods[method] = stats.methods.get(method, 0) + 1
+
+        if method == 'eth_blockNumber':
+            return rpc_result(request_id, hex(chain.block_number()))
+        if method == 'eth_getTransactionReceipt':
+            return rpc_result(request_id, chain.receipt(params[0]))
+        if method == 'eth_getLogs':
+            query = params[0]
+            from_block = int(query.get('fromBlock', '0x0'), 16)
+            to_block = int(query.get('toBlock', hex(chain.block_number())), 16)
+            if to_block - from_block + 1 > args.max_log_range:
+                return rpc_error(request_id, -32005, f'block range too large, max {args.max_log_range}')
+            return rpc_result(request_id, chain.logs(from_block, to_block))
+        if method == 'eth_chainId':
+            return rpc_result(request_id, hex(args.chain_id))
+        if method == 'eth_gasPrice':
+            return rpc_result(request_id, hex(GAS_PRICE))
+        if method == 'eth_getTransactionCount':
+            return rpc_result(request_id, hex(chain.pending_nonce()))
+        if method == 'eth_sendRawTransaction':
+            tx_hash = chain.send_raw(params[0])
+            if tx_hash is None:
+                return rpc_error(request_id, -32000, 'already known')
+            return rpc_result(request_id, tx_hash)
+        if method == 'eth_getTransactionByHash':
+            return rpc_result(request_id, chain.transaction(params[0]))
+        if method == 'sim_registerTransactions':
+            for tx_hash in params:
+                chain.register(tx_hash)
+            return rpc_result(request_id, len(params))
+        if method == 'sim_stats':
+            return rpc_result(request_id, stats.snapshot())
+        return rpc_error(request_id, -32601, f'method {method} not supported')
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *log_args):
+            pass
+
+        def respond(self, status: int, body: Optional[object]):
+            data = json.dumps(body).encode() if body is not None else b''
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            with stats.lock:
+                stats.http_requests += 1
+
+            with rng_lock:
+                latency = max(args.latency_ms + rng.uniform(-args.jitter_ms, args.jitter_ms), 0) / 1000
+                inject_failure = rng.random() < args.failure_rate
+            time.sleep(latency)
+
+            is_sim_call = isinstance(body, dict) and str(body.get('method', '')).startswith('sim_')
+            if inject_failure and not is_sim_call:
+                with stats.lock:
+                    stats.injected_failures += 1
+                self.respond(503, {'error': 'injected failure'})
+                return
+
+            if isinstance(body, list):
+                if len(body) > args.batch_limit:
+                    with stats.lock:
+                        stats.rejected_batches += 1
+                    self.respond(200, rpc_error(None, -32600, f'batch too large, limit {args.batch_limit}'))
+                    return
+                self.respond(200, [handle_call(call) for call in body])
+            else:
+                self.respond(200, handle_call(body))
+
+    return Handler
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description='Local JSON-RPC chain stand-in for the transaction monitor')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8545)
+    parser.add_argument('--block-time', type=float, default=1.0, help='seconds per block')
+    parser.add_argument('--start-block', type=int, default=1000000)
+    parser.add_argument('--max-confirm-blocks', type=int, default=3,
+                        help='transactions mine 1..N blocks after they are first seen')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='added latency per HTTP request')
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help='uniform +/- jitter on the latency')
+    parser.add_argument('--batch-limit', type=int, default=100, help='largest JSON-RPC batch accepted')
+    parser.add_argument('--max-log-range', type=int, default=1000, help='largest eth_getLogs block range')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='fraction of requests answered with HTTP 503')
+    parser.add_argument('--revert-rate', type=float, default=0.05, help='fraction of transactions that revert')
+    parser.add_argument('--drop-rate', type=float, default=0.01, help='fraction of transactions that never mine')
+    parser.add_argument('--seed', type=int, default=0, help='seed for latency jitter and injected failures')
+    parser.add_argument('--chain-id', type=int, default=31337)
+    return parser
+
+def build_simulator(argv: Optional[List[str]] = None) -> ThreadingHTTPServer:
+    """Build the simulator server from command line arguments, without serving yet"""
+    args = build_parser().parse_args(argv)
+    chain = SimulatedChain(args.block_time, args.start_block, args.max_confirm_blocks, args.revert_rate, args.drop_rate)
+    return ThreadingHTTPServer((args.host, args.port), make_handler(chain, SimulatorStats(), args))
+
+def start_simulator(argv: Optional[List[str]] = None) -> ThreadingHTTPServer:
+    """Start the simulator on a background thread and return its server"""
+    server = build_simulator(argv or [])
+    threading.Thread(target=server.serve_forever, name='chain-simulator', daemon=True).start()
+    return server
+
+if __name__ == '__main__':
+    server = build_simulator()
+    host, port = server.server_address[:2]
+    print(f"Chain simulator listening on http://{host}:{port}")
+    server.serve_forever()
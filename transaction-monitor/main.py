@@ -1,12 +1,36 @@
 import os
+import sys
 import json
+import hashlib
+import hmac
 import logging
+import select
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from flask import Flask, request, jsonify
 import psycopg2
 from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+from urllib.parse import urlparse
 import requests
-from typing import List, Dict, Optional
-from google.cloud import secretmanager
+import websocket
+from typing import List, Dict, Optional, Set, Tuple
+
+# Shared service code: deploy.sh copies shared/spotmf_shared next to main.py for the image, a
+# checkout imports it from the repository
+SHARED_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'shared')
+if os.path.isdir(SHARED_PATH):
+    sys.path.append(SHARED_PATH)
+
+from spotmf_shared import configure_service
+from spotmf_shared.secret_manager import get_secret
+from spotmf_shared.db import (get_db_connection, release_db_connection, get_db_settings, get_read_connection,
+                              note_write_position, get_read_routing_metrics, register_statements,
+                              execute_prepared, get_statement_metrics)
+from spotmf_shared.single_flight import begin_single_flight_run, get_single_flight_metrics
+from spotmf_shared.tracing import record_span, flush_spans
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -14,66 +38,602 @@ logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
-# Initialize Secret Manager client
-secret_client = secretmanager.SecretManagerServiceClient()
-project_id = os.environ.get('GOOGLE_CLOUD_PROJECT')
+# Receipt fetching: JSON-RPC batch size and number of batches in flight
+RPC_BATCH_SIZE = int(os.environ.get('RPC_BATCH_SIZE', 100))
+RPC_MAX_CONCURRENT_BATCHES = int(os.environ.get('RPC_MAX_CONCURRENT_BATCHES', 4))
+RPC_TIMEOUT_SECONDS = 10
 
-def get_secret(secret_id):
-    """Get secret from Google Secret Manager"""
-    try:
-        name = f"projects/{project_id}/secrets/{secret_id}/versions/latest"
-        response = secret_client.access_secret_version(request={"name": name})
-        return response.payload.data.decode("UTF-8")
-    except Exception as e:
-        logger.error(f"Error accessing secret {secret_id}: {e}")
-        return None
+# RPC endpoint pool (blockchain-rpc-urls, comma separated): requests go to the fastest healthy
+# node, a hedged duplicate goes to the next one when a call outlives the latency percentile,
+# and nodes lagging the best known block are never trusted to report a receipt as missing
+RPC_HEDGE_PERCENTILE = float(os.environ.get('RPC_HEDGE_PERCENTILE', 95))
+RPC_HEDGE_MIN_DELAY_MS = float(os.environ.get('RPC_HEDGE_MIN_DELAY_MS', 100))
+RPC_HEDGE_DEFAULT_DELAY_MS = 1000  # until an endpoint has enough latency samples
+RPC_LATENCY_WINDOW = 200
+RPC_LATENCY_EWMA_ALPHA = 0.2
+RPC_MAX_BLOCK_LAG = int(os.environ.get('RPC_MAX_BLOCK_LAG', 5))
+RPC_HEIGHT_REFRESH_SECONDS = float(os.environ.get('RPC_HEIGHT_REFRESH_SECONDS', 15))
+RPC_ENDPOINT_FAILURE_THRESHOLD = 3
+RPC_ENDPOINT_COOLDOWN_SECONDS = float(os.environ.get('RPC_ENDPOINT_COOLDOWN_SECONDS', 30))
 
-# Database connection
-def get_db_connection():
-    return psycopg2.connect(
-        host=get_secret('db-host'),
-        database=get_secret('db-name'),
-        user=get_secret('db-user'),
-        password=get_secret('db-password'),
-        port=5432
-    )
+rpc_session = requests.Session()
+rpc_session.mount('http://', requests.adapters.HTTPAdapter(pool_maxsize=RPC_MAX_CONCURRENT_BATCHES * 2))
+rpc_session.mount('https://', requests.adapters.HTTPAdapter(pool_maxsize=RPC_MAX_CONCURRENT_BATCHES * 2))
+
+# Confirmation mode: 'receipts' polls each pending hash, 'logs' scans *StrategyExecuted events
+MONITOR_CONFIRMATION_MODE = os.environ.get('MONITOR_CONFIRMATION_MODE', 'receipts')
+LOG_SCAN_MAX_BLOCK_RANGE = int(os.environ.get('LOG_SCAN_MAX_BLOCK_RANGE', 2000))
+LOG_SCAN_INITIAL_LOOKBACK_BLOCKS = int(os.environ.get('LOG_SCAN_INITIAL_LOOKBACK_BLOCKS', 10000))
+LOG_SCAN_CONFIRMATIONS = int(os.environ.get('LOG_SCAN_CONFIRMATIONS', 2))
+# Unmatched transactions older than this fall back to a receipt check (reverts emit no event)
+LOG_SCAN_RECEIPT_FALLBACK_MINUTES = int(os.environ.get('LOG_SCAN_RECEIPT_FALLBACK_MINUTES', 10))
+LOG_SCAN_CHECKPOINT = 'transaction-monitor:strategy-executed-logs'
+
+# keccak256 of the *StrategyExecuted(address,uint256,uint256,uint256) event signatures
+STRATEGY_EXECUTED_TOPICS = {
+    'BTC': '0x630869cc90f628f505bfb160d98d5eddd816e6c5ecc8ec138d47276eb6caf793',  # UBTCStrategyExecuted
+    'ETH': '0xd7a7fd3ef16fa4a845b987e8954b06c2aed1ae81065f227fb60e2009b032c547',  # UETHStrategyExecuted
+    'HYPE': '0x07d738a6ba708f1a1ff2d3506a5239ce5d2ee78d9d86151bc625538a439654a5',  # WHYPEStrategyExecuted
+}
+EXECUTED_TOPIC_ASSETS = {topic: asset for asset, topic in STRATEGY_EXECUTED_TOPICS.items()}
+STRATEGY_CONTRACT_SECRETS = {
+    'BTC': 'strategy-contract-btc',
+    'ETH': 'strategy-contract-eth',
+    'HYPE': 'strategy-contract-hype',
+}
+
+# Token decimals used to compare swap amounts against the latest dma_status price
+USDT_DECIMALS = 6
+ASSET_DECIMALS = {'BTC': 8, 'ETH': 18, 'HYPE': 18}
+MAX_RECORDED_SLIPPAGE = Decimal('999.99')  # actual_slippage is DECIMAL(5, 2)
+
+# Failed transaction log retention: bounded delete batches within a time budget, or dropping
+# daily partitions when the optional partitioned layout is installed
+# (backend/prisma/sql/failed_transaction_logs_partitioned.sql). The next sweep time is shared by
+# all instances through service_checkpoints, as epoch seconds.
+FAILED_LOG_RETENTION_DAYS = 14
+RETENTION_BATCH_SIZE = int(os.environ.get('RETENTION_BATCH_SIZE', 1000))
+RETENTION_TIME_BUDGET_SECONDS = float(os.environ.get('RETENTION_TIME_BUDGET_SECONDS', 10))
+RETENTION_SWEEP_CHECKPOINT = 'transaction-monitor:failed-log-retention-next-sweep'
+FAILED_LOGS_PARTITIONED = os.environ.get('FAILED_LOGS_PARTITIONED', 'false').lower() == 'true'
+FAILED_LOG_PARTITION_DAYS_AHEAD = 7
+
+# Failed transaction alerts: rows claimed per batch, entries per digest message and the
+# time a single run may spend draining the backlog
+ALERT_CLAIM_BATCH_SIZE = int(os.environ.get('ALERT_CLAIM_BATCH_SIZE', 500))
+ALERT_DIGEST_MAX_ITEMS = int(os.environ.get('ALERT_DIGEST_MAX_ITEMS', 50))
+ALERT_TIME_BUDGET_SECONDS = float(os.environ.get('ALERT_TIME_BUDGET_SECONDS', 30))
+ALERT_TIMEOUT_SECONDS = 10
+
+# Reused across digests; the webhook URL is resolved from Secret Manager on first send
+alert_session = requests.Session()
+alert_webhook_url = None
+
+# Age-aware check backoff: (transaction age below, seconds until next check). Fresh
+# transactions are checked often, stragglers progressively less.
+CHECK_BACKOFF_SCHEDULE = [
+    (5 * 60, 15),
+    (30 * 60, 60),
+    (2 * 60 * 60, 5 * 60),
+    (None, 15 * 60),
+]
+
+# Pending transactions older than this are failed without another RPC check; ones the node
+# still does not know after the shorter window are failed at their next check
+TRANSACTION_TIMEOUT_HOURS = 24
+NOT_FOUND_TIMEOUT_HOURS = 2
+TIMEOUT_ERROR_MESSAGE = f"Transaction timeout - over {TRANSACTION_TIMEOUT_HOURS} hours old"
+TIMEOUT_LOG_MESSAGE = "Transaction timeout"
+
+# Daemon mode (python main.py --daemon): react to new blocks instead of the 30 minute schedule
+# Deployed by deploy.sh as the always-on transaction-monitor-daemon service.
+DAEMON_POLL_SECONDS = float(os.environ.get('DAEMON_POLL_SECONDS', 2))
+DAEMON_WS_TIMEOUT_SECONDS = float(os.environ.get('DAEMON_WS_TIMEOUT_SECONDS', 60))
+DAEMON_WS_RETRY_SECONDS = float(os.environ.get('DAEMON_WS_RETRY_SECONDS', 60))
+DAEMON_LISTEN_RETRY_SECONDS = float(os.environ.get('DAEMON_LISTEN_RETRY_SECONDS', 10))
+DAEMON_TIMEOUT_SWEEP_SECONDS = float(os.environ.get('DAEMON_TIMEOUT_SWEEP_SECONDS', 300))
+
+# The spot buyer announces submitted executions here; the daemon's watch set is fed from it
+EXECUTION_SUBMITTED_CHANNEL = 'strategy_execution_submitted'
+# Every path that settles executions (check passes, callbacks, the timeout sweep) announces their
+# hashes here, so the daemon stops watching executions settled outside it
+EXECUTION_SETTLED_CHANNEL = 'strategy_execution_settled'
+
+# Broadcaster callbacks (/callbacks/transactions): HMAC-SHA256 signed batches of status reports.
+# Executions younger than the grace period are left to callbacks; RPC polling picks up the rest.
+CALLBACK_GRACE_SECONDS = int(os.environ.get('CALLBACK_GRACE_SECONDS', 0))
+CALLBACK_MAX_BATCH_SIZE = int(os.environ.get('CALLBACK_MAX_BATCH_SIZE', 1000))
+CALLBACK_MAX_SKEW_SECONDS = 300
+
+callback_signing_secret = None
+
+# Service name recorded with single-flight runs and trace spans
+SERVICE_NAME = 'transaction-monitor'
+configure_service(SERVICE_NAME)
+
+# Due-to-confirmation latency histogram per asset, upper bucket bounds in seconds
+EXECUTION_LATENCY_BUCKETS = (60, 300, 900, 1800, 3600, 7200, 21600, 86400)
+
+execution_latency = {}
+execution_latency_lock = threading.Lock()
+
+class RpcError(Exception):
+    """JSON-RPC call returned an error object"""
+    
+    def __init__(self, error: Dict):
+        super().__init__(f"RPC error: {error}")
+        self.error = error
+
+class RpcEndpoint:
+    """One JSON-RPC node with its latency, error and block height tracking"""
+    
+    def __init__(self, url: str):
+        self.url = url
+        # Host and port only: paths and query strings of hosted RPC URLs often embed API keys
+        parsed = urlparse(url)
+        self.name = f"{parsed.hostname}:{parsed.port}" if parsed.port else (parsed.hostname or 'rpc')
+        self.latencies_ms = deque(maxlen=RPC_LATENCY_WINDOW)
+        self.ewma_latency_ms = None
+        self.requests = 0
+        self.errors = 0
+        self.hedges_won = 0
+        self.consecutive_errors = 0
+        self.cooldown_until = 0.0
+        self.block_number = None
+        # Largest receipt batch the node is known to take, learned from its rejections
+        self.batch_limit = None
+        self.lock = threading.Lock()
+    
+    def record_success(self, latency_ms: float):
+        with self.lock:
+            self.requests += 1
+            self.consecutive_errors = 0
+            self.latencies_ms.append(latency_ms)
+            if self.ewma_latency_ms is None:
+                self.ewma_latency_ms = latency_ms
+            else:
+                self.ewma_latency_ms += RPC_LATENCY_EWMA_ALPHA * (latency_ms - self.ewma_latency_ms)
+    
+    def record_error(self):
+        with self.lock:
+            self.requests += 1
+            self.errors += 1
+            self.consecutive_errors += 1
+            if self.consecutive_errors >= RPC_ENDPOINT_FAILURE_THRESHOLD:
+                self.cooldown_until = time.monotonic() + RPC_ENDPOINT_COOLDOWN_SECONDS
+    
+    def is_cooling_down(self) -> bool:
+        return time.monotonic() < self.cooldown_until
+    
+    def hedge_delay_seconds(self) -> float:
+        """Time to wait for this endpoint before sending a hedged duplicate elsewhere"""
+        with self.lock:
+            samples = sorted(self.latencies_ms)
+        if len(samples) < 10:
+            return RPC_HEDGE_DEFAULT_DELAY_MS / 1000
+        index = min(int(len(samples) * RPC_HEDGE_PERCENTILE / 100), len(samples) - 1)
+        return max(samples[index], RPC_HEDGE_MIN_DELAY_MS) / 1000
+    
+    def record_batch_limit(self, batch_size: int):
+        """Remember that the node takes batches of at most batch_size"""
+        with self.lock:
+            if self.batch_limit is None or batch_size < self.batch_limit:
+                self.batch_limit = max(batch_size, 1)
+                logger.info(f"RPC endpoint {self.name} takes batches of at most {self.batch_limit}")
+
+class RpcEndpointPool:
+    """Latency-aware routing with hedged requests and failover across RPC endpoints"""
+    
+    def __init__(self, urls: List[str]):
+        self.endpoints = [RpcEndpoint(url) for url in urls]
+        self.head_block = None
+        self.heights_checked_at = None
+        self.heights_lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=max(RPC_MAX_CONCURRENT_BATCHES * 2, len(urls)),
+                                           thread_name_prefix='rpc')
+    
+    def ranked_endpoints(self) -> List[RpcEndpoint]:
+        """Endpoints in routing order: in sync and healthy first, then by smoothed latency"""
+        return sorted(self.endpoints, key=lambda endpoint: (
+            self.is_lagging(endpoint),
+            endpoint.is_cooling_down(),
+            endpoint.ewma_latency_ms if endpoint.ewma_latency_ms is not None else 0.0
+        ))
+    
+    def is_lagging(self, endpoint: RpcEndpoint) -> bool:
+        """Whether the endpoint is behind the best known block by more than RPC_MAX_BLOCK_LAG"""
+        if self.head_block is None:
+            return False
+        return endpoint.block_number is None or self.head_block - endpoint.block_number > RPC_MAX_BLOCK_LAG
+    
+    def get_batch_size(self) -> int:
+        """Receipt batch size every endpoint accepts, as a call may be hedged or failed over to any of them"""
+        limits = [endpoint.batch_limit for endpoint in self.endpoints if endpoint.batch_limit is not None]
+        return min([RPC_BATCH_SIZE] + limits)
+    
+    def is_trusted_for_absence(self, endpoint: RpcEndpoint) -> bool:
+        """Whether a missing receipt on this endpoint can be believed"""
+        return endpoint.block_number is not None and not self.is_lagging(endpoint)
+    
+    def post(self, payload):
+        """Send a JSON-RPC payload, hedging slow calls and failing over on errors"""
+        candidates = self.ranked_endpoints()
+        futures = {}
+        hedged = False
+        last_error = None
+        
+        def launch(endpoint):
+            futures[self.executor.submit(self.send, endpoint, payload)] = endpoint
+        
+        launch(candidates.pop(0))
+        while futures:
+            # A hedge is only sent once the oldest call outlives its endpoint's latency percentile
+            timeout = next(iter(futures.values())).hedge_delay_seconds() if candidates else None
+            done, _ = wait(futures, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                hedged = True
+                launch(candidates.pop(0))
+                continue
+            
+            for future in done:
+                endpoint = futures.pop(future)
+                try:
+                    response = future.result()
+                except Exception as e:
+                    last_error = e
+                    continue
+                if hedged:
+                    with endpoint.lock:
+                        endpoint.hedges_won += 1
+                return endpoint, response
+            
+            # Fail over to the next endpoint when every call in flight has errored
+            if not futures and candidates:
+                launch(candidates.pop(0))
+        
+        raise last_error
+    
+    def send(self, endpoint: RpcEndpoint, payload) -> requests.Response:
+        """POST to one endpoint, recording latency and treating 429/5xx as endpoint errors"""
+        started = time.perf_counter()
+        try:
+            response = rpc_session.post(endpoint.url, json=payload, timeout=RPC_TIMEOUT_SECONDS)
+            if response.status_code == 429 or response.status_code >= 500:
+                raise requests.HTTPError(f"{endpoint.name} returned HTTP {response.status_code}")
+        except Exception:
+            endpoint.record_error()
+            raise
+        endpoint.record_success((time.perf_counter() - started) * 1000)
+        return response
+    
+    def refresh_block_heights(self, force: bool = False):
+        """Poll eth_blockNumber on every endpoint to find nodes lagging the best known block"""
+        with self.heights_lock:
+            if not force and self.heights_checked_at is not None and \
+                    time.monotonic() - self.heights_checked_at < RPC_HEIGHT_REFRESH_SECONDS:
+                return
+            
+            payload = {"jsonrpc": "2.0", "method": "eth_blockNumber", "params": [], "id": 1}
+            futures = {self.executor.submit(self.send, endpoint, payload): endpoint for endpoint in self.endpoints}
+            for future, endpoint in futures.items():
+                try:
+                    endpoint.block_number = int(future.result().json()['result'], 16)
+                except Exception as e:
+                    endpoint.block_number = None
+                    logger.warning(f"Block height check failed on {endpoint.name}: {str(e)}")
+            
+            heights = [endpoint.block_number for endpoint in self.endpoints if endpoint.block_number is not None]
+            self.head_block = max(heights) if heights else None
+            self.heights_checked_at = time.monotonic()
+            
+            for endpoint in self.endpoints:
+                if self.is_lagging(endpoint):
+                    logger.warning(f"RPC endpoint {endpoint.name} is lagging at block {endpoint.block_number} "
+                                   f"(head {self.head_block})")
+    
+    def get_metrics(self) -> List[Dict]:
+        """Per-endpoint routing statistics"""
+        return [
+            {
+                'endpoint': endpoint.name,
+                'requests': endpoint.requests,
+                'errors': endpoint.errors,
+                'hedges_won': endpoint.hedges_won,
+                'ewma_latency_ms': round(endpoint.ewma_latency_ms, 3) if endpoint.ewma_latency_ms is not None else None,
+                'hedge_delay_ms': round(endpoint.hedge_delay_seconds() * 1000, 3),
+                'block_number': endpoint.block_number,
+                'batch_limit': endpoint.batch_limit,
+                'lagging': self.is_lagging(endpoint),
+                'cooling_down': endpoint.is_cooling_down()
+            }
+            for endpoint in self.endpoints
+        ]
+
+rpc_pool = None
+
+def get_rpc_pool() -> Optional[RpcEndpointPool]:
+    """Get the RPC endpoint pool, or None when no endpoint is configured (simulation mode)"""
+    global rpc_pool
+    if rpc_pool is None:
+        configured = get_secret('blockchain-rpc-urls') or get_secret('blockchain-rpc-url') or ''
+        urls = [url.strip() for url in configured.split(',') if url.strip() and url.strip() != 'your-blockchain-rpc-url']
+        if urls:
+            rpc_pool = RpcEndpointPool(urls)
+            logger.info(f"RPC pool with {len(urls)} endpoints: {', '.join(e.name for e in rpc_pool.endpoints)}")
+    return rpc_pool
+
+# Hot statements, prepared once per pooled connection and then EXECUTEd
+PENDING_TRANSACTIONS_SELECT = """
+        SELECT 
+            se.id as execution_id,
+            se.strategy_id,
+            se.transaction_hash,
+            se.amount_in,
+            se.status,
+            se.executed_at,
+            se.created_at,
+            se.next_check_at,
+            se.due_at,
+            se.broadcast_at,
+            us.wallet_address,
+            an.asset,
+            an.strategy_type
+        FROM strategy_executions se
+        JOIN user_strategies us ON se.strategy_id = us.id
+        JOIN action_nonces an ON us.action_nonce_id = an.id
+        WHERE se.status IN ('EXECUTING', 'PENDING')
+          AND se.transaction_hash IS NOT NULL"""
+
+PREPARED_STATEMENTS = {
+    'pending_transactions': PENDING_TRANSACTIONS_SELECT + """
+          AND se.next_check_at <= $1
+          AND COALESCE(se.broadcast_at, se.created_at) <= $2
+        ORDER BY se.created_at ASC
+    """,
+    'pending_transactions_by_id': PENDING_TRANSACTIONS_SELECT + """
+          AND se.id = ANY($1::text[])
+    """,
+    'pending_transactions_by_hash': PENDING_TRANSACTIONS_SELECT + """
+          AND se.transaction_hash = ANY($1::text[])
+    """,
+    'next_check_schedule': """
+        UPDATE strategy_executions se
+        SET next_check_at = v.next_check_at
+        FROM unnest($1::text[], $2::timestamp[]) AS v(id, next_check_at)
+        WHERE se.id = v.id
+    """,
+    'executions_confirmed': """
+        WITH confirmed AS (
+            UPDATE strategy_executions se
+            SET status = 'SUCCESS',
+                gas_used = v.gas_used,
+                gas_price_used = COALESCE(v.gas_price, se.gas_price_used),
+                amount_out = COALESCE(v.amount_out, se.amount_out),
+                actual_slippage = COALESCE(v.actual_slippage, se.actual_slippage),
+                updated_at = $6
+            FROM unnest($1::text[], $2::bigint[], $3::bigint[], $4::numeric[], $5::numeric[])
+                AS v(id, gas_used, gas_price, amount_out, actual_slippage)
+            WHERE se.id = v.id
+              AND se.status IN ('EXECUTING', 'PENDING')
+            RETURNING se.transaction_hash, se.strategy_id, se.amount_in,
+                      COALESCE(v.amount_out, se.amount_out) AS amount_out,
+                      COALESCE(se.gas_used::numeric * se.gas_price_used, 0) AS gas_cost
+        ),
+        strategy_totals AS (
+            UPDATE user_strategies us
+            SET total_amount_swapped = us.total_amount_swapped + c.amount_in,
+                updated_at = $6
+            FROM (SELECT strategy_id, SUM(amount_in) AS amount_in FROM confirmed GROUP BY strategy_id) c
+            WHERE us.id = c.strategy_id
+        ),
+        wallet_totals AS (
+            INSERT INTO wallet_asset_rollups AS w
+            (wallet_address, asset, confirmed_executions, total_amount_in, total_amount_out, 
+             total_gas_cost, last_confirmed_at, updated_at)
+            SELECT us.wallet_address, an.asset, COUNT(*), SUM(c.amount_in), COALESCE(SUM(c.amount_out), 0),
+                   SUM(c.gas_cost), $6, $6
+            FROM confirmed c
+            JOIN user_strategies us ON c.strategy_id = us.id
+            JOIN action_nonces an ON us.action_nonce_id = an.id
+            GROUP BY us.wallet_address, an.asset
+            ON CONFLICT (wallet_address, asset) DO UPDATE SET
+                confirmed_executions = w.confirmed_executions + EXCLUDED.confirmed_executions,
+                total_amount_in = w.total_amount_in + EXCLUDED.total_amount_in,
+                total_amount_out = w.total_amount_out + EXCLUDED.total_amount_out,
+                total_gas_cost = w.total_gas_cost + EXCLUDED.total_gas_cost,
+                last_confirmed_at = EXCLUDED.last_confirmed_at,
+                updated_at = EXCLUDED.updated_at
+        )
+        SELECT transaction_hash FROM confirmed
+    """,
+    'latest_asset_prices': """
+        SELECT DISTINCT ON (asset) asset, current_price
+        FROM dma_status 
+        ORDER BY asset, calculated_at DESC
+    """,
+    'executions_failed': """
+        UPDATE strategy_executions se
+        SET status = 'FAILED',
+            error_message = v.error_message,
+            updated_at = $3
+        FROM unnest($1::text[], $2::text[]) AS v(id, error_message)
+        WHERE se.id = v.id
+          AND se.status IN ('EXECUTING', 'PENDING')
+        RETURNING se.transaction_hash
+    """,
+    'executions_settled_notify': """
+        SELECT pg_notify($1, tx_hash) FROM unnest($2::text[]) AS tx_hash
+    """,
+    'executions_timed_out': """
+        WITH expired AS (
+            UPDATE strategy_executions se
+            SET status = 'FAILED',
+                error_message = $3,
+                updated_at = $1
+            WHERE se.status IN ('EXECUTING', 'PENDING')
+              AND se.transaction_hash IS NOT NULL
+              AND se.created_at < $2
+            RETURNING se.id, se.strategy_id, se.transaction_hash, se.amount_in, se.created_at, se.broadcast_at
+        ),
+        logged AS (
+            INSERT INTO failed_transaction_logs 
+            (wallet_address, strategy_id, execution_id, asset, transaction_hash, 
+             amount, plan_type, error_message, failed_at, created_at)
+            SELECT us.wallet_address, e.strategy_id, e.id, an.asset, e.transaction_hash,
+                   e.amount_in::text, an.strategy_type, $4, $1, $1
+            FROM expired e
+            JOIN user_strategies us ON e.strategy_id = us.id
+            JOIN action_nonces an ON us.action_nonce_id = an.id
+            WHERE NOT EXISTS (SELECT 1 FROM failed_transaction_logs f WHERE f.execution_id = e.id)
+            ON CONFLICT DO NOTHING
+        )
+        SELECT e.id AS execution_id, e.transaction_hash, e.created_at, e.broadcast_at, an.asset, an.strategy_type
+        FROM expired e
+        JOIN user_strategies us ON e.strategy_id = us.id
+        JOIN action_nonces an ON us.action_nonce_id = an.id
+    """,
+    'failure_logs_insert': """
+        INSERT INTO failed_transaction_logs 
+        (wallet_address, strategy_id, execution_id, asset, transaction_hash, 
+         amount, plan_type, error_message, failed_at, created_at)
+        SELECT v.wallet_address, v.strategy_id, v.execution_id, v.asset::"ASSET_TYPE", v.transaction_hash,
+               v.amount, v.plan_type::"STRATEGY_TYPE", v.error_message, $9, $9
+        FROM unnest($1::text[], $2::text[], $3::text[], $4::text[], $5::text[], $6::text[], $7::text[], $8::text[])
+            AS v(wallet_address, strategy_id, execution_id, asset, transaction_hash, amount, plan_type, error_message)
+        WHERE NOT EXISTS (SELECT 1 FROM failed_transaction_logs f WHERE f.execution_id = v.execution_id)
+        ON CONFLICT DO NOTHING
+    """,
+    'alerts_claim': """
+        SELECT id, wallet_address, asset, transaction_hash, amount, 
+               plan_type, error_message, failed_at
+        FROM failed_transaction_logs 
+        WHERE alert_sent = false
+        ORDER BY failed_at ASC
+        LIMIT $1
+        FOR UPDATE SKIP LOCKED
+    """,
+    'alerts_relock': """
+        SELECT id FROM failed_transaction_logs
+        WHERE id = ANY($1::text[]) AND alert_sent = false
+        FOR UPDATE SKIP LOCKED
+    """,
+    'alerts_mark_sent': """
+        UPDATE failed_transaction_logs 
+        SET alert_sent = true 
+        WHERE id = ANY($1::text[])
+    """,
+    'checkpoint_lookup': """
+        SELECT position FROM service_checkpoints 
+        WHERE name = $1
+    """,
+    'checkpoint_upsert': """
+        INSERT INTO service_checkpoints (name, position, updated_at)
+        VALUES ($1, $2, $3)
+        ON CONFLICT (name) DO UPDATE SET position = EXCLUDED.position, updated_at = EXCLUDED.updated_at
+    """,
+}
+
+register_statements(PREPARED_STATEMENTS)
+
+def trace_transaction_outcomes(pending_transactions: List[Dict], outcomes: Dict[str, Dict],
+                               observed_at: datetime, applied_at: datetime):
+    """Emit the monitor's stage spans for settled transactions and record due-to-confirmation latency"""
+    for tx in pending_transactions:
+        result = outcomes[tx['transaction_hash']]['result']
+        if result not in ('confirmed', 'failed'):
+            continue
+        
+        execution_id = tx['execution_id']
+        attributes = {'asset': tx['asset'], 'strategy.type': tx['strategy_type'], 'result': result}
+        broadcast_at = tx['broadcast_at'] or tx['created_at']
+        
+        if result == 'failed':
+            record_span(execution_id, 'broadcast_acknowledged', broadcast_at, applied_at, attributes)
+            continue
+        
+        record_span(execution_id, 'broadcast_acknowledged', broadcast_at, observed_at, attributes)
+        record_span(execution_id, 'first_seen_on_chain', observed_at, applied_at, attributes)
+        if tx['due_at']:
+            record_span(execution_id, 'execution', tx['due_at'], applied_at, attributes)
+            observe_execution_latency(tx['asset'], (applied_at - tx['due_at']).total_seconds())
+
+def observe_execution_latency(asset: str, seconds: float):
+    """Add one due-to-confirmation latency to the asset's histogram"""
+    with execution_latency_lock:
+        histogram = execution_latency.setdefault(asset, {
+            'buckets': [0] * (len(EXECUTION_LATENCY_BUCKETS) + 1), 'count': 0, 'sum': 0.0
+        })
+        bucket = next((i for i, bound in enumerate(EXECUTION_LATENCY_BUCKETS) if seconds <= bound),
+                      len(EXECUTION_LATENCY_BUCKETS))
+        histogram['buckets'][bucket] += 1
+        histogram['count'] += 1
+        histogram['sum'] += seconds
+
+def get_execution_latency_metrics() -> Dict[str, Dict]:
+    """Cumulative due-to-confirmation latency histograms per asset"""
+    with execution_latency_lock:
+        metrics = {}
+        for asset, histogram in execution_latency.items():
+            cumulative = 0
+            buckets = []
+            for bound, count in zip(list(EXECUTION_LATENCY_BUCKETS) + ['+Inf'], histogram['buckets']):
+                cumulative += count
+                buckets.append({'le': bound, 'count': cumulative})
+            metrics[asset] = {
+                'buckets': buckets,
+                'count': histogram['count'],
+                'avg_seconds': round(histogram['sum'] / histogram['count'], 3) if histogram['count'] else 0.0
+            }
+        return metrics
 
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
     return jsonify({'status': 'healthy', 'timestamp': datetime.now().isoformat()})
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Runtime metrics endpoint"""
+    return jsonify({
+        'statements': get_statement_metrics(),
+        'rpc_endpoints': rpc_pool.get_metrics() if rpc_pool else [],
+        'execution_latency': get_execution_latency_metrics(),
+        'single_flight': get_single_flight_metrics(),
+        'read_routing': get_read_routing_metrics(),
+        'timestamp': datetime.now().isoformat()
+    })
+
 @app.route('/monitor', methods=['POST'])
 def monitor_transactions():
     """Main endpoint to monitor transaction confirmations"""
+    run = None
     try:
-        logger.info("Starting Transaction Monitor execution")
+        run, running_id = begin_single_flight_run('monitor')
+        if run is None:
+            logger.info(f"Monitor run {running_id} already in progress, not starting another")
+            return jsonify({'message': 'Monitoring already in progress', 'run_id': running_id}), 202
+        
+        logger.info(f"Starting Transaction Monitor execution (run {run.run_id})")
+        
+        # Timed-out transactions are failed and logged by one statement and never reach the RPC
+        expired = fail_timed_out_transactions()
         
         # Get pending transactions
         pending_transactions = get_pending_transactions()
         
         if not pending_transactions:
             logger.info("No pending transactions to monitor")
-            results = {'monitored': 0, 'confirmed': 0, 'failed': 0}
+            outcomes = {}
         else:
             logger.info(f"Monitoring {len(pending_transactions)} pending transactions")
-            
-            confirmed_count = 0
-            failed_count = 0
-            
-            # Check each transaction status
-            for tx in pending_transactions:
-                result = check_transaction_status(tx)
-                if result == 'confirmed':
-                    confirmed_count += 1
-                elif result == 'failed':
-                    failed_count += 1
-            
-            results = {
-                'monitored': len(pending_transactions),
-                'confirmed': confirmed_count,
-                'failed': failed_count
-            }
+            outcomes = process_pending_transactions(pending_transactions)
+        
+        results = {
+            'monitored': len(outcomes) + len(expired),
+            'confirmed': list(outcomes.values()).count('confirmed'),
+            'failed': list(outcomes.values()).count('failed') + len(expired),
+            'timed_out': len(expired)
+        }
         
         # Clean up old failed transaction logs (keep only 2 weeks)
         cleanup_old_failed_logs()
@@ -87,40 +647,206 @@ def monitor_transactions():
         return jsonify({
             'message': 'Transaction monitoring completed',
             'results': results,
+            'run_id': run.run_id,
             'timestamp': datetime.now().isoformat()
         })
         
     except Exception as e:
         logger.error(f"Transaction Monitor failed: {str(e)}")
         send_alert(f"Transaction Monitor Service failed: {str(e)}")
+        if run:
+            run.fail(str(e))
+        return jsonify({'error': str(e)}), 500
+    
+    finally:
+        if run:
+            run.finish()
+
+@app.route('/callbacks/transactions', methods=['POST'])
+def transaction_callbacks():
+    """Apply a signed batch of transaction status reports pushed by the broadcaster"""
+    try:
+        body = request.get_data()
+        if not is_valid_callback_signature(body, request.headers.get('X-Timestamp', ''),
+                                           request.headers.get('X-Signature', '')):
+            return jsonify({'error': 'Invalid signature'}), 401
+        
+        payload = json.loads(body)
+        reports = payload.get('transactions') if isinstance(payload, dict) else None
+        if not isinstance(reports, list):
+            return jsonify({'error': 'Expected a transactions list'}), 400
+        if not all(isinstance(report, dict) for report in reports):
+            return jsonify({'error': 'Expected every transaction report to be an object'}), 400
+        if len(reports) > CALLBACK_MAX_BATCH_SIZE:
+            return jsonify({'error': f'At most {CALLBACK_MAX_BATCH_SIZE} transactions per callback'}), 413
+        
+        results = apply_transaction_reports(reports)
+        return jsonify({'results': results, 'timestamp': datetime.now().isoformat()})
+        
+    except ValueError as e:
+        return jsonify({'error': f'Invalid callback payload: {str(e)}'}), 400
+    except Exception as e:
+        logger.error(f"Transaction callback failed: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
-def get_pending_transactions() -> List[Dict]:
-    """Get all transactions that are currently executing or pending confirmation"""
+def is_valid_callback_signature(body: bytes, timestamp: str, signature: str) -> bool:
+    """Check X-Signature = sha256=hex(HMAC-SHA256(secret, "<X-Timestamp>." + body)) and the timestamp skew"""
+    global callback_signing_secret
+    if callback_signing_secret is None:
+        callback_signing_secret = get_secret('callback-signing-secret') or ''
+    if not callback_signing_secret:
+        logger.error("callback-signing-secret is not configured, rejecting callback")
+        return False
+    
+    try:
+        if abs(time.time() - int(timestamp)) > CALLBACK_MAX_SKEW_SECONDS:
+            return False
+    except ValueError:
+        return False
+    
+    expected = hmac.new(callback_signing_secret.encode(), timestamp.encode() + b'.' + body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(f'sha256={expected}', signature)
+
+def apply_transaction_reports(reports: List[Dict]) -> Dict[str, int]:
+    """Apply reported statuses through the bulk outcome path; malformed reports are counted as invalid,
+    reports of unknown or settled executions as ignored"""
+    reports_by_id = {}
+    for report in reports:
+        if is_valid_transaction_report(report):
+            reports_by_id[report['execution_id']] = report
+    
+    pending_transactions = [
+        tx for tx in get_pending_transactions_by_id(list(reports_by_id))
+        if (reports_by_id[tx['execution_id']].get('transaction_hash') or '').lower() == tx['transaction_hash'].lower()
+    ]
+    
+    # Reports are shaped like parsed receipts, so the usual outcome rules and bulk updates apply
+    outcomes = {
+        tx['transaction_hash']: check_transaction_status(tx, parse_transaction_report(reports_by_id[tx['execution_id']]))
+        for tx in pending_transactions
+    }
+    observed_at = datetime.now()
+    settled = apply_transaction_outcomes(pending_transactions, outcomes)
+    # Executions a check pass settled meanwhile were traced by that path and count as ignored
+    trace_transaction_outcomes([tx for tx in pending_transactions if tx['transaction_hash'] in settled],
+                               outcomes, observed_at, datetime.now())
+    flush_spans()
+    
+    results = [outcome['result'] for tx_hash, outcome in outcomes.items() if tx_hash in settled]
+    invalid = len([report for report in reports if not is_valid_transaction_report(report)])
+    if invalid:
+        logger.warning(f"Rejected {invalid} malformed transaction reports")
+    # Every report lands in exactly one of confirmed, failed, invalid and ignored
+    return {
+        'received': len(reports),
+        'confirmed': results.count('confirmed'),
+        'failed': results.count('failed'),
+        'invalid': invalid,
+        'ignored': len(reports) - invalid - results.count('confirmed') - results.count('failed')
+    }
+
+def is_valid_transaction_report(report: Dict) -> bool:
+    """Whether a report has a known status and string execution_id, transaction_hash and error"""
+    return (report.get('status') in ('confirmed', 'failed')
+            and isinstance(report.get('execution_id'), str) and bool(report['execution_id'])
+            and isinstance(report.get('transaction_hash'), str) and bool(report['transaction_hash'])
+            and isinstance(report.get('error'), (str, type(None))))
+
+def parse_transaction_report(report: Dict) -> Dict:
+    """Turn a broadcaster status report into a transaction status like parse_receipt's"""
+    if report['status'] == 'failed':
+        return {'status': 'failed', 'error': report.get('error') or 'Transaction reverted',
+                'transaction_hash': report['transaction_hash']}
+    
+    amount_out = to_hex_quantity(report.get('amount_out'))
+    return {
+        'status': 'confirmed',
+        'block_number': to_hex_quantity(report.get('block_number')),
+        'gas_used': to_hex_quantity(report.get('gas_used')),
+        'gas_price': to_hex_quantity(report.get('gas_price')),
+        'amount_out': int(amount_out, 16) if amount_out else None,
+        'transaction_hash': report['transaction_hash']
+    }
+
+def to_hex_quantity(value) -> Optional[str]:
+    """Normalize an int, decimal string or hex string quantity to a JSON-RPC hex quantity"""
+    if value is None:
+        return None
+    try:
+        if isinstance(value, str):
+            return hex(int(value, 16) if value.startswith('0x') else int(value))
+        return hex(int(value))
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+def process_pending_transactions(pending_transactions: List[Dict]) -> Dict[str, str]:
+    """Fetch and apply the on-chain status of pending transactions, returning the result per hash"""
+    # Fetch the on-chain status of every transaction
+    blockchain_statuses, scanned_to_block = get_confirmation_statuses(pending_transactions)
+    observed_at = datetime.now()
+    
+    # The log scan checkpoint moves past every event read, so events of pending transactions that
+    # were not due yet are settled now instead of being skipped for good
+    due_hashes = {tx['transaction_hash'] for tx in pending_transactions}
+    early_hashes = [tx_hash for tx_hash in blockchain_statuses if tx_hash not in due_hashes]
+    if early_hashes:
+        pending_transactions = pending_transactions + get_pending_transactions_by_hash(early_hashes)
+    
+    # Check each transaction status, then apply all outcomes in bulk
+    outcomes = {
+        tx['transaction_hash']: check_transaction_status(tx, blockchain_statuses.get(tx['transaction_hash']))
+        for tx in pending_transactions
+    }
+    settled = apply_transaction_outcomes(pending_transactions, outcomes)
+    # Executions a callback settled meanwhile were traced by that path
+    trace_transaction_outcomes([tx for tx in pending_transactions if tx['transaction_hash'] in settled],
+                               outcomes, observed_at, datetime.now())
+    flush_spans()
+    
+    # Only once the outcomes are committed; a pass that dies before rescans the same blocks, and
+    # events of executions that were settled meanwhile match no pending row
+    if scanned_to_block is not None:
+        save_checkpoint(LOG_SCAN_CHECKPOINT, scanned_to_block)
+    
+    results = {tx_hash: outcome['result'] for tx_hash, outcome in outcomes.items()}
+    schedule_next_checks([tx for tx in pending_transactions if results[tx['transaction_hash']] not in ('confirmed', 'failed')])
+    return results
+
+def get_next_check_delay(age_seconds: float) -> int:
+    """Seconds until the next check for a transaction of the given age"""
+    for max_age_seconds, delay_seconds in CHECK_BACKOFF_SCHEDULE:
+        if max_age_seconds is None or age_seconds < max_age_seconds:
+            return delay_seconds
+
+def schedule_next_checks(transactions: List[Dict]):
+    """Persist the next check time of transactions that are still pending"""
+    if not transactions:
+        return
+    
+    now = datetime.now()
+    for tx in transactions:
+        age_seconds = (now - tx['created_at']).total_seconds()
+        tx['next_check_at'] = now + timedelta(seconds=get_next_check_delay(age_seconds))
+    
     conn = get_db_connection()
     try:
         with conn.cursor() as cursor:
-            query = """
-                SELECT 
-                    se.id as execution_id,
-                    se.strategy_id,
-                    se.transaction_hash,
-                    se.amount_in,
-                    se.status,
-                    se.executed_at,
-                    se.created_at,
-                    us.wallet_address,
-                    an.asset,
-                    an.strategy_type
-                FROM strategy_executions se
-                JOIN user_strategies us ON se.strategy_id = us.id
-                JOIN action_nonces an ON us.action_nonce_id = an.id
-                WHERE se.status IN ('EXECUTING', 'PENDING')
-                  AND se.transaction_hash IS NOT NULL
-                ORDER BY se.created_at ASC
-            """
-            
-            cursor.execute(query)
+            execute_prepared(cursor, 'next_check_schedule', (
+                [tx['execution_id'] for tx in transactions],
+                [tx['next_check_at'] for tx in transactions]
+            ))
+            conn.commit()
+            
+    finally:
+        release_db_connection(conn)
+
+def get_pending_transactions(due_before: Optional[datetime] = None) -> List[Dict]:
+    """Get transactions that are executing or pending confirmation and due for a check"""
+    conn = get_read_connection()
+    try:
+        with conn.cursor() as cursor:
+            due_before = due_before or datetime.now()
+            execute_prepared(cursor, 'pending_transactions', (due_before, due_before - timedelta(seconds=CALLBACK_GRACE_SECONDS)))
             columns = [desc[0] for desc in cursor.description]
             transactions = []
             
@@ -131,316 +857,849 @@ def get_pending_transactions() -> List[Dict]:
             return transactions
             
     finally:
-        conn.close()
+        release_db_connection(conn)
+
+def get_pending_transactions_by_id(execution_ids: List[str]) -> List[Dict]:
+    """Get pending transactions by execution id, regardless of their next check time"""
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            execute_prepared(cursor, 'pending_transactions_by_id', (execution_ids,))
+            columns = [desc[0] for desc in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+            
+    finally:
+        release_db_connection(conn)
+
+def get_pending_transactions_by_hash(tx_hashes: List[str]) -> List[Dict]:
+    """Get pending transactions by transaction hash, regardless of their next check time"""
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            execute_prepared(cursor, 'pending_transactions_by_hash', (tx_hashes,))
+            columns = [desc[0] for desc in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+            
+    finally:
+        release_db_connection(conn)
 
-def check_transaction_status(tx: Dict) -> str:
-    """Check the blockchain status of a transaction"""
+def is_check_due(tx: Dict, now: datetime) -> bool:
+    """Whether a pending transaction is due for an RPC check and past the callback grace period"""
+    reported_by = (tx['broadcast_at'] or tx['created_at']) + timedelta(seconds=CALLBACK_GRACE_SECONDS)
+    return tx['next_check_at'] <= now and reported_by <= now
+
+def fail_timed_out_transactions() -> List[Dict]:
+    """Fail and log every pending execution past the timeout in one statement, returning the failed ones"""
+    now = datetime.now()
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            execute_prepared(cursor, 'executions_timed_out', (
+                now, now - timedelta(hours=TRANSACTION_TIMEOUT_HOURS), TIMEOUT_ERROR_MESSAGE, TIMEOUT_LOG_MESSAGE
+            ))
+            columns = [desc[0] for desc in cursor.description]
+            expired = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            notify_settled_transactions(cursor, [tx['transaction_hash'] for tx in expired])
+            conn.commit()
+            
+    finally:
+        release_db_connection(conn)
+    
+    if expired:
+        logger.warning(f"Marked {len(expired)} executions over {TRANSACTION_TIMEOUT_HOURS} hours old as failed")
+        outcome = failed_outcome(TIMEOUT_ERROR_MESSAGE, TIMEOUT_LOG_MESSAGE)
+        trace_transaction_outcomes(expired, {tx['transaction_hash']: outcome for tx in expired}, now, now)
+        flush_spans()
+    return expired
+
+def check_transaction_status(tx: Dict, blockchain_status: Optional[Dict]) -> Dict:
+    """Decide the outcome of a transaction from its fetched blockchain status"""
     execution_id = tx['execution_id']
     tx_hash = tx['transaction_hash']
     
     try:
         logger.info(f"Checking status for transaction {tx_hash} (execution: {execution_id})")
         
-        # Check if transaction is too old (24+ hours)
-        hours_since_created = (datetime.now() - tx['created_at']).total_seconds() / 3600
-        
-        if hours_since_created > 24:
-            logger.warning(f"Transaction {tx_hash} is over 24 hours old, marking as failed")
-            mark_transaction_failed(execution_id, "Transaction timeout - over 24 hours old")
-            log_failed_transaction(tx, "Transaction timeout")
-            return 'failed'
-        
-        # Query blockchain for transaction status
-        blockchain_status = get_blockchain_transaction_status(tx_hash, tx['asset'])
+        if blockchain_status is None:
+            blockchain_status = {'status': 'unknown', 'error': 'No receipt result'}
         
         if blockchain_status['status'] == 'confirmed':
             logger.info(f"Transaction {tx_hash} confirmed on blockchain")
-            update_transaction_confirmed(execution_id, blockchain_status)
-            return 'confirmed'
+            return {'result': 'confirmed', 'blockchain_status': blockchain_status}
             
         elif blockchain_status['status'] == 'failed':
             logger.warning(f"Transaction {tx_hash} failed on blockchain")
-            mark_transaction_failed(execution_id, blockchain_status.get('error', 'Transaction failed on blockchain'))
-            log_failed_transaction(tx, blockchain_status.get('error', 'Blockchain failure'))
-            return 'failed'
+            return failed_outcome(
+                blockchain_status.get('error', 'Transaction failed on blockchain'),
+                blockchain_status.get('error', 'Blockchain failure')
+            )
             
         elif blockchain_status['status'] == 'not_found':
             # Transaction not found - could be still propagating or failed
-            if hours_since_created > 2:  # Give it 2 hours before considering it failed
-                logger.warning(f"Transaction {tx_hash} not found after 2+ hours, marking as failed")
-                mark_transaction_failed(execution_id, "Transaction not found on blockchain")
-                log_failed_transaction(tx, "Transaction not found")
-                return 'failed'
+            hours_since_created = (datetime.now() - tx['created_at']).total_seconds() / 3600
+            if hours_since_created > NOT_FOUND_TIMEOUT_HOURS:
+                logger.warning(f"Transaction {tx_hash} not found after {NOT_FOUND_TIMEOUT_HOURS}+ hours, marking as failed")
+                return failed_outcome("Transaction not found on blockchain", "Transaction not found")
             else:
                 logger.info(f"Transaction {tx_hash} not found yet, will check again later")
-                return 'pending'
+                return {'result': 'pending'}
                 
         else:
             # Still pending
             logger.info(f"Transaction {tx_hash} still pending confirmation")
-            return 'pending'
+            return {'result': 'pending'}
             
     except Exception as e:
         logger.error(f"Error checking transaction {tx_hash}: {str(e)}")
-        return 'error'
+        return {'result': 'error'}
+
+def failed_outcome(error_message: str, log_message: str) -> Dict:
+    """Outcome for a failed transaction: the execution error and the failure log message"""
+    return {'result': 'failed', 'error_message': error_message, 'log_message': log_message}
 
-def get_blockchain_transaction_status(tx_hash: str, asset: str) -> Dict:
-    """Query blockchain RPC to get transaction status"""
+def get_confirmation_statuses(transactions: List[Dict]) -> Tuple[Dict[str, Dict], Optional[int]]:
+    """Get on-chain statuses for pending transactions using the configured confirmation mode, plus the
+    last block the log scan covered (None outside logs mode or when nothing new was scanned).
+    
+    The log scan also returns the events of transactions outside the given list.
+    """
+    tx_hashes = [tx['transaction_hash'] for tx in transactions]
+    pool = get_rpc_pool()
+    
+    if MONITOR_CONFIRMATION_MODE != 'logs' or pool is None:
+        return get_blockchain_transaction_statuses(tx_hashes), None
+    
+    statuses, scanned_to_block = scan_execution_events(pool)
+    
+    fallback_cutoff = datetime.now() - timedelta(minutes=LOG_SCAN_RECEIPT_FALLBACK_MINUTES)
+    fallback_hashes = [
+        tx['transaction_hash'] for tx in transactions
+        if tx['transaction_hash'] not in statuses and tx['created_at'] < fallback_cutoff
+    ]
+    statuses.update(get_blockchain_transaction_statuses(fallback_hashes))
+    
+    logger.info(f"Log scan confirmed {len(set(tx_hashes) & set(statuses)) - len(fallback_hashes)} of "
+                f"{len(tx_hashes)} due transactions, {len(fallback_hashes)} fell back to receipt checks")
+    return statuses, scanned_to_block
+
+def scan_execution_events(pool: RpcEndpointPool) -> Tuple[Dict[str, Dict], Optional[int]]:
+    """Scan *StrategyExecuted events since the last checkpoint, keyed by transaction hash, plus the last
+    block scanned. The caller saves that position once the events are applied. A failing range ends the
+    scan with the events of the ranges before it."""
+    contract_addresses = [
+        address for address in (get_secret(secret_id) for secret_id in STRATEGY_CONTRACT_SECRETS.values())
+        if address
+    ]
+    if not contract_addresses:
+        logger.warning("No strategy contract addresses configured, skipping log scan")
+        return {}, None
+    
+    statuses = {}
+    scanned_to_block = None
     try:
-        blockchain_rpc_url = get_secret('blockchain-rpc-url')
-        if not blockchain_rpc_url or blockchain_rpc_url == 'your-blockchain-rpc-url':
-            # For testing purposes, simulate random outcomes
-            import random
-            outcomes = ['confirmed', 'pending', 'not_found']
-            weights = [0.7, 0.25, 0.05]  # 70% confirmed, 25% pending, 5% not found
-            status = random.choices(outcomes, weights=weights)[0]
-            
-            logger.info(f"SIMULATION: Transaction {tx_hash} status: {status}")
-            
-            if status == 'confirmed':
-                return {
-                    'status': 'confirmed',
-                    'block_number': '0x123456',
-                    'gas_used': '0x5208',
-                    'transaction_hash': tx_hash
-                }
-            else:
-                return {'status': status}
-        
-        # Real blockchain query (example for Ethereum-like blockchain)
-        payload = {
-            "jsonrpc": "2.0",
-            "method": "eth_getTransactionReceipt",
-            "params": [tx_hash],
-            "id": 1
-        }
+        latest_block = int(rpc_call(pool, 'eth_blockNumber', []), 16) - LOG_SCAN_CONFIRMATIONS
+        checkpoint = get_checkpoint(LOG_SCAN_CHECKPOINT)
+        from_block = checkpoint + 1 if checkpoint is not None else max(latest_block - LOG_SCAN_INITIAL_LOOKBACK_BLOCKS, 0)
         
-        response = requests.post(blockchain_rpc_url, json=payload, timeout=10)
-        
-        if response.status_code == 200:
-            result = response.json()
-            
-            if result.get('result') is None:
-                return {'status': 'not_found'}
-            
-            receipt = result['result']
-            
-            # Check if transaction was successful
-            if receipt.get('status') == '0x1':  # Success
-                return {
-                    'status': 'confirmed',
-                    'block_number': receipt.get('blockNumber'),
-                    'gas_used': receipt.get('gasUsed'),
-                    'transaction_hash': tx_hash
-                }
-            else:  # Failed
-                return {
-                    'status': 'failed',
-                    'error': 'Transaction reverted',
-                    'transaction_hash': tx_hash
-                }
-        else:
-            return {'status': 'unknown', 'error': f'RPC error: {response.status_code}'}
+        block_range = LOG_SCAN_MAX_BLOCK_RANGE
+        while from_block <= latest_block:
+            to_block = min(from_block + block_range - 1, latest_block)
+            try:
+                logs = rpc_call(pool, 'eth_getLogs', [{
+                    'fromBlock': hex(from_block),
+                    'toBlock': hex(to_block),
+                    'address': contract_addresses,
+                    'topics': [list(STRATEGY_EXECUTED_TOPICS.values())]
+                }])
+            except RpcError as e:
+                # Providers cap range size and result count; retry with a smaller range
+                if block_range > 1:
+                    block_range = max(block_range // 2, 1)
+                    logger.warning(f"eth_getLogs rejected, shrinking block range to {block_range}: {e}")
+                    continue
+                raise
             
+            for log in logs:
+                status = parse_execution_event(log)
+                statuses[status['transaction_hash']] = status
+            
+            scanned_to_block = to_block
+            from_block = to_block + 1
+        
     except Exception as e:
-        logger.error(f"Blockchain query failed for {tx_hash}: {str(e)}")
-        return {'status': 'unknown', 'error': str(e)}
+        logger.error(f"Log scan failed after block {scanned_to_block}: {str(e)}")
+    
+    return statuses, scanned_to_block
+
+def parse_execution_event(log: Dict) -> Dict:
+    """Turn a *StrategyExecuted log into a confirmed transaction status"""
+    # data = usdtAmount, received, timestamp as 32-byte words
+    data = log['data'][2:]
+    return {
+        'status': 'confirmed',
+        'block_number': log.get('blockNumber'),
+        'amount_out': int(data[64:128], 16),
+        'transaction_hash': log['transactionHash']
+    }
 
-def update_transaction_confirmed(execution_id: str, blockchain_status: Dict):
-    """Mark transaction as confirmed and update details"""
+def rpc_call(pool: RpcEndpointPool, method: str, params: list):
+    """Send a single JSON-RPC request through the endpoint pool and return its result"""
+    payload = {"jsonrpc": "2.0", "method": method, "params": params, "id": 1}
+    _, response = pool.post(payload)
+    response.raise_for_status()
+    result = response.json()
+    if 'error' in result:
+        raise RpcError(result['error'])
+    return result.get('result')
+
+def get_checkpoint(name: str) -> Optional[int]:
+    """Get a persisted scan position"""
     conn = get_db_connection()
     try:
         with conn.cursor() as cursor:
-            query = """
-                UPDATE strategy_executions 
-                SET status = 'SUCCESS',
-                    gas_used = %s,
-                    updated_at = %s
-                WHERE id = %s
-            """
-            
-            gas_used = None
-            if blockchain_status.get('gas_used'):
-                try:
-                    # Convert hex gas_used to BigInt
-                    gas_used = int(blockchain_status['gas_used'], 16)
-                except:
-                    pass
-            
-            cursor.execute(query, (gas_used, datetime.now(), execution_id))
-            conn.commit()
-            
-            logger.info(f"Marked execution {execution_id} as confirmed")
+            execute_prepared(cursor, 'checkpoint_lookup', (name,))
+            row = cursor.fetchone()
+            return row[0] if row else None
             
     finally:
-        conn.close()
+        release_db_connection(conn)
 
-def mark_transaction_failed(execution_id: str, error_message: str):
-    """Mark transaction as failed"""
+def save_checkpoint(name: str, position: int):
+    """Persist a scan position"""
     conn = get_db_connection()
     try:
         with conn.cursor() as cursor:
-            query = """
-                UPDATE strategy_executions 
-                SET status = 'FAILED',
-                    error_message = %s,
-                    updated_at = %s
-                WHERE id = %s
-            """
-            
-            cursor.execute(query, (error_message, datetime.now(), execution_id))
+            execute_prepared(cursor, 'checkpoint_upsert', (name, position, datetime.now()))
             conn.commit()
             
-            logger.info(f"Marked execution {execution_id} as failed: {error_message}")
-            
     finally:
-        conn.close()
+        release_db_connection(conn)
 
-def log_failed_transaction(tx: Dict, error_message: str):
-    """Log failed transaction for alerting"""
+def get_blockchain_transaction_statuses(tx_hashes: List[str]) -> Dict[str, Dict]:
+    """Query blockchain RPC for many transaction statuses using batched, concurrent requests"""
+    if not tx_hashes:
+        return {}
+    
+    pool = get_rpc_pool()
+    if pool is None:
+        return {tx_hash: simulate_transaction_status(tx_hash) for tx_hash in tx_hashes}
+    
+    # Heights decide which endpoints may report a receipt as missing
+    pool.refresh_block_heights()
+    batch_size = pool.get_batch_size()
+    batches = [tx_hashes[i:i + batch_size] for i in range(0, len(tx_hashes), batch_size)]
+    statuses = {}
+    
+    with ThreadPoolExecutor(max_workers=RPC_MAX_CONCURRENT_BATCHES) as executor:
+        for batch_statuses in executor.map(lambda batch: fetch_receipt_batch(pool, batch), batches):
+            statuses.update(batch_statuses)
+    
+    logger.info(f"Fetched {len(statuses)} receipts in {len(batches)} RPC batches")
+    return statuses
+
+def simulate_transaction_status(tx_hash: str) -> Dict:
+    """For testing purposes, simulate random outcomes"""
+    import random
+    outcomes = ['confirmed', 'pending', 'not_found']
+    weights = [0.7, 0.25, 0.05]  # 70% confirmed, 25% pending, 5% not found
+    status = random.choices(outcomes, weights=weights)[0]
+    
+    logger.info(f"SIMULATION: Transaction {tx_hash} status: {status}")
+    
+    if status == 'confirmed':
+        return {
+            'status': 'confirmed',
+            'block_number': '0x123456',
+            'gas_used': '0x5208',
+            'transaction_hash': tx_hash
+        }
+    else:
+        return {'status': status}
+
+def fetch_receipt_batch(pool: RpcEndpointPool, tx_hashes: List[str]) -> Dict[str, Dict]:
+    """Fetch receipts in one JSON-RPC batch, splitting the batch if the node rejects its size"""
+    payload = [
+        {"jsonrpc": "2.0", "method": "eth_getTransactionReceipt", "params": [tx_hash], "id": request_id}
+        for request_id, tx_hash in enumerate(tx_hashes)
+    ]
+    
+    try:
+        endpoint, response = pool.post(payload)
+        results = response.json() if response.status_code == 200 else None
+    except Exception as e:
+        logger.error(f"Blockchain batch query failed for {len(tx_hashes)} transactions: {str(e)}")
+        return {tx_hash: {'status': 'unknown', 'error': str(e)} for tx_hash in tx_hashes}
+    
+    # Whole batch rejected: HTTP 413 or a single error object instead of an array
+    batch_rejected = response.status_code == 413 or (
+        isinstance(results, dict) and is_batch_size_error(results.get('error'))
+    )
+    if batch_rejected:
+        endpoint.record_batch_limit(len(tx_hashes) // 2)
+        return split_receipt_batch(pool, tx_hashes)
+    
+    if not isinstance(results, list):
+        error = f'RPC error: {response.status_code}'
+        return {tx_hash: {'status': 'unknown', 'error': error} for tx_hash in tx_hashes}
+    
+    results_by_id = {item.get('id'): item for item in results if isinstance(item, dict)}
+    statuses = {}
+    oversized = []
+    
+    for request_id, tx_hash in enumerate(tx_hashes):
+        item = results_by_id.get(request_id)
+        if item is None:
+            statuses[tx_hash] = {'status': 'unknown', 'error': 'Missing from batch response'}
+        elif 'error' in item:
+            if is_batch_size_error(item['error']):
+                oversized.append(tx_hash)
+            else:
+                statuses[tx_hash] = {'status': 'unknown', 'error': f"RPC error: {item['error']}"}
+        elif item.get('result') is None and not pool.is_trusted_for_absence(endpoint):
+            statuses[tx_hash] = {'status': 'unknown', 'error': f'No receipt on lagging endpoint {endpoint.name}'}
+        else:
+            statuses[tx_hash] = parse_receipt(tx_hash, item.get('result'))
+    
+    # Some nodes answer the items beyond their batch limit with per-item errors
+    if oversized:
+        endpoint.record_batch_limit(len(tx_hashes) - len(oversized))
+        statuses.update(split_receipt_batch(pool, oversized))
+    
+    return statuses
+
+def split_receipt_batch(pool: RpcEndpointPool, tx_hashes: List[str]) -> Dict[str, Dict]:
+    """Retry rejected receipts in batches of the learned size, which later passes start from"""
+    if len(tx_hashes) == 1:
+        return {tx_hashes[0]: {'status': 'unknown', 'error': 'RPC rejected single-item batch'}}
+    
+    batch_size = pool.get_batch_size()
+    logger.warning(f"RPC node rejected batch of {len(tx_hashes)}, retrying in batches of {batch_size}")
+    statuses = {}
+    for i in range(0, len(tx_hashes), batch_size):
+        statuses.update(fetch_receipt_batch(pool, tx_hashes[i:i + batch_size]))
+    return statuses
+
+def is_batch_size_error(error) -> bool:
+    """Whether a JSON-RPC error complains about the batch size"""
+    if not isinstance(error, dict):
+        return False
+    message = str(error.get('message', '')).lower()
+    return 'batch' in message or 'too large' in message or 'too many' in message
+
+def parse_receipt(tx_hash: str, receipt: Optional[Dict]) -> Dict:
+    """Turn an eth_getTransactionReceipt result into a transaction status"""
+    if receipt is None:
+        return {'status': 'not_found'}
+    
+    # Check if transaction was successful
+    if receipt.get('status') == '0x1':  # Success
+        return {
+            'status': 'confirmed',
+            'block_number': receipt.get('blockNumber'),
+            'gas_used': receipt.get('gasUsed'),
+            'gas_price': receipt.get('effectiveGasPrice'),
+            'amount_out': get_received_amount(receipt.get('logs') or []),
+            'transaction_hash': tx_hash
+        }
+    else:  # Failed
+        return {
+            'status': 'failed',
+            'error': 'Transaction reverted',
+            'transaction_hash': tx_hash
+        }
+
+def get_received_amount(logs: List[Dict]) -> Optional[int]:
+    """Received amount from the *StrategyExecuted event among a receipt's logs"""
+    for log in logs:
+        topics = log.get('topics') or []
+        if topics and topics[0].lower() in EXECUTED_TOPIC_ASSETS:
+            # data = usdtAmount, received, timestamp as 32-byte words
+            return int(log['data'][2:][64:128], 16)
+    return None
+
+def calculate_actual_slippage(asset: str, amount_in: int, amount_out: Optional[int],
+                              price: Optional[str]) -> Optional[Decimal]:
+    """Shortfall of the received amount against the latest daily price, in percent"""
+    if not amount_out or not amount_in or not price or asset not in ASSET_DECIMALS:
+        return None
+    try:
+        expected = Decimal(amount_in) / (10 ** USDT_DECIMALS) / Decimal(price)
+    except (InvalidOperation, ZeroDivisionError):
+        return None
+    if expected <= 0:
+        return None
+    
+    received = Decimal(amount_out) / (10 ** ASSET_DECIMALS[asset])
+    slippage = (expected - received) / expected * 100
+    # Checked before quantizing, which fails for amounts far beyond the expected one
+    return slippage.quantize(Decimal('0.01')) if abs(slippage) <= MAX_RECORDED_SLIPPAGE else None
+
+def apply_transaction_outcomes(pending_transactions: List[Dict], outcomes: Dict[str, Dict]) -> Set[str]:
+    """Apply the confirmed and failed outcomes of a check pass as set-based updates in one transaction,
+    returning the hashes this call settled. Executions another path settled first are left alone."""
+    confirmed = [tx for tx in pending_transactions if outcomes[tx['transaction_hash']]['result'] == 'confirmed']
+    failed = [tx for tx in pending_transactions if outcomes[tx['transaction_hash']]['result'] == 'failed']
+    if not confirmed and not failed:
+        return set()
+    
+    settled = set()
     conn = get_db_connection()
     try:
         with conn.cursor() as cursor:
-            # Check if already logged
-            check_query = """
-                SELECT id FROM failed_transaction_logs 
-                WHERE execution_id = %s
-            """
-            cursor.execute(check_query, (tx['execution_id'],))
-            
-            if cursor.fetchone():
-                logger.info(f"Failed transaction already logged for execution {tx['execution_id']}")
-                return
+            now = datetime.now()
             
-            # Insert new failed log
-            query = """
-                INSERT INTO failed_transaction_logs 
-                (wallet_address, strategy_id, execution_id, asset, transaction_hash, 
-                 amount, plan_type, error_message, failed_at, created_at)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """
+            if confirmed:
+                # Receipt details are stored alongside the status change; the same statement adds the
+                # confirmed amounts to the strategy and wallet rollups
+                execute_prepared(cursor, 'latest_asset_prices')
+                prices = dict(cursor.fetchall())
+                statuses = [outcomes[tx['transaction_hash']]['blockchain_status'] for tx in confirmed]
+                execute_prepared(cursor, 'executions_confirmed', (
+                    [tx['execution_id'] for tx in confirmed],
+                    [parse_hex_quantity(status.get('gas_used')) for status in statuses],
+                    [parse_hex_quantity(status.get('gas_price')) for status in statuses],
+                    [status.get('amount_out') for status in statuses],
+                    [
+                        calculate_actual_slippage(tx['asset'], tx['amount_in'], status.get('amount_out'), prices.get(tx['asset']))
+                        for tx, status in zip(confirmed, statuses)
+                    ],
+                    now
+                ))
+                settled.update(row[0] for row in cursor.fetchall())
             
-            now = datetime.now()
-            cursor.execute(query, (
-                tx['wallet_address'],
-                tx['strategy_id'],
-                tx['execution_id'],
-                tx['asset'],
-                tx['transaction_hash'],
-                str(tx['amount_in']),
-                tx['strategy_type'],
-                error_message,
-                now,
-                now
-            ))
-            conn.commit()
+            if failed:
+                execute_prepared(cursor, 'executions_failed', (
+                    [tx['execution_id'] for tx in failed],
+                    [outcomes[tx['transaction_hash']]['error_message'] for tx in failed],
+                    now
+                ))
+                failed_hashes = {row[0] for row in cursor.fetchall()}
+                failed = [tx for tx in failed if tx['transaction_hash'] in failed_hashes]
+                log_failed_transactions(cursor, failed, [outcomes[tx['transaction_hash']]['log_message'] for tx in failed])
+                settled.update(failed_hashes)
             
-            logger.info(f"Logged failed transaction for execution {tx['execution_id']}")
+            notify_settled_transactions(cursor, settled)
+            conn.commit()
+            logger.info(f"Marked {len(settled) - len(failed)} executions as confirmed and {len(failed)} as failed")
             
     finally:
-        conn.close()
+        release_db_connection(conn)
+    
+    return settled
+
+def notify_settled_transactions(cursor, tx_hashes):
+    """Announce settled hashes to the daemon, delivered when the caller commits"""
+    if tx_hashes:
+        execute_prepared(cursor, 'executions_settled_notify', (EXECUTION_SETTLED_CHANNEL, list(tx_hashes)))
+
+def parse_hex_quantity(value: Optional[str]) -> Optional[int]:
+    """Convert a hex JSON-RPC quantity (e.g. gasUsed) to an int"""
+    if not value:
+        return None
+    try:
+        return to_bigint(int(value, 16))
+    except (TypeError, ValueError):
+        return None
+
+def to_bigint(value: Optional[int]) -> Optional[int]:
+    """Drop values that do not fit a BIGINT column rather than failing the whole batch"""
+    if value is None or value >= 2 ** 63:
+        return None
+    return value
+
+def log_failed_transactions(cursor, transactions: List[Dict], error_messages: List[str]) -> int:
+    """Log a batch of failed transactions for alerting, skipping executions that are already logged"""
+    if not transactions:
+        return 0
+    
+    execute_prepared(cursor, 'failure_logs_insert', (
+        [tx['wallet_address'] for tx in transactions],
+        [tx['strategy_id'] for tx in transactions],
+        [tx['execution_id'] for tx in transactions],
+        [tx['asset'] for tx in transactions],
+        [tx['transaction_hash'] for tx in transactions],
+        [str(tx['amount_in']) for tx in transactions],
+        [tx['strategy_type'] for tx in transactions],
+        error_messages,
+        datetime.now()
+    ))
+    
+    logger.info(f"Logged {cursor.rowcount} failed transactions ({len(transactions) - cursor.rowcount} already logged)")
+    return cursor.rowcount
 
 def send_failed_transaction_alerts() -> int:
-    """Send email alerts for failed transactions that haven't been alerted yet"""
+    """Drain unalerted failed transactions in claimed batches, sending grouped digests"""
+    started = time.monotonic()
+    alerts_sent = 0
+    
     conn = get_db_connection()
     try:
         with conn.cursor() as cursor:
-            query = """
-                SELECT id, wallet_address, asset, transaction_hash, amount, 
-                       plan_type, error_message, failed_at
-                FROM failed_transaction_logs 
-                WHERE alert_sent = false
-                ORDER BY failed_at DESC
-                LIMIT 10
-            """
-            
-            cursor.execute(query)
-            failed_transactions = cursor.fetchall()
-            
-            alerts_sent = 0
-            for tx in failed_transactions:
-                send_failed_transaction_alert(tx)
+            while time.monotonic() - started < ALERT_TIME_BUDGET_SECONDS:
+                # Rows stay locked until commit, so concurrent monitor runs claim disjoint batches
+                execute_prepared(cursor, 'alerts_claim', (ALERT_CLAIM_BATCH_SIZE,))
+                failed_transactions = cursor.fetchall()
+                if not failed_transactions:
+                    break
+                
+                # Each digest is marked sent in its own commit, so a later failure never resends it.
+                # That commit unlocks the rest of the batch, so the next digest's rows are locked
+                # again first and left to whichever run holds them.
+                delivered = True
+                for index, (digest, ids) in enumerate(build_failed_transaction_digests(failed_transactions)):
+                    if index > 0:
+                        execute_prepared(cursor, 'alerts_relock', (ids,))
+                        if len(cursor.fetchall()) < len(ids):
+                            conn.rollback()
+                            continue
+                    
+                    if not send_alert(digest):
+                        conn.rollback()
+                        delivered = False
+                        break
+                    
+                    execute_prepared(cursor, 'alerts_mark_sent', (ids,))
+                    conn.commit()
+                    alerts_sent += len(ids)
                 
-                # Mark as alerted
-                update_query = "UPDATE failed_transaction_logs SET alert_sent = true WHERE id = %s"
-                cursor.execute(update_query, (tx[0],))
-                alerts_sent += 1
+                if not delivered:
+                    logger.error("Alert delivery failed, leaving remaining failed transactions unalerted")
+                    break
+                if len(failed_transactions) < ALERT_CLAIM_BATCH_SIZE:
+                    break
             
-            if failed_transactions:
-                conn.commit()
-                logger.info(f"Sent alerts for {len(failed_transactions)} failed transactions")
+            if alerts_sent:
+                logger.info(f"Sent alerts for {alerts_sent} failed transactions")
             
             return alerts_sent
                 
     finally:
-        conn.close()
+        release_db_connection(conn)
 
-def send_failed_transaction_alert(tx_data):
-    """Send individual failed transaction alert"""
-    try:
-        message = f"""
-Transaction Failed - Crypto Investment Platform
-
-Transaction Details:
-- User: {tx_data[1]}
-- Asset: {tx_data[2]}
-- Transaction Hash: {tx_data[3] or 'N/A'}
-- Amount: {tx_data[4]}
-- Strategy Type: {tx_data[5]}
-- Error: {tx_data[6]}
-- Failed At: {tx_data[7]}
-
-Please investigate and take necessary action.
-        """.strip()
-        
-        send_alert(message)
-        
-    except Exception as e:
-        logger.error(f"Failed to send transaction alert: {str(e)}")
+def build_failed_transaction_digests(failed_transactions) -> List[Tuple[str, List[str]]]:
+    """Render failed transactions as per-asset digests of at most ALERT_DIGEST_MAX_ITEMS entries, each
+    with the log ids it covers"""
+    by_asset = {}
+    for tx in failed_transactions:
+        by_asset.setdefault(tx[2], []).append(tx)
+    
+    digests = []
+    for asset, transactions in sorted(by_asset.items()):
+        for start in range(0, len(transactions), ALERT_DIGEST_MAX_ITEMS):
+            chunk = transactions[start:start + ALERT_DIGEST_MAX_ITEMS]
+            lines = [
+                f"- {tx[7]} | {tx[5]} | User: {tx[1]} | Amount: {tx[4]} | "
+                f"Tx: {tx[3] or 'N/A'} | Error: {tx[6]}"
+                for tx in chunk
+            ]
+            digests.append((
+                f"Transactions Failed - Crypto Investment Platform\n\n"
+                f"{len(chunk)} failed {asset} transaction(s) "
+                f"({start + 1}-{start + len(chunk)} of {len(transactions)}):\n"
+                + "\n".join(lines)
+                + "\n\nPlease investigate and take necessary action.",
+                [tx[0] for tx in chunk]
+            ))
+    
+    return digests
 
 def cleanup_old_failed_logs():
     """Remove failed transaction logs older than 2 weeks"""
+    now = datetime.now()
+    two_weeks_ago = now - timedelta(days=FAILED_LOG_RETENTION_DAYS)
+    
+    next_sweep = get_checkpoint(RETENTION_SWEEP_CHECKPOINT)
+    if next_sweep is not None and now.timestamp() < next_sweep:
+        return
+    
+    if FAILED_LOGS_PARTITIONED:
+        drop_expired_failed_log_partitions(two_weeks_ago)
+        # Partitions exist a week ahead, so maintaining them once a day is plenty
+        tomorrow = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+        save_checkpoint(RETENTION_SWEEP_CHECKPOINT, int(tomorrow.timestamp()))
+        return
+    
     conn = get_db_connection()
     try:
         with conn.cursor() as cursor:
-            two_weeks_ago = datetime.now() - timedelta(days=14)
+            started = time.monotonic()
+            deleted_count = 0
             
-            query = """
-                DELETE FROM failed_transaction_logs 
-                WHERE failed_at < %s
-            """
+            while True:
+                cursor.execute("""
+                    DELETE FROM failed_transaction_logs
+                    WHERE id IN (
+                        SELECT id FROM failed_transaction_logs
+                        WHERE failed_at < %s
+                        ORDER BY failed_at
+                        LIMIT %s
+                    )
+                """, (two_weeks_ago, RETENTION_BATCH_SIZE))
+                batch_count = cursor.rowcount
+                conn.commit()
+                deleted_count += batch_count
+                
+                if batch_count < RETENTION_BATCH_SIZE:
+                    break
+                if time.monotonic() - started > RETENTION_TIME_BUDGET_SECONDS:
+                    logger.info("Retention time budget exhausted, continuing next run")
+                    break
             
-            cursor.execute(query, (two_weeks_ago,))
-            deleted_count = cursor.rowcount
+            # Nothing can have expired before the oldest remaining row reaches the cutoff, so schedule
+            # the next sweep for then
+            cursor.execute("SELECT MIN(failed_at) FROM failed_transaction_logs")
+            oldest_failed_at = cursor.fetchone()[0]
             conn.commit()
+            next_sweep_at = (oldest_failed_at or now) + timedelta(days=FAILED_LOG_RETENTION_DAYS)
+            save_checkpoint(RETENTION_SWEEP_CHECKPOINT, int(next_sweep_at.timestamp()))
             
             if deleted_count > 0:
                 logger.info(f"Cleaned up {deleted_count} old failed transaction logs")
                 
     finally:
-        conn.close()
+        release_db_connection(conn)
 
-def send_alert(message: str):
-    """Send email alert"""
+def drop_expired_failed_log_partitions(cutoff: datetime):
+    """Partitioned layout: drop daily partitions entirely below the cutoff, expire rows in the DEFAULT
+    partition and pre-create upcoming partitions"""
+    conn = get_db_connection()
     try:
-        # For now, just log the alert
-        # You can implement email sending using SendGrid, Gmail API, etc.
-        logger.warning(f"ALERT: {message}")
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT child.relname
+                FROM pg_inherits
+                JOIN pg_class child ON pg_inherits.inhrelid = child.oid
+                WHERE pg_inherits.inhparent = 'failed_transaction_logs'::regclass
+                  AND child.relname ~ '^failed_transaction_logs_p[0-9]{8}$'
+            """)
+            partition_names = {partition_name for (partition_name,) in cursor.fetchall()}
+            
+            # A day's rows may already sit in DEFAULT, which would make CREATE ... PARTITION OF fail,
+            # so each new partition is built standalone, takes those rows over and is then attached
+            today = datetime.now().date()
+            for offset in range(FAILED_LOG_PARTITION_DAYS_AHEAD + 1):
+                day = today + timedelta(days=offset)
+                partition_name = f'failed_transaction_logs_p{day:%Y%m%d}'
+                if partition_name in partition_names:
+                    continue
+                bounds = (day, day + timedelta(days=1))
+                cursor.execute(f"CREATE TABLE {partition_name} (LIKE failed_transaction_logs INCLUDING DEFAULTS)")
+                cursor.execute(f"""
+                    WITH moved AS (
+                        DELETE FROM failed_transaction_logs_default
+                        WHERE failed_at >= %s AND failed_at < %s
+                        RETURNING *
+                    )
+                    INSERT INTO {partition_name} SELECT * FROM moved
+                """, bounds)
+                cursor.execute(f"""
+                    ALTER TABLE failed_transaction_logs ATTACH PARTITION {partition_name}
+                    FOR VALUES FROM (%s) TO (%s)
+                """, bounds)
+                partition_names.add(partition_name)
+            
+            dropped = []
+            for partition_name in sorted(partition_names):
+                day = datetime.strptime(partition_name[-8:], '%Y%m%d')
+                if day + timedelta(days=1) <= cutoff:
+                    cursor.execute(f"DROP TABLE {partition_name}")
+                    dropped.append(partition_name)
+            
+            # Rows outside every daily partition expire like any other
+            cursor.execute("DELETE FROM failed_transaction_logs_default WHERE failed_at < %s", (cutoff,))
+            expired_default_count = cursor.rowcount
+            
+            conn.commit()
+            
+            if dropped:
+                logger.info(f"Dropped expired failed transaction log partitions: {', '.join(dropped)}")
+            if expired_default_count:
+                logger.info(f"Cleaned up {expired_default_count} old failed transaction logs from the default partition")
+                
+    finally:
+        release_db_connection(conn)
+
+def send_alert(message: str) -> bool:
+    """Send alert to the alert webhook when configured, otherwise log it"""
+    global alert_webhook_url
+    try:
+        if alert_webhook_url is None:
+            alert_webhook_url = get_secret('alert-webhook-url') or ''
+        
+        if not alert_webhook_url:
+            logger.warning(f"ALERT: {message}")
+            return True
         
-        # TODO: Implement actual email sending
-        # Example with SendGrid:
-        # import sendgrid
-        # sg = sendgrid.SendGridAPIClient(api_key=get_secret('sendgrid-api-key'))
-        # from_email = "alerts@yourplatform.com"
-        # to_email = get_secret('alert-email')
-        # subject = "Transaction Monitor Alert"
-        # content = Content("text/plain", message)
-        # mail = Mail(from_email, to_email, subject, content)
-        # sg.client.mail.send.post(request_body=mail.get())
+        response = alert_session.post(alert_webhook_url, json={'text': message}, timeout=ALERT_TIMEOUT_SECONDS)
+        response.raise_for_status()
+        return True
         
     except Exception as e:
         logger.error(f"Failed to send alert: {str(e)}")
+        return False
+
+class PendingWatchSet:
+    """Pending transactions watched by the daemon, keyed by transaction hash"""
+    
+    def __init__(self):
+        self.transactions = {}
+        self.lock = threading.Lock()
+    
+    def replace(self, transactions: List[Dict]):
+        with self.lock:
+            self.transactions = {tx['transaction_hash']: tx for tx in transactions}
+    
+    def snapshot(self) -> List[Dict]:
+        with self.lock:
+            return list(self.transactions.values())
+    
+    def add(self, transactions: List[Dict]):
+        with self.lock:
+            for tx in transactions:
+                self.transactions[tx['transaction_hash']] = tx
+    
+    def discard(self, tx_hashes: List[str]):
+        with self.lock:
+            for tx_hash in tx_hashes:
+                self.transactions.pop(tx_hash, None)
+    
+    def __len__(self) -> int:
+        with self.lock:
+            return len(self.transactions)
+
+def run_daemon():
+    """Long-running mode: check the watched pending hashes on every new block"""
+    watch_set = PendingWatchSet()
+    threading.Thread(target=listen_for_submissions, args=(watch_set,), name='monitor-listener', daemon=True).start()
+    logger.info("Daemon started")
+    last_timeout_sweep = None
+    
+    for block_number in iter_new_blocks():
+        try:
+            # The timeout only moves by the hour, so sweeping on every block would be wasted work
+            if last_timeout_sweep is None or time.monotonic() - last_timeout_sweep >= DAEMON_TIMEOUT_SWEEP_SECONDS:
+                watch_set.discard([tx['transaction_hash'] for tx in fail_timed_out_transactions()])
+                last_timeout_sweep = time.monotonic()
+            
+            now = datetime.now()
+            due = [tx for tx in watch_set.snapshot() if is_check_due(tx, now)]
+            if not due:
+                continue
+            
+            outcomes = process_pending_transactions(due)
+            settled = [tx_hash for tx_hash, result in outcomes.items() if result in ('confirmed', 'failed')]
+            watch_set.discard(settled)
+            
+            if settled:
+                logger.info(f"Block {block_number}: settled {len(settled)}, still watching {len(watch_set)}")
+                
+        except Exception as e:
+            logger.error(f"Daemon failed to process block {block_number}: {str(e)}")
+
+def listen_for_submissions(watch_set: PendingWatchSet):
+    """Feed the watch set from the spot buyer's submission notifications and drop the executions other
+    paths settle, reconnecting on failure"""
+    while True:
+        try:
+            conn = psycopg2.connect(**get_db_settings())
+            try:
+                conn.autocommit = True
+                with conn.cursor() as cursor:
+                    cursor.execute(f"LISTEN {EXECUTION_SUBMITTED_CHANNEL}")
+                    cursor.execute(f"LISTEN {EXECUTION_SETTLED_CHANNEL}")
+                    cursor.execute("SELECT pg_current_wal_lsn()::text")
+                    note_write_position(cursor.fetchone()[0])
+                
+                # Listening before the load means nothing submitted in between is missed, as long as
+                # the load reflects the primary as of the LISTEN. This full load only happens on
+                # (re)connect, to cover notifications sent while away. Submissions announced later
+                # were just written, so they are read back from the primary.
+                watch_set.replace(get_pending_transactions(due_before=datetime.max))
+                logger.info(f"Listening on {EXECUTION_SUBMITTED_CHANNEL}, watching {len(watch_set)} pending transactions")
+                
+                while True:
+                    if not select.select([conn], [], [], DAEMON_LISTEN_RETRY_SECONDS)[0]:
+                        continue
+                    conn.poll()
+                    execution_ids = []
+                    settled_hashes = []
+                    while conn.notifies:
+                        notify = conn.notifies.pop(0)
+                        if notify.channel == EXECUTION_SETTLED_CHANNEL:
+                            settled_hashes.append(notify.payload)
+                            continue
+                        try:
+                            execution_ids.append(json.loads(notify.payload)['execution_id'])
+                        except (ValueError, KeyError):
+                            logger.warning(f"Ignoring malformed submission notification: {notify.payload}")
+                    
+                    if execution_ids:
+                        watch_set.add(get_pending_transactions_by_id(execution_ids))
+                    watch_set.discard(settled_hashes)
+                        
+            finally:
+                conn.close()
+                
+        except Exception as e:
+            logger.error(f"Submission listener failed, reconnecting in {DAEMON_LISTEN_RETRY_SECONDS}s: {str(e)}")
+            time.sleep(DAEMON_LISTEN_RETRY_SECONDS)
+
+def iter_new_blocks():
+    """Yield new block numbers from a newHeads subscription, falling back to eth_blockNumber polling"""
+    while True:
+        ws_url = get_secret('blockchain-ws-url')
+        if ws_url:
+            try:
+                yield from subscribe_new_heads(ws_url)
+            except Exception as e:
+                logger.warning(f"newHeads subscription lost, polling for {DAEMON_WS_RETRY_SECONDS}s: {str(e)}")
+        
+        yield from poll_new_blocks(get_rpc_pool(), DAEMON_WS_RETRY_SECONDS if ws_url else None)
+
+def subscribe_new_heads(ws_url: str):
+    """Yield block numbers pushed by an eth_subscribe newHeads subscription"""
+    ws = websocket.create_connection(ws_url, timeout=DAEMON_WS_TIMEOUT_SECONDS)
+    try:
+        ws.send(json.dumps({"jsonrpc": "2.0", "method": "eth_subscribe", "params": ["newHeads"], "id": 1}))
+        response = json.loads(ws.recv())
+        if 'error' in response:
+            raise RpcError(response['error'])
+        subscription_id = response['result']
+        logger.info(f"Subscribed to newHeads ({subscription_id})")
+        
+        while True:
+            message = json.loads(ws.recv())
+            params = message.get('params') or {}
+            if params.get('subscription') == subscription_id:
+                yield int(params['result']['number'], 16)
+                
+    finally:
+        ws.close()
+
+def poll_new_blocks(pool: Optional[RpcEndpointPool], duration_seconds: Optional[float]):
+    """Yield new block numbers by polling eth_blockNumber, for a limited time if duration is given"""
+    started = time.monotonic()
+    last_block = None
+    
+    while duration_seconds is None or time.monotonic() - started < duration_seconds:
+        try:
+            if pool is not None:
+                block_number = int(rpc_call(pool, 'eth_blockNumber', []), 16)
+            else:
+                block_number = int(time.time() // DAEMON_POLL_SECONDS)
+            
+            if block_number != last_block:
+                last_block = block_number
+                yield block_number
+                
+        except Exception as e:
+            logger.error(f"eth_blockNumber poll failed: {str(e)}")
+        
+        time.sleep(DAEMON_POLL_SECONDS)
 
 if __name__ == '__main__':
+    if '--daemon' in sys.argv:
+        threading.Thread(target=run_daemon, name='monitor-daemon', daemon=True).start()
+    
     port = int(os.environ.get('PORT', 8080))
     app.run(host='0.0.0.0', port=port, debug=False)
\ No newline at end of file
@@ -0,0 +1,96 @@
+"""Fixtures for the transaction monitor suite: a chain simulator and a scratch database.
+
+Run from the service directory (python -m pytest tests) with TEST_DB_HOST pointing at a Postgres
+server the tests may create databases on.
+"""
+import os
+import sys
+from datetime import datetime
+
+import pytest
+
+SERVICE_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVICE_PATH)
+sys.path.insert(0, os.path.join(SERVICE_PATH, '..', 'shared'))
+
+import chain_simulator
+from spotmf_shared import db as shared_db, testing
+
+SIMULATOR_PORT = int(os.environ.get('TEST_SIMULATOR_PORT', 8597))
+CLEARED_TABLES = ('strategy_executions', 'failed_transaction_logs', 'wallet_asset_rollups', 'service_checkpoints',
+                  'service_runs', 'dma_status')
+
+@pytest.fixture(scope='session')
+def simulator_url():
+    server = chain_simulator.start_simulator([
+        '--port', str(SIMULATOR_PORT), '--block-time', '0.1', '--max-confirm-blocks', '1',
+        '--revert-rate', '0', '--drop-rate', '0'
+    ])
+    yield f'http://127.0.0.1:{SIMULATOR_PORT}'
+    server.shutdown()
+
+@pytest.fixture(scope='session')
+def monitor(simulator_url):
+    settings = testing.get_test_db_settings()
+    if settings is None:
+        pytest.skip('TEST_DB_HOST is not set')
+    database = testing.create_scratch_database(settings)
+
+    # The monitor reads its configuration at import time
+    os.environ.update({
+        'SECRET_DB_HOST': settings['host'],
+        'SECRET_DB_NAME': database,
+        'SECRET_DB_USER': settings['user'],
+        'SECRET_DB_PASSWORD': settings['password'],
+        'SECRET_DB_READ_DSN': '',
+        'SECRET_BLOCKCHAIN_RPC_URLS': simulator_url,
+        'SECRET_BLOCKCHAIN_WS_URL': '',
+        'SECRET_STRATEGY_CONTRACT_BTC': chain_simulator.SIMULATED_CONTRACT,
+        'SECRET_STRATEGY_CONTRACT_ETH': '',
+        'SECRET_STRATEGY_CONTRACT_HYPE': '',
+        'SECRET_ALERT_WEBHOOK_URL': '',
+        'SECRET_CALLBACK_SIGNING_SECRET': 'test-signing-secret',
+        'LOG_SCAN_CONFIRMATIONS': '0',
+    })
+    import main
+    yield main
+
+    shared_db.get_db_pool().closeall()
+    testing.drop_scratch_database(settings, database)
+
+@pytest.fixture
+def db(monitor):
+    """A cursor on the scratch database, emptied of executions and logs before each test"""
+    conn = monitor.get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(f"TRUNCATE {', '.join(CLEARED_TABLES)}")
+            cursor.execute("DELETE FROM user_strategies")
+            cursor.execute("DELETE FROM action_nonces")
+            cursor.execute("DELETE FROM users")
+            conn.commit()
+            yield cursor
+            conn.commit()
+    finally:
+        monitor.release_db_connection(conn)
+
+def insert_execution(cursor, execution_id: str, strategy_id: str, tx_hash: str, age_hours: float = 1,
+                     next_check_in_minutes: float = -1, status: str = 'EXECUTING'):
+    """Insert a submitted execution of the given age, due for a check at the given offset"""
+    cursor.execute("""
+        INSERT INTO strategy_executions (id, strategy_id, transaction_hash, status, amount_in, created_at,
+                                         updated_at, next_check_at)
+        VALUES (%s, %s, %s, %s, 1000000, now() - %s * interval '1 hour', now(),
+                now() + %s * interval '1 minute')
+    """, (execution_id, strategy_id, tx_hash, status, age_hours, next_check_in_minutes))
+    cursor.connection.commit()
+
+def insert_failure_log(cursor, execution_id: str, failed_at: datetime, asset: str = 'BTC',
+                       strategy_id: str = 'strategy-1'):
+    """Insert an unalerted failed transaction log"""
+    cursor.execute("""
+        INSERT INTO failed_transaction_logs (wallet_address, strategy_id, execution_id, asset, transaction_hash,
+                                             amount, plan_type, error_message, failed_at, created_at)
+        VALUES ('0xwallet', %s, %s, %s, %s, '1000000', 'DCA', 'reverted', %s, %s)
+    """, (strategy_id, execution_id, asset, f'0x{execution_id}', failed_at, failed_at))
+    cursor.connection.commit()
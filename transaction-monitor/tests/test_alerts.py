@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta
+
+import psycopg2
+import pytest
+
+from conftest import insert_failure_log
+from spotmf_shared import testing
+
+@pytest.fixture
+def sent_digests(monitor, monkeypatch):
+    """Digests passed to send_alert, which always delivers"""
+    digests = []
+    monkeypatch.setattr(monitor, 'send_alert', lambda message: digests.append(message) or True)
+    return digests
+
+def seed_failures(cursor, assets):
+    testing.seed_strategy(cursor, 'strategy-1')
+    started = datetime.now() - timedelta(hours=1)
+    for index, asset in enumerate(assets):
+        insert_failure_log(cursor, f'execution-{index}', started + timedelta(seconds=index), asset=asset)
+
+def get_unalerted(cursor) -> set:
+    cursor.execute("SELECT execution_id FROM failed_transaction_logs WHERE alert_sent = false")
+    return {execution_id for (execution_id,) in cursor.fetchall()}
+
+def test_alerts_drain_every_claimed_batch_in_per_asset_digests(monitor, db, sent_digests, monkeypatch):
+    monkeypatch.setattr(monitor, 'ALERT_CLAIM_BATCH_SIZE', 3)
+    monkeypatch.setattr(monitor, 'ALERT_DIGEST_MAX_ITEMS', 2)
+    seed_failures(db, ['BTC', 'BTC', 'ETH', 'BTC', 'BTC', 'BTC', 'ETH'])
+
+    assert monitor.send_failed_transaction_alerts() == 7
+
+    assert get_unalerted(db) == set()
+    # Claims of 3: (BTC BTC | ETH), (BTC BTC | BTC), (ETH)
+    assert len(sent_digests) == 5
+    assert all('failed BTC' in digest or 'failed ETH' in digest for digest in sent_digests)
+
+def test_failed_delivery_keeps_earlier_digests_sent(monitor, db, monkeypatch):
+    monkeypatch.setattr(monitor, 'ALERT_DIGEST_MAX_ITEMS', 2)
+    seed_failures(db, ['BTC'] * 5)
+    deliveries = iter([True, False])
+    monkeypatch.setattr(monitor, 'send_alert', lambda message: next(deliveries))
+
+    assert monitor.send_failed_transaction_alerts() == 2
+
+    assert get_unalerted(db) == {'execution-2', 'execution-3', 'execution-4'}
+
+def test_rows_claimed_by_a_concurrent_run_are_skipped(monitor, db, sent_digests):
+    seed_failures(db, ['BTC'] * 3)
+    other_run = psycopg2.connect(**monitor.get_db_settings())
+    try:
+        with other_run.cursor() as cursor:
+            cursor.execute("SELECT id FROM failed_transaction_logs WHERE execution_id = 'execution-1' FOR UPDATE")
+
+            assert monitor.send_failed_transaction_alerts() == 2
+    finally:
+        other_run.close()
+
+    assert get_unalerted(db) == {'execution-1'}
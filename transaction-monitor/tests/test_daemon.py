@@ -0,0 +1,70 @@
+import select
+
+import psycopg2
+import pytest
+
+from conftest import insert_execution
+from spotmf_shared import testing
+from test_monitor import broadcast, make_hash
+
+@pytest.fixture
+def settled_listener(monitor):
+    """A connection listening on the settled channel"""
+    conn = psycopg2.connect(**monitor.get_db_settings())
+    conn.autocommit = True
+    with conn.cursor() as cursor:
+        cursor.execute(f"LISTEN {monitor.EXECUTION_SETTLED_CHANNEL}")
+    yield conn
+    conn.close()
+
+def received_hashes(conn) -> set:
+    select.select([conn], [], [], 1)
+    conn.poll()
+    return {notify.payload for notify in conn.notifies}
+
+def test_callback_settlements_are_announced_to_the_daemon(monitor, db, settled_listener):
+    testing.seed_strategy(db, 'strategy-1')
+    insert_execution(db, 'execution-1', 'strategy-1', make_hash('daemon-callback-1'))
+
+    monitor.apply_transaction_reports([
+        {'execution_id': 'execution-1', 'transaction_hash': make_hash('daemon-callback-1'), 'status': 'confirmed'}
+    ])
+
+    assert received_hashes(settled_listener) == {make_hash('daemon-callback-1')}
+
+def test_timeout_sweep_settlements_are_announced_to_the_daemon(monitor, db, settled_listener):
+    testing.seed_strategy(db, 'strategy-1')
+    insert_execution(db, 'execution-old', 'strategy-1', make_hash('daemon-old-1'), age_hours=30)
+
+    monitor.fail_timed_out_transactions()
+
+    assert received_hashes(settled_listener) == {make_hash('daemon-old-1')}
+
+def test_latency_is_recorded_once_when_a_callback_settles_first(monitor, db, simulator_url, monkeypatch):
+    monkeypatch.setattr(monitor, 'execution_latency', {})
+    testing.seed_strategy(db, 'strategy-1')
+    insert_execution(db, 'execution-1', 'strategy-1', make_hash('daemon-race-1'))
+    db.execute("UPDATE strategy_executions SET due_at = now() - interval '1 minute'")
+    db.connection.commit()
+    broadcast(simulator_url, [make_hash('daemon-race-1')])
+    # The daemon's view of the row, read before the callback lands
+    pending = monitor.get_pending_transactions()
+
+    monitor.apply_transaction_reports([
+        {'execution_id': 'execution-1', 'transaction_hash': make_hash('daemon-race-1'), 'status': 'confirmed'}
+    ])
+    outcomes = monitor.process_pending_transactions(pending)
+
+    assert outcomes == {make_hash('daemon-race-1'): 'confirmed'}
+    assert monitor.get_execution_latency_metrics()['BTC']['count'] == 1
+
+def test_daemon_sweeps_timeouts_on_a_timer(monitor, monkeypatch):
+    sweeps = []
+    monkeypatch.setattr(monitor, 'DAEMON_TIMEOUT_SWEEP_SECONDS', 3600)
+    monkeypatch.setattr(monitor, 'listen_for_submissions', lambda watch_set: None)
+    monkeypatch.setattr(monitor, 'iter_new_blocks', lambda: iter(range(5)))
+    monkeypatch.setattr(monitor, 'fail_timed_out_transactions', lambda: sweeps.append(1) or [])
+
+    monitor.run_daemon()
+
+    assert len(sweeps) == 1
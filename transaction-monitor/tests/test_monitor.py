@@ -0,0 +1,151 @@
+import hashlib
+import hmac
+import json
+import time
+
+import requests
+
+from conftest import insert_execution
+from spotmf_shared import testing
+
+def make_hash(label: str) -> str:
+    return '0x' + hashlib.sha256(label.encode()).hexdigest()
+
+def broadcast(simulator_url: str, tx_hashes):
+    """Register transactions with the simulator and wait until they have mined"""
+    response = requests.post(simulator_url, json={
+        'jsonrpc': '2.0', 'method': 'sim_registerTransactions', 'params': list(tx_hashes), 'id': 1
+    }, timeout=10)
+    response.raise_for_status()
+    time.sleep(0.5)
+
+def get_statuses(cursor):
+    cursor.execute("SELECT id, status FROM strategy_executions")
+    return dict(cursor.fetchall())
+
+def test_process_pending_transactions_confirms_mined_receipts(monitor, db, simulator_url):
+    testing.seed_strategy(db, 'strategy-1')
+    insert_execution(db, 'execution-1', 'strategy-1', make_hash('receipt-1'))
+    broadcast(simulator_url, [make_hash('receipt-1')])
+
+    pending = monitor.get_pending_transactions()
+    outcomes = monitor.process_pending_transactions(pending)
+
+    assert outcomes == {make_hash('receipt-1'): 'confirmed'}
+    db.execute("SELECT status, amount_out, gas_used FROM strategy_executions WHERE id = 'execution-1'")
+    status, amount_out, gas_used = db.fetchone()
+    assert status == 'SUCCESS'
+    assert amount_out is not None
+    assert gas_used == 180000
+
+def test_process_pending_transactions_leaves_unmined_transactions_pending(monitor, db):
+    testing.seed_strategy(db, 'strategy-1')
+    insert_execution(db, 'execution-1', 'strategy-1', make_hash('unmined-1'))
+
+    outcomes = monitor.process_pending_transactions(monitor.get_pending_transactions())
+
+    assert outcomes == {make_hash('unmined-1'): 'pending'}
+    assert get_statuses(db) == {'execution-1': 'EXECUTING'}
+    # The next check is pushed out by the backoff schedule
+    assert monitor.get_pending_transactions() == []
+
+def test_log_scan_settles_transactions_that_were_not_due(monitor, db, simulator_url, monkeypatch):
+    monkeypatch.setattr(monitor, 'MONITOR_CONFIRMATION_MODE', 'logs')
+    testing.seed_strategy(db, 'strategy-1')
+    testing.seed_strategy(db, 'strategy-2')
+    insert_execution(db, 'execution-due', 'strategy-1', make_hash('logs-due'))
+    insert_execution(db, 'execution-later', 'strategy-2', make_hash('logs-later'), next_check_in_minutes=60)
+    broadcast(simulator_url, [make_hash('logs-due'), make_hash('logs-later')])
+
+    pending = monitor.get_pending_transactions()
+    assert [tx['execution_id'] for tx in pending] == ['execution-due']
+    outcomes = monitor.process_pending_transactions(pending)
+
+    assert outcomes == {make_hash('logs-due'): 'confirmed', make_hash('logs-later'): 'confirmed'}
+    assert get_statuses(db) == {'execution-due': 'SUCCESS', 'execution-later': 'SUCCESS'}
+    assert monitor.get_checkpoint(monitor.LOG_SCAN_CHECKPOINT) is not None
+
+def test_scan_execution_events_resumes_from_checkpoint(monitor, db, simulator_url):
+    broadcast(simulator_url, [make_hash('scan-1')])
+    pool = monitor.get_rpc_pool()
+
+    first, scanned_to = monitor.scan_execution_events(pool)
+    # The scan itself does not move the checkpoint, so an unapplied pass is read again
+    again, _ = monitor.scan_execution_events(pool)
+    monitor.save_checkpoint(monitor.LOG_SCAN_CHECKPOINT, scanned_to)
+    second, _ = monitor.scan_execution_events(pool)
+
+    assert first[make_hash('scan-1')]['status'] == 'confirmed'
+    assert make_hash('scan-1') in again
+    assert make_hash('scan-1') not in second
+
+def test_failed_scan_keeps_the_events_of_completed_ranges(monitor, db, simulator_url, monkeypatch):
+    monkeypatch.setattr(monitor, 'MONITOR_CONFIRMATION_MODE', 'logs')
+    monkeypatch.setattr(monitor, 'LOG_SCAN_MAX_BLOCK_RANGE', 1)
+    testing.seed_strategy(db, 'strategy-1')
+    insert_execution(db, 'execution-1', 'strategy-1', make_hash('partial-1'))
+    broadcast(simulator_url, [make_hash('partial-1')])
+    pool = monitor.get_rpc_pool()
+    mined_block = int(monitor.rpc_call(pool, 'eth_getTransactionReceipt', [make_hash('partial-1')])['blockNumber'], 16)
+    monitor.save_checkpoint(monitor.LOG_SCAN_CHECKPOINT, mined_block - 1)
+
+    rpc_call = monitor.rpc_call
+    log_requests = []
+
+    def fail_second_range(pool, method, params):
+        if method == 'eth_getLogs':
+            log_requests.append(params)
+            if len(log_requests) > 1:
+                raise requests.ConnectionError('connection reset')
+        return rpc_call(pool, method, params)
+
+    monkeypatch.setattr(monitor, 'rpc_call', fail_second_range)
+
+    outcomes = monitor.process_pending_transactions(monitor.get_pending_transactions())
+
+    assert outcomes == {make_hash('partial-1'): 'confirmed'}
+    assert get_statuses(db) == {'execution-1': 'SUCCESS'}
+    assert monitor.get_checkpoint(monitor.LOG_SCAN_CHECKPOINT) == mined_block
+
+def test_monitor_fails_timed_out_transactions_without_rpc(monitor, db):
+    testing.seed_strategy(db, 'strategy-1')
+    insert_execution(db, 'execution-old', 'strategy-1', make_hash('old-1'), age_hours=30, next_check_in_minutes=60)
+
+    response = monitor.app.test_client().post('/monitor')
+
+    assert response.status_code == 200
+    results = response.get_json()['results']
+    assert results['timed_out'] == 1
+    assert results['failed'] == 1
+    assert get_statuses(db) == {'execution-old': 'FAILED'}
+    db.execute("SELECT execution_id, error_message FROM failed_transaction_logs")
+    assert db.fetchall() == [('execution-old', monitor.TIMEOUT_LOG_MESSAGE)]
+
+def post_callback(monitor, payload):
+    body = json.dumps(payload).encode()
+    timestamp = str(int(time.time()))
+    signature = hmac.new(b'test-signing-secret', timestamp.encode() + b'.' + body, hashlib.sha256).hexdigest()
+    return monitor.app.test_client().post('/callbacks/transactions', data=body, headers={
+        'X-Timestamp': timestamp, 'X-Signature': f'sha256={signature}', 'Content-Type': 'application/json'
+    })
+
+def test_callback_counts_each_report_in_one_bucket(monitor, db):
+    testing.seed_strategy(db, 'strategy-1')
+    insert_execution(db, 'execution-1', 'strategy-1', make_hash('callback-1'))
+
+    response = post_callback(monitor, {'transactions': [
+        {'execution_id': 'execution-1', 'transaction_hash': make_hash('callback-1'), 'status': 'confirmed',
+         'amount_out': '123456', 'gas_used': 21000},
+        {'execution_id': 'execution-2', 'transaction_hash': 7, 'status': 'confirmed'},
+        {'execution_id': 'execution-3', 'transaction_hash': make_hash('callback-3'), 'status': 'confirmed'},
+    ]})
+
+    assert response.status_code == 200
+    results = response.get_json()['results']
+    assert results == {'received': 3, 'confirmed': 1, 'failed': 0, 'invalid': 1, 'ignored': 1}
+    assert get_statuses(db) == {'execution-1': 'SUCCESS'}
+
+def test_callback_rejects_reports_that_are_not_objects(monitor, db):
+    response = post_callback(monitor, {'transactions': ['execution-1']})
+
+    assert response.status_code == 400
@@ -0,0 +1,53 @@
+import pytest
+
+from spotmf_shared import db as shared_db, testing
+
+@pytest.fixture
+def routing(monitor, monkeypatch):
+    """Route reads with a caller-chosen db-read-dsn, closing the replica pool afterwards"""
+    yield lambda read_dsn: testing.reset_read_routing(monkeypatch, read_dsn)
+    testing.close_replica_pool()
+
+def read_once(monitor) -> bool:
+    """Route one read, returning whether it went to the replica"""
+    conn = monitor.get_read_connection()
+    try:
+        return conn.is_replica
+    finally:
+        monitor.release_db_connection(conn)
+
+def test_reads_use_the_primary_without_a_read_dsn(monitor, routing):
+    routing(None)
+
+    assert read_once(monitor) is False
+    assert monitor.get_read_routing_metrics()['primary_unconfigured'] == 1
+
+def test_reads_use_a_caught_up_replica(monitor, routing):
+    routing(testing.get_replica_dsn())
+
+    assert read_once(monitor) is True
+    metrics = monitor.get_read_routing_metrics()
+    assert metrics['replica'] == 1
+    assert metrics['replica_lag_seconds'] == 0
+
+def test_reads_fall_back_when_the_replica_is_behind_the_runs_writes(monitor, routing):
+    routing(testing.get_replica_dsn())
+    assert read_once(monitor) is True
+
+    # A write position the replica has not replayed yet
+    shared_db.note_write_position('FFFF/0')
+
+    assert read_once(monitor) is False
+    assert monitor.get_read_routing_metrics()['primary_behind_writes'] == 1
+
+def test_reads_fall_back_when_the_replica_is_unreachable(monitor, routing):
+    routing('host=/nonexistent dbname=replica connect_timeout=1')
+
+    assert read_once(monitor) is False
+    assert monitor.get_read_routing_metrics()['primary_unavailable'] == 1
+
+def test_pending_transactions_are_read_through_the_router(monitor, db, routing):
+    routing(None)
+
+    assert monitor.get_pending_transactions() == []
+    assert monitor.get_read_routing_metrics()['primary_unconfigured'] == 1
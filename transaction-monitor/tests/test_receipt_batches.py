@@ -0,0 +1,53 @@
+import pytest
+import requests
+
+import chain_simulator
+
+LIMITED_SIMULATOR_PORT = 8599
+BATCH_LIMIT = 8
+
+def rpc(url: str, method: str, params):
+    response = requests.post(url, json={'jsonrpc': '2.0', 'method': method, 'params': params, 'id': 1}, timeout=10)
+    response.raise_for_status()
+    return response.json()['result']
+
+@pytest.fixture
+def limited_pool(monitor, monkeypatch):
+    """A pool on a simulator that rejects batches above BATCH_LIMIT"""
+    server = chain_simulator.start_simulator([
+        '--port', str(LIMITED_SIMULATOR_PORT), '--block-time', '0.1', '--batch-limit', str(BATCH_LIMIT)
+    ])
+    url = f'http://127.0.0.1:{LIMITED_SIMULATOR_PORT}'
+    pool = monitor.RpcEndpointPool([url])
+    monkeypatch.setattr(monitor, 'rpc_pool', pool)
+    monkeypatch.setattr(monitor, 'RPC_BATCH_SIZE', 50)
+    yield pool, url
+    server.shutdown()
+    server.server_close()
+
+def test_rejected_batches_are_split_and_the_limit_remembered(monitor, limited_pool):
+    pool, url = limited_pool
+    tx_hashes = [f'0x{index:064x}' for index in range(1, 101)]
+
+    first = monitor.get_blockchain_transaction_statuses(tx_hashes)
+    rejected_first = rpc(url, 'sim_stats', [])['rejected_batches']
+    second = monitor.get_blockchain_transaction_statuses(tx_hashes)
+    rejected_second = rpc(url, 'sim_stats', [])['rejected_batches'] - rejected_first
+
+    assert set(first) == set(second) == set(tx_hashes)
+    assert {status['status'] for status in first.values()} == {'not_found'}
+    assert rejected_first > 0
+    # Later passes start from the size the node accepted
+    assert rejected_second == 0
+    assert pool.get_batch_size() <= BATCH_LIMIT
+    assert pool.get_metrics()[0]['batch_limit'] == pool.get_batch_size()
+
+def test_batch_limit_only_shrinks(monitor, limited_pool):
+    pool, _ = limited_pool
+    endpoint = pool.endpoints[0]
+
+    endpoint.record_batch_limit(30)
+    endpoint.record_batch_limit(40)
+
+    assert endpoint.batch_limit == 30
+    assert pool.get_batch_size() == 30
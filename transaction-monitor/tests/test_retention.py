@@ -0,0 +1,93 @@
+import os
+from datetime import date, datetime, timedelta
+
+import psycopg2
+import pytest
+
+from conftest import insert_failure_log
+from spotmf_shared import testing
+
+PARTITIONED_SQL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'backend', 'prisma',
+                                    'sql', 'failed_transaction_logs_partitioned.sql')
+
+def get_logged_executions(cursor, table: str = 'failed_transaction_logs') -> set:
+    cursor.execute(f"SELECT execution_id FROM {table}")
+    return {execution_id for (execution_id,) in cursor.fetchall()}
+
+def get_partitions(cursor) -> set:
+    cursor.execute("""
+        SELECT child.relname FROM pg_inherits JOIN pg_class child ON pg_inherits.inhrelid = child.oid
+        WHERE pg_inherits.inhparent = 'failed_transaction_logs'::regclass
+    """)
+    return {relname for (relname,) in cursor.fetchall()}
+
+def partition_name(day: date) -> str:
+    return f'failed_transaction_logs_p{day:%Y%m%d}'
+
+@pytest.fixture
+def partitioned_db(monitor, monkeypatch):
+    """A cursor on a scratch database converted to the partitioned failure log layout"""
+    settings = testing.get_test_db_settings()
+    database = testing.create_scratch_database(settings)
+    testing.apply_sql_file(settings, database, PARTITIONED_SQL_PATH)
+    testing.use_database(monkeypatch, database)
+    monkeypatch.setattr(monitor, 'FAILED_LOGS_PARTITIONED', True)
+    conn = psycopg2.connect(database=database, **settings)
+    try:
+        with conn.cursor() as cursor:
+            testing.seed_strategy(cursor, 'strategy-1')
+            conn.commit()
+            yield cursor
+    finally:
+        conn.close()
+        testing.close_db_pool()
+        testing.drop_scratch_database(settings, database)
+
+def test_partitioned_retention_drops_expired_days_and_creates_upcoming_ones(monitor, partitioned_db):
+    cursor = partitioned_db
+    today = date.today()
+    expired_day = today - timedelta(days=20)
+    last_day = today + timedelta(days=monitor.FAILED_LOG_PARTITION_DAYS_AHEAD)
+    cursor.execute(f"""
+        CREATE TABLE {partition_name(expired_day)} PARTITION OF failed_transaction_logs
+        FOR VALUES FROM (%s) TO (%s)
+    """, (expired_day, expired_day + timedelta(days=1)))
+    cursor.execute(f"DROP TABLE {partition_name(last_day)}")
+    cursor.connection.commit()
+    noon = datetime.combine(today, datetime.min.time()) + timedelta(hours=12)
+    insert_failure_log(cursor, 'expired-partition', noon - timedelta(days=20))
+    insert_failure_log(cursor, 'expired-default', noon - timedelta(days=40))
+    insert_failure_log(cursor, 'recent', noon - timedelta(days=1))
+    # Lands in DEFAULT until the day's partition exists
+    insert_failure_log(cursor, 'upcoming', noon + timedelta(days=monitor.FAILED_LOG_PARTITION_DAYS_AHEAD))
+
+    monitor.cleanup_old_failed_logs()
+
+    partitions = get_partitions(cursor)
+    assert partition_name(expired_day) not in partitions
+    assert partition_name(last_day) in partitions
+    assert get_logged_executions(cursor) == {'recent', 'upcoming'}
+    assert get_logged_executions(cursor, partition_name(last_day)) == {'upcoming'}
+    tomorrow = datetime.combine(today + timedelta(days=1), datetime.min.time())
+    assert monitor.get_checkpoint(monitor.RETENTION_SWEEP_CHECKPOINT) == int(tomorrow.timestamp())
+
+def test_partitioned_retention_waits_for_the_next_day(monitor, partitioned_db, monkeypatch):
+    monitor.cleanup_old_failed_logs()
+    monkeypatch.setattr(monitor, 'drop_expired_failed_log_partitions',
+                        lambda cutoff: pytest.fail('partitions were maintained twice in a day'))
+
+    monitor.cleanup_old_failed_logs()
+
+def test_unpartitioned_retention_deletes_in_batches_and_schedules_the_next_sweep(monitor, db, monkeypatch):
+    monkeypatch.setattr(monitor, 'RETENTION_BATCH_SIZE', 1)
+    testing.seed_strategy(db, 'strategy-1')
+    now = datetime.now()
+    for index in range(3):
+        insert_failure_log(db, f'expired-{index}', now - timedelta(days=15 + index))
+    insert_failure_log(db, 'recent', now - timedelta(days=2))
+
+    monitor.cleanup_old_failed_logs()
+
+    assert get_logged_executions(db) == {'recent'}
+    next_sweep = monitor.get_checkpoint(monitor.RETENTION_SWEEP_CHECKPOINT)
+    assert next_sweep == int((now - timedelta(days=2) + timedelta(days=monitor.FAILED_LOG_RETENTION_DAYS)).timestamp())
@@ -0,0 +1,60 @@
+from decimal import Decimal
+
+from conftest import insert_execution
+from spotmf_shared import testing
+from test_monitor import make_hash
+
+def set_price(cursor, asset: str, price: str):
+    cursor.execute("""
+        INSERT INTO dma_status (id, asset, current_price, dma_200, status, calculated_at)
+        VALUES (%s, %s, %s, %s, 'BELOW', now())
+    """, (f'dma-{asset}', asset, price, price))
+    cursor.connection.commit()
+
+def confirmed_report(execution_id: str, tx_hash: str, amount_out: int) -> dict:
+    return {'execution_id': execution_id, 'transaction_hash': tx_hash, 'status': 'confirmed',
+            'amount_out': str(amount_out), 'gas_used': 21000, 'gas_price': 10 ** 9}
+
+def test_confirmations_update_the_wallet_and_strategy_rollups_once(monitor, db):
+    wallet_address = testing.seed_strategy(db, 'strategy-1')
+    insert_execution(db, 'execution-1', 'strategy-1', make_hash('rollup-1'))
+    insert_execution(db, 'execution-2', 'strategy-1', make_hash('rollup-2'))
+    reports = [confirmed_report('execution-1', make_hash('rollup-1'), 2000),
+               confirmed_report('execution-2', make_hash('rollup-2'), 1990)]
+
+    monitor.apply_transaction_reports(reports)
+    # A repeated report finds nothing pending and must not count again
+    monitor.apply_transaction_reports(reports)
+
+    db.execute("""
+        SELECT wallet_address, asset, confirmed_executions, total_amount_in, total_amount_out, total_gas_cost
+        FROM wallet_asset_rollups
+    """)
+    assert db.fetchall() == [(wallet_address, 'BTC', 2, 2000000, Decimal(3990), Decimal(2 * 21000 * 10 ** 9))]
+    db.execute("SELECT total_amount_swapped FROM user_strategies WHERE id = 'strategy-1'")
+    assert db.fetchone()[0] == 2000000
+
+def test_slippage_is_measured_against_the_latest_price(monitor, db):
+    testing.seed_strategy(db, 'strategy-1')
+    set_price(db, 'BTC', '50000')
+    insert_execution(db, 'execution-short', 'strategy-1', make_hash('slippage-1'))
+    insert_execution(db, 'execution-huge', 'strategy-1', make_hash('slippage-2'))
+
+    # 1 USDT buys 2000 satoshi at 50000, so 1980 is a 1% shortfall
+    monitor.apply_transaction_reports([
+        confirmed_report('execution-short', make_hash('slippage-1'), 1980),
+        confirmed_report('execution-huge', make_hash('slippage-2'), 2 ** 255),
+    ])
+
+    db.execute("SELECT id, amount_out, actual_slippage FROM strategy_executions ORDER BY id")
+    assert db.fetchall() == [
+        ('execution-huge', Decimal(2 ** 255), None),
+        ('execution-short', Decimal(1980), Decimal('1.00')),
+    ]
+
+def test_calculate_actual_slippage_rejects_unusable_inputs(monitor):
+    assert monitor.calculate_actual_slippage('BTC', 10 ** 6, 2020, '50000') == Decimal('-1.00')
+    assert monitor.calculate_actual_slippage('BTC', 10 ** 6, None, '50000') is None
+    assert monitor.calculate_actual_slippage('BTC', 10 ** 6, 2000, None) is None
+    assert monitor.calculate_actual_slippage('BTC', 10 ** 6, 2000, '0') is None
+    assert monitor.calculate_actual_slippage('DOGE', 10 ** 6, 2000, '0.1') is None
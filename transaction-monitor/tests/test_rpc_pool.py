@@ -0,0 +1,65 @@
+import time
+
+import pytest
+
+import chain_simulator
+from test_monitor import make_hash
+
+FAST_PORT, SLOW_PORT, LAGGING_PORT, DEAD_PORT = 8601, 8602, 8603, 8604
+
+def url(port: int) -> str:
+    return f'http://127.0.0.1:{port}'
+
+@pytest.fixture(scope='module')
+def endpoints():
+    servers = [
+        chain_simulator.start_simulator(['--port', str(FAST_PORT), '--block-time', '0.1']),
+        chain_simulator.start_simulator(['--port', str(SLOW_PORT), '--block-time', '0.1', '--latency-ms', '600']),
+        chain_simulator.start_simulator(['--port', str(LAGGING_PORT), '--block-time', '0.1', '--start-block', '999000']),
+    ]
+    yield
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+def block_number_payload():
+    return {'jsonrpc': '2.0', 'method': 'eth_blockNumber', 'params': [], 'id': 1}
+
+def test_slow_calls_are_hedged_to_the_next_endpoint(monitor, endpoints, monkeypatch):
+    monkeypatch.setattr(monitor, 'RPC_HEDGE_DEFAULT_DELAY_MS', 50)
+    pool = monitor.RpcEndpointPool([url(SLOW_PORT), url(FAST_PORT)])
+
+    started = time.monotonic()
+    endpoint, response = pool.post(block_number_payload())
+
+    assert endpoint.url == url(FAST_PORT)
+    assert time.monotonic() - started < 0.5
+    assert response.json()['result'].startswith('0x')
+    assert [metrics['hedges_won'] for metrics in pool.get_metrics()] == [0, 1]
+
+def test_failing_endpoints_are_failed_over_and_cooled_down(monitor, endpoints):
+    pool = monitor.RpcEndpointPool([url(DEAD_PORT), url(FAST_PORT)])
+
+    for _ in range(monitor.RPC_ENDPOINT_FAILURE_THRESHOLD):
+        endpoint, _ = pool.post(block_number_payload())
+        assert endpoint.url == url(FAST_PORT)
+
+    dead = pool.endpoints[0]
+    assert dead.errors == monitor.RPC_ENDPOINT_FAILURE_THRESHOLD
+    assert dead.is_cooling_down()
+    assert pool.ranked_endpoints()[-1] is dead
+
+def test_lagging_endpoints_are_ranked_last_and_not_trusted_for_missing_receipts(monitor, endpoints):
+    pool = monitor.RpcEndpointPool([url(LAGGING_PORT), url(FAST_PORT)])
+    pool.refresh_block_heights(force=True)
+    lagging, fast = pool.endpoints
+
+    assert pool.is_lagging(lagging) and not pool.is_lagging(fast)
+    assert pool.ranked_endpoints() == [fast, lagging]
+    assert not pool.is_trusted_for_absence(lagging)
+
+    # A receipt the lagging node does not have is not taken as proof the transaction is missing
+    pool.post = lambda payload: (lagging, pool.send(lagging, payload))
+    statuses = monitor.fetch_receipt_batch(pool, [make_hash('lagging-1')])
+
+    assert statuses[make_hash('lagging-1')]['status'] == 'unknown'
@@ -0,0 +1,62 @@
+import threading
+
+from spotmf_shared import single_flight
+
+def get_runs(cursor):
+    cursor.execute("SELECT id, status, error_message FROM service_runs ORDER BY started_at")
+    return cursor.fetchall()
+
+def test_only_one_of_several_concurrent_claims_wins(monitor, db):
+    barrier = threading.Barrier(4)
+    claims = []
+
+    def claim():
+        barrier.wait()
+        claims.append(single_flight.begin_single_flight_run('contention-test'))
+
+    threads = [threading.Thread(target=claim) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    runs = [run for run, _ in claims if run is not None]
+    assert len(runs) == 1
+    # A loser that checks before the winner has recorded its run sees no id yet
+    assert {running_id for run, running_id in claims if run is None} <= {runs[0].run_id, None}
+    runs[0].finish()
+    stats = single_flight.get_single_flight_metrics()['contention-test']
+    assert (stats['acquired'], stats['contended'], stats['running_id']) == (1, 3, None)
+
+def test_run_type_is_claimable_again_once_finished(monitor, db):
+    first, _ = single_flight.begin_single_flight_run('monitor')
+    first.fail('rpc down')
+    first.finish()
+
+    second, running_id = single_flight.begin_single_flight_run('monitor')
+    second.finish()
+
+    assert second is not None and running_id is None
+    assert get_runs(db) == [(first.run_id, 'FAILED', 'rpc down'), (second.run_id, 'COMPLETED', None)]
+
+def test_monitor_endpoint_answers_202_while_a_run_holds_the_lock(monitor, db):
+    run, _ = single_flight.begin_single_flight_run('monitor')
+    try:
+        response = monitor.app.test_client().post('/monitor')
+    finally:
+        run.finish()
+
+    assert response.status_code == 202
+    assert response.get_json()['run_id'] == run.run_id
+
+def test_running_rows_of_dead_runs_are_abandoned(monitor, db):
+    db.execute("""
+        INSERT INTO service_runs (id, service, run_type, status, started_at)
+        VALUES ('dead-run', %s, 'monitor', 'RUNNING', now() - interval '1 hour')
+    """, (monitor.SERVICE_NAME,))
+    db.connection.commit()
+
+    run, _ = single_flight.begin_single_flight_run('monitor')
+    run.finish()
+
+    assert get_runs(db) == [('dead-run', 'ABANDONED', None), (run.run_id, 'COMPLETED', None)]